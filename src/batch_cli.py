@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from batch_comparison import collect_documents, compare_all_pairs, compare_to_baseline
+from near_duplicates import DEFAULT_THRESHOLD, MinHashIndex, find_near_duplicates
+from passage_index import PassageIndex, find_shared_passages
+from text_preprocessor import COMPARISON_MODES
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Construit l'analyseur des arguments de la comparaison par lots.
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare par lots un document de référence à une série de documents "
+            "(--baseline), toutes les paires d'un corpus (--all-pairs) ou seulement "
+            "les paires quasi identiques repérées par MinHash/LSH (--near-duplicates), "
+            "ou recherche dans un index de passages les documents qui partagent des passages "
+            "avec chaque document (--passages). "
+            "Un résultat JSON est écrit par ligne, au fur et à mesure."
+        )
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--baseline", metavar="FICHIER", help="document de référence")
+    target.add_argument("--all-pairs", action="store_true", help="comparer toutes les paires de documents")
+    target.add_argument("--near-duplicates", action="store_true",
+                        help="comparer uniquement les paires de documents quasi identiques")
+    target.add_argument("--passages", metavar="INDEX",
+                        help="index de passages (base SQLite, créée si besoin) à interroger "
+                             "puis compléter avec les documents")
+    parser.add_argument("documents", nargs="+", help="fichiers .txt/.pdf ou dossiers à parcourir")
+    parser.add_argument("--mode", choices=sorted(COMPARISON_MODES), default="souple",
+                        help="mode de comparaison (défaut : souple)")
+    parser.add_argument("--keywords", default="", help="mots-clés à rechercher, séparés par des virgules")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="nombre de processus (défaut : tous les cœurs, 1 = en série)")
+    parser.add_argument("--cache-dir", default=None, help="répertoire du cache des documents prétraités")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"seuil de Jaccard estimé pour --near-duplicates (défaut : {DEFAULT_THRESHOLD})")
+    parser.add_argument("--signatures", default=None,
+                        help="fichier de signatures MinHash à compléter et réutiliser (--near-duplicates)")
+    parser.add_argument("--candidates", type=int, default=10,
+                        help="nombre maximal de documents candidats par document pour --passages (défaut : 10)")
+    parser.add_argument("--output", default="-", help="fichier JSONL de sortie (défaut : sortie standard)")
+    return parser
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    keywords = [keyword.strip() for keyword in args.keywords.split(",") if keyword.strip()]
+    paths = collect_documents(args.documents)
+
+    start = time.perf_counter()
+    if args.baseline:
+        try:
+            records = compare_to_baseline(args.baseline, paths, args.mode, keywords, args.workers, args.cache_dir)
+        except ValueError as e:
+            print(f"Erreur : {e}", file=sys.stderr)
+            return 2
+    elif args.all_pairs:
+        records = compare_all_pairs(paths, args.mode, keywords, args.workers, args.cache_dir)
+    elif args.passages:
+        try:
+            passage_index = PassageIndex(args.passages, args.mode)
+        except ValueError as e:
+            print(f"Erreur : {e}", file=sys.stderr)
+            return 2
+        records = find_shared_passages(passage_index, paths, args.candidates, args.cache_dir)
+    else:
+        index = None
+        if args.signatures and os.path.exists(args.signatures):
+            index = MinHashIndex.load(args.signatures)
+        elif args.signatures:
+            index = MinHashIndex(threshold=args.threshold)
+        records = find_near_duplicates(paths, args.threshold, args.mode, args.workers, index)
+
+    output = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    nb_records = 0
+    nb_errors = 0
+    try:
+        for record in records:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            nb_records += 1
+            nb_errors += "error" in record
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if args.near_duplicates and args.signatures:
+        index.save(args.signatures)
+    if args.passages:
+        passage_index.close()
+
+    elapsed = time.perf_counter() - start
+    throughput = len(paths) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{nb_records} résultat(s), {len(paths)} document(s) en {elapsed:.2f} s "
+        f"({throughput:.1f} documents/s), {nb_errors} erreur(s)",
+        file=sys.stderr
+    )
+    return 1 if nb_errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
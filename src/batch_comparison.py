@@ -0,0 +1,258 @@
+import os
+import time
+from collections.abc import Iterable, Iterator
+
+from comparison_engine import calculate_similarity_rate, compare_lines, search_keywords
+from document_cache import DocumentCache, load_preprocessed_file
+from file_parser import parse_file
+from text_preprocessor import COMPARISON_MODES, preprocess_lines
+from tokenized_document import TokenizedDocument
+
+SUPPORTED_EXTENSIONS = ('.txt', '.pdf')
+
+# Nombre de tâches en attente par processus : assez pour ne jamais laisser un
+# processus inactif, assez peu pour que les résultats sortent au fil de l'eau.
+_TASKS_PER_WORKER = 4
+# Nombre de paires comparées par tâche en mode « toutes les paires »
+PAIRS_PER_TASK = 64
+
+def collect_documents(paths: Iterable[str]) -> list[str]:
+    """
+    Développe une liste de chemins en liste de documents : les fichiers sont
+    gardés tels quels, les dossiers sont parcourus récursivement à la recherche
+    de fichiers .txt et .pdf (triés par nom).
+
+    :param paths: Chemins de fichiers ou de dossiers.
+    :return: Liste des chemins de documents.
+    """
+    documents = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for root, _, filenames in os.walk(path):
+                for filename in filenames:
+                    if os.path.splitext(filename)[1].lower() in SUPPORTED_EXTENSIONS:
+                        found.append(os.path.join(root, filename))
+            documents.extend(sorted(found))
+        else:
+            documents.append(path)
+    return documents
+
+_caches = {}
+
+def load_document(
+        filepath: str,
+        mode: str = "souple",
+        cache_dir: str | None = None,
+        workers: int | None = 1
+    ) -> str | None:
+    """
+    Lit et prétraite un document pour la comparaison ligne à ligne, en passant
+    par le cache disque si cache_dir est fourni.
+
+    :param filepath: Chemin du document (.txt ou .pdf).
+    :param mode: Mode de comparaison ('souple' ou 'strict', voir COMPARISON_MODES).
+    :param cache_dir: Répertoire du cache des documents, ou None pour ne pas l'utiliser.
+    :param workers: Nombre de processus pour l'extraction des PDF (voir file_parser.iter_pdf_pages).
+    :return: Texte prétraité, ou None si le document n'a pas pu être lu.
+    """
+    options = COMPARISON_MODES[mode]
+    if cache_dir is not None:
+        cache = _caches.get(cache_dir)
+        if cache is None:
+            cache = _caches[cache_dir] = DocumentCache(cache_dir)
+        return load_preprocessed_file(filepath, **options, cache=cache, workers=workers, keep_lines=True)
+
+    text = parse_file(filepath, workers)
+    if text is None:
+        return None
+    return preprocess_lines(text, **options)
+
+def summarize_comparison(
+        document1: TokenizedDocument,
+        document2: TokenizedDocument,
+        keywords: list[str] | None = None
+    ) -> dict:
+    """
+    Compare deux documents et renvoie un résumé compact (sans le détail des
+    lignes), adapté à l'export d'un résultat par ligne JSON.
+
+    :param document1: Premier document (même vocabulaire que document2).
+    :param document2: Deuxième document.
+    :param keywords: Mots-clés à rechercher dans les deux documents.
+    :return: Dictionnaire des indicateurs de la comparaison.
+    """
+    line_comp = compare_lines(document1, document2)
+    summary = {
+        "similarity_rate": calculate_similarity_rate(document1, document2, line_comp),
+        "common_lines": len(line_comp["common"]),
+        "changed_lines": len(line_comp["diff"]),
+        "lines_only_in_text1": len(line_comp["unique_to_text1"]),
+        "lines_only_in_text2": len(line_comp["unique_to_text2"])
+    }
+    if keywords:
+        # Seuls la présence et le nombre d'occurrences sont conservés
+        summary["keyword_search"] = {
+            keyword: {
+                doc: {"found": data["found"], "count": data["count"]}
+                for doc, data in result.items()
+            }
+            for keyword, result in search_keywords(document1, document2, keywords).items()
+        }
+    return summary
+
+# État propre à chaque processus de travail, initialisé une fois par processus
+_worker_state = {}
+
+def _init_worker(state: dict) -> None:
+    _worker_state.clear()
+    _worker_state.update(state)
+
+def _compare_to_baseline(filepath: str) -> list[dict]:
+    state = _worker_state
+    start = time.perf_counter()
+    record = {"baseline": state["baseline_path"], "document": filepath}
+
+    text = load_document(filepath, state["mode"], state["cache_dir"])
+    if text is None:
+        record["error"] = "document illisible ou format non supporté"
+        return [record]
+
+    # Copie à vocabulaire indépendant : le découpage de la référence est réutilisé
+    baseline = state["baseline"].fork()
+    document = TokenizedDocument(text, baseline.vocabulary)
+    record.update(summarize_comparison(baseline, document, state["keywords"]))
+    record["elapsed"] = round(time.perf_counter() - start, 6)
+    return [record]
+
+def _compare_pairs(i: int, j_start: int, j_stop: int) -> list[dict]:
+    state = _worker_state
+    paths = state["paths"]
+    texts = state["texts"]
+    records = []
+
+    base = TokenizedDocument(texts[i])
+    for j in range(j_start, j_stop):
+        if texts[j] is None:
+            continue
+        start = time.perf_counter()
+        document1 = base.fork()
+        document2 = TokenizedDocument(texts[j], document1.vocabulary)
+        record = {"document1": paths[i], "document2": paths[j]}
+        record.update(summarize_comparison(document1, document2, state["keywords"]))
+        record["elapsed"] = round(time.perf_counter() - start, 6)
+        records.append(record)
+    return records
+
+def _run_tasks(function, tasks: Iterable[tuple], workers: int, state: dict) -> Iterator[dict]:
+    """
+    Exécute les tâches (en série si workers <= 1, sinon dans un pool de
+    processus) et produit les résultats au fur et à mesure qu'ils sont prêts.
+    """
+    if workers <= 1:
+        _init_worker(state)
+        for task in tasks:
+            yield from function(*task)
+        return
+
+    # Import différé : inutile (et coûteux au démarrage) pour un traitement en série
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(state,)) as executor:
+        pending = set()
+        for task in tasks:
+            pending.add(executor.submit(function, *task))
+            if len(pending) >= _TASKS_PER_WORKER * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        for future in as_completed(pending):
+            yield from future.result()
+
+def compare_to_baseline(
+        baseline_path: str,
+        paths: Iterable[str],
+        mode: str = "souple",
+        keywords: list[str] | None = None,
+        workers: int | None = None,
+        cache_dir: str | None = None
+    ) -> Iterator[dict]:
+    """
+    Compare un document de référence à une série de documents. La référence est
+    lue, prétraitée et découpée une seule fois ; les comparaisons sont réparties
+    entre plusieurs processus et les résultats sont produits dans l'ordre où
+    elles se terminent.
+
+    :param baseline_path: Chemin du document de référence.
+    :param paths: Chemins des documents à comparer à la référence.
+    :param mode: Mode de comparaison ('souple' ou 'strict').
+    :param keywords: Mots-clés à rechercher dans chaque paire.
+    :param workers: Nombre de processus (None = tous les cœurs, 1 = en série).
+    :param cache_dir: Répertoire du cache des documents, ou None.
+    :return: Générateur d'un dictionnaire de résultat par document
+             (clé 'error' si le document n'a pas pu être lu).
+    :raises ValueError: Si le document de référence n'a pas pu être lu.
+    """
+    baseline_text = load_document(baseline_path, mode, cache_dir)
+    if baseline_text is None:
+        raise ValueError(f"Impossible de lire le document de référence : {baseline_path}")
+
+    baseline = TokenizedDocument(baseline_text)
+    # Découpages calculés avant la création des processus, qui en héritent
+    baseline.line_ids
+    baseline.line_blocks
+    if keywords:
+        baseline.keyword_index
+
+    state = {
+        "baseline_path": baseline_path,
+        "baseline": baseline,
+        "mode": mode,
+        "keywords": keywords,
+        "cache_dir": cache_dir
+    }
+    workers = workers or os.cpu_count() or 1
+    return _run_tasks(_compare_to_baseline, ((path,) for path in paths), workers, state)
+
+def compare_all_pairs(
+        paths: list[str],
+        mode: str = "souple",
+        keywords: list[str] | None = None,
+        workers: int | None = None,
+        cache_dir: str | None = None
+    ) -> Iterator[dict]:
+    """
+    Compare toutes les paires de documents d'un corpus. Chaque document est lu et
+    prétraité une seule fois, puis les paires sont réparties par lots entre
+    plusieurs processus.
+
+    :param paths: Chemins des documents.
+    :param mode: Mode de comparaison ('souple' ou 'strict').
+    :param keywords: Mots-clés à rechercher dans chaque paire.
+    :param workers: Nombre de processus (None = tous les cœurs, 1 = en série).
+    :param cache_dir: Répertoire du cache des documents, ou None.
+    :return: Générateur d'un dictionnaire de résultat par paire, précédé d'un
+             dictionnaire avec la clé 'error' pour chaque document illisible.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            texts = list(executor.map(load_document, paths, [mode] * len(paths), [cache_dir] * len(paths)))
+    else:
+        texts = [load_document(path, mode, cache_dir) for path in paths]
+
+    def records() -> Iterator[dict]:
+        for path, text in zip(paths, texts):
+            if text is None:
+                yield {"document": path, "error": "document illisible ou format non supporté"}
+
+        state = {"paths": paths, "texts": texts, "keywords": keywords}
+        tasks = (
+            (i, j_start, min(j_start + PAIRS_PER_TASK, len(paths)))
+            for i in range(len(paths)) if texts[i] is not None
+            for j_start in range(i + 1, len(paths), PAIRS_PER_TASK)
+        )
+        yield from _run_tasks(_compare_pairs, tasks, workers, state)
+
+    return records()
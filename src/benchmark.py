@@ -0,0 +1,357 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from importlib.util import find_spec
+
+from comparison_engine import (
+    calculate_similarity_rate,
+    compare_documents,
+    compare_lines,
+    compare_words_in_line,
+    identify_unique_words,
+    search_keywords,
+)
+from file_parser import parse_file
+from report_generator import generate_report
+from text_preprocessor import preprocess_lines, preprocess_text
+from tokenized_document import tokenize_documents
+
+# Tailles par défaut des corpus synthétiques (en lignes) et du PDF (en pages)
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_PDF_PAGES = 300
+DEFAULT_EDIT_RATE = 0.05
+# Écart relatif toléré par rapport à la référence avant de signaler une régression
+DEFAULT_TOLERANCE = 0.25
+# En dessous de cet écart absolu (en secondes), une différence de temps est du bruit de mesure
+NOISE_FLOOR_SECONDS = 0.001
+
+BENCHMARK_KEYWORDS = ["contrat", "locataire", "somme", "résiliation", "prix*"]
+
+_WORDS = (
+    "le la les un une des du de au aux et ou mais donc car ni que qui quoi dont "
+    "article clause contrat locataire bailleur propriétaire somme euros mois année "
+    "loyer charges dépôt garantie résiliation préavis durée renouvellement date "
+    "signature parties présent document annexe conditions générales particulières "
+    "paiement échéance retard pénalité intérêts indemnité assurance travaux entretien "
+    "réparations logement immeuble adresse commune état lieux inventaire mobilier "
+    "prix révision indice référence montant total hors taxes toutes comprises "
+    "obligation responsabilité litige tribunal compétent droit applicable notification "
+    "courrier recommandé accusé réception délai jours ouvrés calendaires prorata"
+).split()
+
+def generate_lines(nb_lines: int, seed: int = 0) -> list[str]:
+    """
+    Génère un texte synthétique, ligne par ligne, proche d'un document
+    contractuel (vocabulaire restreint, lignes de longueur variable).
+
+    :param nb_lines: Nombre de lignes à générer.
+    :param seed: Graine du générateur pseudo-aléatoire (reproductibilité).
+    :return: Liste des lignes.
+    """
+    rng = random.Random(seed)
+    lines = []
+    for i in range(nb_lines):
+        words = rng.choices(_WORDS, k=rng.randint(6, 14))
+        # Un numéro d'article rend la plupart des lignes uniques, comme dans un vrai document
+        words.insert(rng.randrange(len(words) + 1), str(i))
+        line = " ".join(words)
+        lines.append(line[0].upper() + line[1:] + rng.choice((".", ",", " ;", ":", "")))
+    return lines
+
+def apply_edits(lines: list[str], edit_rate: float, seed: int = 0) -> list[str]:
+    """
+    Produit une version modifiée d'un texte avec un taux d'édition contrôlé,
+    réparti entre insertions, suppressions, modifications de mots et
+    déplacements de blocs de lignes.
+
+    :param lines: Lignes du texte d'origine.
+    :param edit_rate: Proportion de lignes touchées (entre 0.0 et 1.0).
+    :param seed: Graine du générateur pseudo-aléatoire.
+    :return: Nouvelle liste de lignes.
+    """
+    rng = random.Random(seed)
+    edited = list(lines)
+    nb_edits = int(len(lines) * edit_rate)
+
+    for _ in range(nb_edits):
+        if not edited:
+            break
+        position = rng.randrange(len(edited))
+        kind = rng.random()
+        if kind < 0.25:
+            edited.insert(position, " ".join(rng.choices(_WORDS, k=rng.randint(6, 14))))
+        elif kind < 0.5:
+            del edited[position]
+        elif kind < 0.8:
+            words = edited[position].split()
+            words[rng.randrange(len(words))] = rng.choice(_WORDS)
+            edited[position] = " ".join(words)
+        else:
+            # Déplacement d'un bloc de 1 à 5 lignes
+            block = edited[position:position + rng.randint(1, 5)]
+            del edited[position:position + len(block)]
+            target = rng.randrange(len(edited) + 1)
+            edited[target:target] = block
+    return edited
+
+def _pdf_string(text: str) -> bytes:
+    data = text.encode('cp1252', errors='replace')
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+def write_pdf(filepath: str, lines: list[str], lines_per_page: int = 50) -> None:
+    """
+    Écrit un PDF minimal (une police standard, texte seul) sans dépendance
+    externe, pour mesurer l'extraction sur des documents de plusieurs centaines
+    de pages.
+
+    :param filepath: Chemin du fichier PDF à créer.
+    :param lines: Lignes de texte à écrire.
+    :param lines_per_page: Nombre de lignes par page.
+    """
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    # Objets 1 à 3 : catalogue, arbre des pages, police ; puis une page et son contenu par page
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+    ]
+    page_refs = []
+    for page_lines in pages:
+        stream = b"BT /F1 9 Tf 11 TL 40 800 Td " + b" ".join(
+            _pdf_string(line) + b" Tj T*" for line in page_lines
+        ) + b" ET"
+        page_number = len(objects) + 1
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (page_number + 1)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_refs.append(b"%d 0 R" % page_number)
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(page_refs) + b"] /Count %d >>" % len(pages)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(filepath, 'wb') as file:
+        file.write(output)
+
+def measure(function, repeat: int = 3) -> dict:
+    """
+    Mesure une fonction sans argument : meilleur temps et temps moyen sur
+    `repeat` exécutions, puis pic mémoire (tracemalloc) sur une exécution
+    séparée, pour que le suivi des allocations ne fausse pas les temps.
+
+    :param function: Fonction à mesurer.
+    :param repeat: Nombre d'exécutions chronométrées.
+    :return: Dictionnaire {'seconds', 'mean_seconds', 'peak_bytes'}.
+    """
+    timings = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": round(min(timings), 6),
+        "mean_seconds": round(sum(timings) / len(timings), 6),
+        "peak_bytes": peak
+    }
+
+def _run(results: dict, name: str, function, repeat: int, verbose: bool) -> None:
+    results[name] = measure(function, repeat)
+    if verbose:
+        result = results[name]
+        print(f"{name:<40} {result['seconds']:>10.4f} s {result['peak_bytes'] / 1e6:>10.1f} Mo",
+              file=sys.stderr)
+
+def run_benchmarks(
+        sizes: tuple[int, ...] = DEFAULT_SIZES,
+        pdf_pages: int = DEFAULT_PDF_PAGES,
+        edit_rate: float = DEFAULT_EDIT_RATE,
+        repeat: int = 3,
+        seed: int = 0,
+        verbose: bool = True
+    ) -> dict:
+    """
+    Exécute la suite de mesures : lecture des fichiers (parse_file),
+    prétraitement, chaque fonction de comparison_engine (sur des chaînes, et
+    compare_lines aussi sur des TokenizedDocument comme la ligne de commande)
+    et génération du rapport, pour chaque taille de corpus.
+
+    :param sizes: Tailles des textes synthétiques, en lignes.
+    :param pdf_pages: Nombre de pages du PDF synthétique (0 pour ne pas mesurer les PDF).
+    :param edit_rate: Taux d'édition entre les deux textes comparés.
+    :param repeat: Nombre d'exécutions chronométrées par mesure.
+    :param seed: Graine des corpus synthétiques.
+    :param verbose: Si True, affiche chaque mesure sur la sortie d'erreur.
+    :return: Dictionnaire {'environment', 'parameters', 'results'}.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in sizes:
+            lines1 = generate_lines(size, seed)
+            lines2 = apply_edits(lines1, edit_rate, seed + 1)
+            path = os.path.join(tmpdir, f"texte_{size}.txt")
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write("\n".join(lines1))
+            raw1 = "\n".join(lines1)
+            raw2 = "\n".join(lines2)
+
+            _run(results, f"parse_file.txt[{size}]", lambda: parse_file(path), repeat, verbose)
+            _run(results, f"preprocess_text[{size}]", lambda: preprocess_text(raw1), repeat, verbose)
+            _run(results, f"preprocess_lines[{size}]", lambda: preprocess_lines(raw1), repeat, verbose)
+
+            text1 = preprocess_lines(raw1)
+            text2 = preprocess_lines(raw2)
+            line_comp = compare_lines(text1, text2)
+
+            _run(results, f"compare_lines[{size}]", lambda: compare_lines(text1, text2), repeat, verbose)
+            # Chemin de la ligne de commande : découpage en TokenizedDocument (calculé
+            # à la demande, donc mesuré avec l'alignement) puis align_block_levels
+            _run(results, f"compare_lines.tokenized[{size}]",
+                 lambda: compare_lines(*tokenize_documents(text1, text2)), repeat, verbose)
+            _run(results, f"compare_words_in_line[{size}]",
+                 lambda: [compare_words_in_line(l1, l2) for l1, l2 in line_comp['diff']], repeat, verbose)
+            _run(results, f"calculate_similarity_rate[{size}]",
+                 lambda: calculate_similarity_rate(text1, text2), repeat, verbose)
+            _run(results, f"identify_unique_words[{size}]",
+                 lambda: identify_unique_words(text1, text2), repeat, verbose)
+            _run(results, f"search_keywords[{size}]",
+                 lambda: search_keywords(text1, text2, BENCHMARK_KEYWORDS), repeat, verbose)
+            _run(results, f"compare_documents[{size}]",
+                 lambda: compare_documents(text1, text2, None, BENCHMARK_KEYWORDS), repeat, verbose)
+
+            comparison = compare_documents(text1, text2, None, BENCHMARK_KEYWORDS)
+            _run(results, f"generate_report[{size}]", lambda: generate_report(comparison), repeat, verbose)
+
+        if pdf_pages > 0:
+            if find_spec("pdfplumber") is None:
+                print("pdfplumber n'est pas installé : mesures PDF ignorées", file=sys.stderr)
+            else:
+                pdf_path = os.path.join(tmpdir, f"document_{pdf_pages}.pdf")
+                write_pdf(pdf_path, generate_lines(pdf_pages * 50, seed))
+                _run(results, f"parse_file.pdf[{pdf_pages}p]", lambda: parse_file(pdf_path), repeat, verbose)
+                _run(results, f"parse_file.pdf.parallel[{pdf_pages}p]",
+                     lambda: parse_file(pdf_path, workers=None), repeat, verbose)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "cpu_count": os.cpu_count()
+        },
+        "parameters": {
+            "sizes": list(sizes),
+            "pdf_pages": pdf_pages,
+            "edit_rate": edit_rate,
+            "repeat": repeat,
+            "seed": seed
+        },
+        "results": results
+    }
+
+def compare_to_baseline(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """
+    Compare des résultats à une référence enregistrée et liste les régressions :
+    mesures dont le temps ou le pic mémoire dépasse la référence de plus de
+    `tolerance` (en proportion), hors écarts de temps inférieurs à
+    NOISE_FLOOR_SECONDS. Les mesures absentes de l'un des deux côtés
+    sont ignorées.
+
+    :param current: Résultats de run_benchmarks.
+    :param baseline: Résultats de référence (même format).
+    :param tolerance: Écart relatif toléré (0.25 = 25 %).
+    :return: Liste des régressions, sous forme de messages.
+    """
+    regressions = []
+    reference = baseline.get("results", {})
+    for name, result in current["results"].items():
+        if name not in reference:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            old, new = reference[name].get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            if metric == "seconds" and new - old < NOISE_FLOOR_SECONDS:
+                continue
+            ratio = new / old
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name} : {metric} {old} -> {new} (x{ratio:.2f})")
+    return regressions
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Construit l'analyseur des arguments de la suite de mesures.
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Mesure les temps d'exécution et le pic mémoire de la lecture, du prétraitement, "
+            "de la comparaison et de la génération du rapport sur des corpus synthétiques."
+        )
+    )
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="tailles des textes en lignes, séparées par des virgules")
+    parser.add_argument("--pdf-pages", type=int, default=DEFAULT_PDF_PAGES,
+                        help=f"nombre de pages du PDF synthétique, 0 pour l'ignorer (défaut : {DEFAULT_PDF_PAGES})")
+    parser.add_argument("--edit-rate", type=float, default=DEFAULT_EDIT_RATE,
+                        help=f"taux d'édition entre les deux textes (défaut : {DEFAULT_EDIT_RATE})")
+    parser.add_argument("--repeat", type=int, default=3, help="exécutions chronométrées par mesure (défaut : 3)")
+    parser.add_argument("--seed", type=int, default=0, help="graine des corpus synthétiques")
+    parser.add_argument("--output", default="-", help="fichier JSON des résultats (défaut : sortie standard)")
+    parser.add_argument("--baseline", default=None, help="fichier JSON de référence à comparer aux résultats")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"écart relatif toléré avant régression (défaut : {DEFAULT_TOLERANCE})")
+    return parser
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    sizes = tuple(int(size) for size in args.sizes.split(",") if size.strip())
+
+    current = run_benchmarks(sizes, args.pdf_pages, args.edit_rate, args.repeat, args.seed)
+    output_text = json.dumps(current, indent=2) + "\n"
+    if args.output == "-":
+        sys.stdout.write(output_text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output_text)
+
+    if args.baseline is None:
+        return 0
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+    except (OSError, ValueError) as e:
+        print(f"Erreur lors de la lecture de la référence : {e}", file=sys.stderr)
+        return 2
+
+    regressions = compare_to_baseline(current, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"Régression : {regression}", file=sys.stderr)
+    if not regressions:
+        print("Aucune régression par rapport à la référence.", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
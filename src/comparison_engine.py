@@ -1,91 +1,370 @@
-import re
+import os
+from collections.abc import Iterable, Iterator
+from itertools import chain, filterfalse, islice
+
+from external_comparison import ExternalDocument, compare_external_lines, external_unique_words
+from keyword_index import scan_keyword
+from mapped_document import MappedDocument, compare_mapped_lines
+from parallel import ordered_chunked_map
+from profiling import profile_iterator, stage
+from sequence_alignment import align_block_levels, align_sequences, align_words, apply_moves, hash_lines
+from sequence_alignment import detect_moves as find_moves
+from similarity_metrics import compute_similarity_metrics, register_metric
+from text_preprocessor import OffsetMap
+from tokenized_document import TokenizedDocument, tokenize_documents
+
+# Longueur (en caractères) à partir de laquelle deux lignes modifiées sont aussi
+# comparées caractère par caractère pour localiser le passage modifié
+LONG_LINE_LENGTH = 1000
+# Nombre de paires de lignes modifiées confiées à un processus par tâche
+WORD_DIFF_CHUNK_SIZE = 1024
+# En dessous de ce nombre de paires, la comparaison mot à mot parallèle n'est pas rentable
+PARALLEL_MIN_PAIRS = 8192
+
+def _as_lines(text: str | TokenizedDocument | Iterable[str]) -> list[str]:
+    """
+    Renvoie la liste des lignes d'un texte, qu'il soit fourni sous forme de chaîne,
+    de document déjà découpé ou d'itérable de lignes (par exemple
+    file_parser.iter_file_lines).
+
+    :param text: Texte complet, TokenizedDocument ou itérable de lignes.
+    :return: Liste des lignes.
+    """
+    if isinstance(text, str):
+        return text.splitlines()
+    if isinstance(text, TokenizedDocument):
+        return text.lines
+    # Un MappedDocument se lit déjà ligne par ligne, à la demande
+    return text if isinstance(text, (list, MappedDocument)) else list(text)
+
+def split_hunk(
+        hunk: tuple[str, int, int, int, int],
+        lines1: list[str],
+        lines2: list[str]
+    ) -> tuple[list[str], list[tuple[str, str]], list[str], list[str]]:
+    """
+    Répartit les lignes d'un bloc d'alignement entre lignes communes, paires de
+    lignes modifiées et lignes propres à chaque texte.
 
-def compare_lines(text1: str, text2: str) -> dict:
+    :param hunk: Bloc (tag, i1, i2, j1, j2) produit par l'alignement.
+    :param lines1: Lignes du texte 1.
+    :param lines2: Lignes du texte 2.
+    :return: Tuple (communes, paires modifiées, uniquement texte 1, uniquement texte 2).
+    """
+    tag, i1, i2, j1, j2 = hunk
+    if tag == 'equal':
+        return lines1[i1:i2], [], [], []
+    if tag == 'delete':
+        return [], [], lines1[i1:i2], []
+    if tag == 'insert':
+        return [], [], [], lines2[j1:j2]
+    if tag == 'moved':
+        # Lignes déplacées : listées à part (compare_lines(..., detect_moves=True))
+        return [], [], [], []
+    # Bloc remplacé : on apparie les lignes dans l'ordre,
+    # le surplus éventuel est considéré comme supprimé ou inséré
+    size = min(i2 - i1, j2 - j1)
+    return (
+        [],
+        list(zip(lines1[i1:i1 + size], lines2[j1:j1 + size])),
+        lines1[i1 + size:i2],
+        lines2[j1 + size:j2]
+    )
+
+def compare_lines(
+        text1: str | TokenizedDocument | Iterable[str],
+        text2: str | TokenizedDocument | Iterable[str],
+        detect_moves: bool = False
+    ) -> dict:
     """
-    Compare deux textes ligne par ligne.
+    Compare deux textes ligne par ligne en alignant leurs lignes (patience diff
+    et algorithme de Myers), de sorte qu'une ligne insérée ne décale pas toute
+    la suite du document.
     Retourne un dictionnaire contenant :
     - 'common': lignes identiques
-    - 'diff': paires de lignes différentes (sous forme de tuples)
-    - 'unique_to_text1': lignes uniquement dans le texte 1
-    - 'unique_to_text2': lignes uniquement dans le texte 2
+    - 'diff': paires de lignes modifiées (sous forme de tuples)
+    - 'unique_to_text1': lignes uniquement dans le texte 1 (supprimées)
+    - 'unique_to_text2': lignes uniquement dans le texte 2 (insérées)
+    - 'hunks': blocs d'alignement ('equal' | 'replace' | 'delete' | 'insert', i1, i2, j1, j2)
+
+    Avec detect_moves=True, les blocs d'au moins MOVE_MIN_LINES lignes supprimés
+    à un endroit et réinsérés ailleurs (sequence_alignment.detect_moves) ne sont
+    plus comptés comme lignes modifiées, supprimées ou insérées. Le dictionnaire
+    contient en plus :
+    - 'moved': lignes déplacées (texte du texte 1),
+    - 'moves': blocs déplacés (i1, i2, j1, j2), a[i1:i2] se retrouvant en b[j1:j2] ;
+    leurs extrémités apparaissent dans 'hunks' avec l'étiquette 'moved'
+    (voir sequence_alignment.apply_moves).
+
+    Les textes peuvent être des chaînes ou des itérables de lignes produits au fil
+    de la lecture (file_parser.iter_file_lines) : seules les lignes sont alors
+    conservées en mémoire, jamais le texte complet concaténé.
+    Avec deux TokenizedDocument, l'alignement réutilise directement leurs
+    identifiants de lignes et leurs hiérarchies de blocs : sur deux longs
+    documents presque identiques, les passages inchangés sont reconnus bloc par
+    bloc et seules les zones modifiées sont réalignées ligne à ligne. Avec
+    deux MappedDocument, il porte sur les empreintes des lignes et les listes
+    du résultat ne décodent les lignes qu'à la lecture (voir
+    mapped_document.compare_mapped_lines). Deux ExternalDocument sont comparés
+    hors mémoire (voir external_comparison.compare_external_lines), sans
+    détection des déplacements (ValueError si detect_moves vaut True).
     """
-    # On divise chaque texte en lignes individuelles
-    lines1 = text1.splitlines()
-    lines2 = text2.splitlines()
+    if isinstance(text1, ExternalDocument) and isinstance(text2, ExternalDocument):
+        if detect_moves:
+            raise ValueError("La détection des déplacements n'est pas disponible hors mémoire (ExternalDocument)")
+        return compare_external_lines(text1, text2)
+    if isinstance(text1, MappedDocument) and isinstance(text2, MappedDocument):
+        return compare_mapped_lines(text1, text2, detect_moves)
+    if isinstance(text1, TokenizedDocument) and isinstance(text2, TokenizedDocument):
+        doc1, doc2 = tokenize_documents(text1, text2)
+        lines1 = doc1.lines
+        lines2 = doc2.lines
+        ids1, ids2 = doc1.line_ids, doc2.line_ids
+        hunks = align_block_levels(doc1.line_blocks, doc2.line_blocks)
+    else:
+        # On divise chaque texte en lignes individuelles
+        lines1 = _as_lines(text1)
+        lines2 = _as_lines(text2)
+        ids1, ids2 = hash_lines(lines1, lines2)
+        hunks = align_sequences(ids1, ids2)
+
+    moves = None
+    if detect_moves:
+        moves = find_moves(ids1, ids2, hunks)
+        hunks = apply_moves(hunks, moves)
 
     common = []
     diff = []
     unique_to_text1 = []
     unique_to_text2 = []
 
-    # On compare les lignes position par position 
-    for l1, l2 in zip(lines1, lines2):
-        if l1 == l2:
-            common.append(l1)
-        else:
-            diff.append((l1, l2))  # On garde les deux versions différentes
+    for hunk in hunks:
+        hunk_common, hunk_diff, hunk_unique1, hunk_unique2 = split_hunk(hunk, lines1, lines2)
+        common.extend(hunk_common)
+        diff.extend(hunk_diff)
+        unique_to_text1.extend(hunk_unique1)
+        unique_to_text2.extend(hunk_unique2)
 
-    # On regarde s’il reste des lignes non comparées (si l’un est plus long que l’autre)
-    if len(lines1) > len(lines2):
-        unique_to_text1.extend(lines1[len(lines2):])
-    elif len(lines2) > len(lines1):
-        unique_to_text2.extend(lines2[len(lines1):])
-
-    return {
+    result = {
         'common': common,
         'diff': diff,
         'unique_to_text1': unique_to_text1,
-        'unique_to_text2': unique_to_text2
+        'unique_to_text2': unique_to_text2,
+        'hunks': hunks
+    }
+    if moves is not None:
+        result['moved'] = [line for i1, i2, _, _ in moves for line in lines1[i1:i2]]
+        result['moves'] = moves
+    return result
+
+def project_hunks(
+        hunks: Iterable[tuple[str, int, int, int, int]],
+        offsets1: OffsetMap,
+        offsets2: OffsetMap
+    ) -> Iterator[tuple[str, int, int, int, int]]:
+    """
+    Projette les blocs d'alignement de compare_lines, exprimés en numéros de
+    lignes des textes prétraités, sur les textes d'origine, à l'aide des
+    correspondances construites par text_preprocessor.preprocess_with_offsets.
+    Chaque bloc coûte quelques recherches dichotomiques, sans relire les fichiers ;
+    OffsetMap.source_position donne ensuite la ligne, la colonne et la page.
+
+    :param hunks: Blocs (tag, i1, i2, j1, j2), par exemple compare_lines()['hunks'].
+    :param offsets1: Correspondance des positions du texte 1.
+    :param offsets2: Correspondance des positions du texte 2.
+    :return: Générateur de tuples (tag, début 1, fin 1, début 2, fin 2), positions
+    (fins exclues) des passages correspondants dans les textes d'origine.
+    """
+    for tag, i1, i2, j1, j2 in hunks:
+        start1, end1 = offsets1.line_range(i1, i2)
+        start2, end2 = offsets2.line_range(j1, j2)
+        yield (tag, start1, end1, start2, end2)
+
+def _common_prefix_length(s1: str, s2: str) -> int:
+    # Recherche dichotomique : les tranches sont comparées en C, sans boucle par caractère
+    lo, hi = 0, min(len(s1), len(s2))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if s1[lo:mid] == s2[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _common_suffix_length(s1: str, s2: str, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if s1[len(s1) - mid:len(s1) - lo] == s2[len(s2) - mid:len(s2) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def compare_characters(line1: str, line2: str) -> dict:
+    """
+    Localise le passage modifié entre deux lignes, caractère par caractère, en
+    retirant leur préfixe et leur suffixe communs.
+
+    :param line1: Première ligne à comparer.
+    :param line2: Deuxième ligne à comparer.
+    :return: Dictionnaire {'position': indice du premier caractère différent,
+             'removed': passage propre à line1, 'added': passage propre à line2}.
+    """
+    prefix = _common_prefix_length(line1, line2)
+    suffix = _common_suffix_length(line1, line2, min(len(line1), len(line2)) - prefix)
+    return {
+        "position": prefix,
+        "removed": line1[prefix:len(line1) - suffix],
+        "added": line2[prefix:len(line2) - suffix]
     }
 
 def compare_words_in_line(line1: str, line2: str) -> dict:
     """
-    Compare deux lignes mot à mot.
+    Compare deux lignes mot à mot, en alignant leurs mots sur leur plus longue
+    sous-séquence commune (sequence_alignment.align_words) : un mot inséré ne
+    décale pas la comparaison des mots suivants.
+
+    Pour deux lignes d'au moins LONG_LINE_LENGTH caractères, le passage modifié
+    est aussi localisé caractère par caractère (compare_characters) et le
+    résultat contient en plus la clé 'char_diff'.
 
     :param line1: Première ligne à comparer.
     :param line2: Deuxième ligne à comparer.
     :return: Dictionnaire contenant :
-        - 'common': liste des mots communs,
-        - 'only_in_line1': liste des mots présents uniquement dans line1,
-        - 'only_in_line2': liste des mots présents uniquement dans line2,
-        - 'differences': liste des couples (mot1, mot2) pour les mots différents à la même position.
+        - 'common': liste ordonnée des mots appariés,
+        - 'only_in_line1': liste ordonnée des mots de line1 sans correspondant dans line2,
+        - 'only_in_line2': liste ordonnée des mots de line2 sans correspondant dans line1,
+        - 'differences': liste des couples (mot1, mot2) de mots remplacés l'un par l'autre,
+        - 'ops': liste ordonnée des modifications ('replace' | 'delete' | 'insert',
+          i1, i2, j1, j2), en positions de mots dans chaque ligne,
+        - 'char_diff' (lignes longues uniquement) : passage modifié, voir compare_characters.
     """
-    words1 = line1.strip().split()
-    words2 = line2.strip().split()
-
-    set1 = set(words1)
-    set2 = set(words2)
+    if line1 == line2:
+        # Lignes identiques appariées dans un bloc modifié : aucune différence à chercher
+        return {
+            "common": line1.split(),
+            "only_in_line1": [],
+            "only_in_line2": [],
+            "differences": [],
+            "ops": []
+        }
 
-    common = list(set1 & set2)
-    only_in_line1 = list(set1 - set2)
-    only_in_line2 = list(set2 - set1)
+    words1 = line1.split()
+    words2 = line2.split()
 
-    # Comparaison positionnelle (mots à la même place mais différents)
+    common = []
+    only_in_line1 = []
+    only_in_line2 = []
     differences = []
-    for w1, w2 in zip(words1, words2):
-        if w1 != w2:
-            differences.append((w1, w2))
-
-    return {
+    ops = []
+    for hunk in align_words(words1, words2):
+        tag, i1, i2, j1, j2 = hunk
+        if tag == 'equal':
+            common += words1[i1:i2]
+            continue
+        ops.append(hunk)
+        only_in_line1 += words1[i1:i2]
+        only_in_line2 += words2[j1:j2]
+        if tag == 'replace':
+            # Mots remplacés appariés dans l'ordre à l'intérieur du bloc
+            differences += [(w1, w2) for w1, w2 in zip(words1[i1:i2], words2[j1:j2]) if w1 != w2]
+
+    result = {
         "common": common,
         "only_in_line1": only_in_line1,
         "only_in_line2": only_in_line2,
-        "differences": differences
+        "differences": differences,
+        "ops": ops
     }
+    if min(len(line1), len(line2)) >= LONG_LINE_LENGTH:
+        result["char_diff"] = compare_characters(line1, line2)
+    return result
 
-def calculate_similarity_rate(text1: str, text2: str) -> float:
+def _compare_word_batch(pairs: list[tuple[str, str]]) -> list[dict]:
     """
-    Calcule le pourcentage de similarité entre deux textes en fonction des lignes communes.
+    Tâche exécutée par un processus de travail : compare mot à mot un lot de
+    paires de lignes.
+    """
+    return [compare_words_in_line(l1, l2) for l1, l2 in pairs]
 
-    :param text1: Premier texte.
-    :param text2: Deuxième texte.
+def iter_word_level_differences(
+        line_pairs: Iterable[tuple[str, str]],
+        workers: int | None = 1,
+        chunk_size: int = WORD_DIFF_CHUNK_SIZE
+    ) -> Iterator[dict]:
+    """
+    Produit, pour chaque paire de lignes modifiées, le détail de la comparaison
+    mot à mot (compare_words_in_line), au fur et à mesure.
+
+    Avec workers > 1 (ou None pour utiliser tous les cœurs), les paires sont
+    confiées par lots de chunk_size à plusieurs processus ; seul le résultat de
+    la comparaison revient de chaque processus, et les différences sont
+    toujours produites dans l'ordre des paires, avec quelques lots par
+    processus en cours à un instant donné. Tant que moins de PARALLEL_MIN_PAIRS
+    paires sont à comparer, le calcul reste en série, le démarrage des
+    processus coûtant alors plus qu'il ne rapporte.
+
+    :param line_pairs: Paires (ligne du texte 1, ligne du texte 2), par exemple compare_lines()['diff'].
+    :param workers: Nombre de processus de comparaison (1 = calcul en série).
+    :param chunk_size: Nombre de paires confiées à un processus par tâche.
+    :return: Générateur de dictionnaires {'line_text1', 'line_text2', 'word_diff'}.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pairs = iter(line_pairs)
+    # Les premières paires décident du mode de calcul
+    head = list(islice(pairs, PARALLEL_MIN_PAIRS)) if workers > 1 else []
+    if workers <= 1 or len(head) < PARALLEL_MIN_PAIRS:
+        for l1, l2 in chain(head, pairs):
+            yield {
+                "line_text1": l1,
+                "line_text2": l2,
+                "word_diff": compare_words_in_line(l1, l2)
+            }
+        return
+
+    pairs = chain(head, pairs)
+    batches = iter(lambda: list(islice(pairs, max(1, chunk_size))), [])
+    for batch, word_diffs in ordered_chunked_map(_compare_word_batch, batches, workers):
+        for (l1, l2), word_diff in zip(batch, word_diffs):
+            yield {
+                "line_text1": l1,
+                "line_text2": l2,
+                "word_diff": word_diff
+            }
+
+def calculate_similarity_rate(
+        text1: str | TokenizedDocument | Iterable[str],
+        text2: str | TokenizedDocument | Iterable[str],
+        line_comparison: dict | None = None
+    ) -> float:
+    """
+    Calcule le pourcentage de similarité entre deux textes en fonction des lignes
+    communes ; les lignes déplacées (compare_lines(..., detect_moves=True)) sont
+    comptées comme communes.
+
+    :param text1: Premier texte (chaîne, TokenizedDocument ou itérable de lignes).
+    :param text2: Deuxième texte (chaîne, TokenizedDocument ou itérable de lignes).
+    :param line_comparison: Résultat de compare_lines déjà calculé pour ces deux
+    textes, pour éviter de les réaligner.
     :return: Taux de similarité (entre 0.0 et 100.0).
     """
-    result = compare_lines(text1, text2)
-    nb_communes = len(result['common'])
+    if line_comparison is None:
+        if not isinstance(text1, (str, TokenizedDocument, MappedDocument)):
+            text1 = _as_lines(text1)
+        if not isinstance(text2, (str, TokenizedDocument, MappedDocument)):
+            text2 = _as_lines(text2)
+        line_comparison = compare_lines(text1, text2)
+    nb_communes = len(line_comparison['common']) + len(line_comparison.get('moved', ()))
+
+    # Nombre total de lignes de chaque texte, déduit du dernier bloc d'alignement
+    hunks = line_comparison['hunks']
+    nb_lignes1 = hunks[-1][2] if hunks else 0
+    nb_lignes2 = hunks[-1][4] if hunks else 0
 
     # Nombre total moyen de lignes dans les deux textes
-    nb_total = (len(text1.splitlines()) + len(text2.splitlines())) / 2
+    nb_total = (nb_lignes1 + nb_lignes2) / 2
 
     if nb_total == 0:
         return 100.0  # Deux textes vides = 100% similaires
@@ -93,63 +372,123 @@ def calculate_similarity_rate(text1: str, text2: str) -> float:
     taux = (nb_communes / nb_total) * 100
     return round(taux, 2)
 
-def identify_unique_words(text1: str, text2: str) -> dict:
+# Mesure historique, également disponible sous forme de mesure nommée
+register_metric("lines", calculate_similarity_rate)
+
+def identify_unique_words(
+        text1: str | TokenizedDocument | MappedDocument,
+        text2: str | TokenizedDocument | MappedDocument
+    ) -> dict:
     """
-    Identifie les mots présents uniquement dans l'un des deux textes.
+    Identifie les mots présents uniquement dans l'un des deux textes. Pour deux
+    textes ou TokenizedDocument, les mots sont listés dans l'ordre de leur
+    première apparition dans le texte ; pour deux MappedDocument (ou
+    ExternalDocument), l'ordre n'est pas défini.
 
-    :param text1: Contenu du premier document.
-    :param text2: Contenu du deuxième document.
+    :param text1: Contenu du premier document (ou TokenizedDocument, ou MappedDocument).
+    :param text2: Contenu du deuxième document (ou TokenizedDocument, ou MappedDocument).
     :return: Dictionnaire avec :
         - 'only_in_text1': liste des mots uniques au texte 1
         - 'only_in_text2': liste des mots uniques au texte 2
     """
-    # On découpe les textes en mots (en ignorant la casse)
-    words1 = text1.lower().split()
-    words2 = text2.lower().split()
+    if isinstance(text1, ExternalDocument) and isinstance(text2, ExternalDocument):
+        return external_unique_words(text1, text2)
+    if isinstance(text1, MappedDocument) and isinstance(text2, MappedDocument):
+        set1 = text1.lower_words()
+        set2 = text2.lower_words()
+        return {
+            "only_in_text1": list(set1 - set2),
+            "only_in_text2": list(set2 - set1)
+        }
+
+    doc1, doc2 = tokenize_documents(text1, text2)
 
-    # On utilise les ensembles pour détecter les mots uniques
-    set1 = set(words1)
-    set2 = set(words2)
+    # Différences sur les identifiants des mots en minuscules ; dict.fromkeys
+    # garde l'ordre de première apparition (l'ordre des identifiants ne le suit
+    # pas : le vocabulaire encode aussi les lignes et les mots d'origine)
+    words1 = dict.fromkeys(doc1.lower_word_ids)
+    words2 = dict.fromkeys(doc2.lower_word_ids)
 
-    only_in_text1 = list(set1 - set2)
-    only_in_text2 = list(set2 - set1)
+    vocabulary = doc1.vocabulary
+    only_in_text1 = vocabulary.terms(filterfalse(words2.__contains__, words1))
+    only_in_text2 = vocabulary.terms(filterfalse(words1.__contains__, words2))
 
     return {
         "only_in_text1": only_in_text1,
         "only_in_text2": only_in_text2
     }
 
-def search_keyword(text1: str, text2: str, keyword: str) -> dict:
+def search_keywords(
+        text1: str | TokenizedDocument,
+        text2: str | TokenizedDocument,
+        keywords: Iterable[str]
+    ) -> dict:
     """
-    Recherche un mot-clé dans les deux textes et indique s'il est présent
-    et combien de fois il apparaît (en ignorant la casse et la ponctuation).
-
-    :param text1: Premier texte.
-    :param text2: Deuxième texte.
-    :param keyword: Mot-clé à chercher.
-    :return: Dictionnaire avec les informations de présence et de fréquence.
+    Recherche plusieurs mots-clés dans les deux textes en une seule passe : chaque
+    texte est découpé et indexé une seule fois (keyword_index.KeywordIndex), puis
+    chaque mot-clé n'est qu'une consultation de l'index. Un mot-clé peut être un
+    mot, une expression de plusieurs mots ou un préfixe terminé par « * ».
+
+    Pour un seul mot-clé, l'index n'est construit que s'il n'existe pas déjà :
+    un parcours direct des lignes (keyword_index.scan_keyword) coûte moins cher.
+
+    :param text1: Premier texte (ou TokenizedDocument).
+    :param text2: Deuxième texte (ou TokenizedDocument).
+    :param keywords: Mots-clés à chercher.
+    :return: Dictionnaire {mot-clé: résultat au format de search_keyword}.
     """
-    keyword = keyword.lower()
-
-    # On extrait uniquement les mots (sans ponctuation)
-    words1 = re.findall(r'\b\w+\b', text1.lower())
-    words2 = re.findall(r'\b\w+\b', text2.lower())
+    doc1, doc2 = tokenize_documents(text1, text2)
+    keywords = list(keywords)
+    if len(keywords) == 1:
+        keyword = keywords[0]
+        return {
+            keyword: {
+                # Index déjà construit (document de référence d'une série) : réutilisé
+                name: document.keyword_index.search(keyword) if "keyword_index" in document.__dict__
+                      else scan_keyword(document.lines, keyword)
+                for name, document in (("text1", doc1), ("text2", doc2))
+            }
+        }
 
-    count1 = words1.count(keyword)
-    count2 = words2.count(keyword)
+    index1 = doc1.keyword_index
+    index2 = doc2.keyword_index
 
     return {
-        "text1": {
-            "found": count1 > 0,
-            "count": count1
-        },
-        "text2": {
-            "found": count2 > 0,
-            "count": count2
+        keyword: {
+            "text1": index1.search(keyword),
+            "text2": index2.search(keyword)
         }
+        for keyword in keywords
     }
 
-def compare_documents(text1: str, text2: str, keyword: str) -> dict:
+def search_keyword(
+        text1: str | TokenizedDocument,
+        text2: str | TokenizedDocument,
+        keyword: str
+    ) -> dict:
+    """
+    Recherche un mot-clé dans les deux textes et indique s'il est présent,
+    combien de fois il apparaît (en ignorant la casse et la ponctuation)
+    et sur quelles lignes.
+
+    :param text1: Premier texte (ou TokenizedDocument).
+    :param text2: Deuxième texte (ou TokenizedDocument).
+    :param keyword: Mot-clé à chercher (mot, expression ou préfixe terminé par « * »).
+    :return: Dictionnaire avec les informations de présence, de fréquence
+    et les numéros de lignes (à partir de 1) des occurrences.
+    """
+    return search_keywords(text1, text2, [keyword])[keyword]
+
+def compare_documents(
+        text1: str | TokenizedDocument | MappedDocument,
+        text2: str | TokenizedDocument | MappedDocument,
+        keyword: str | None,
+        keywords: Iterable[str] | None = None,
+        lazy: bool = False,
+        metrics: Iterable[str] | None = None,
+        detect_moves: bool = False,
+        workers: int | None = None
+    ) -> dict:
     """
     Orchestration globale de la comparaison de documents.
 
@@ -158,36 +497,82 @@ def compare_documents(text1: str, text2: str, keyword: str) -> dict:
     - compare_words_in_line pour analyser les différences mot à mot dans les lignes différentes,
     - calculate_similarity_rate pour calculer le taux de similarité,
     - identify_unique_words pour détecter les mots uniques,
-    - search_keyword pour chercher un mot-clé.
-
-    :param text1: Premier texte.
-    :param text2: Deuxième texte.
-    :param keyword: Mot-clé à chercher.
+    - search_keyword pour chercher un mot-clé,
+    - search_keywords pour chercher une liste de mots-clés,
+    - similarity_metrics.compute_similarity_metrics pour les mesures de similarité demandées.
+
+    Chaque texte n'est découpé qu'une seule fois (TokenizedDocument) et ce
+    découpage est partagé par toutes les fonctions ci-dessus. Chaque étape est
+    mesurée lorsqu'un profileur est actif (voir profiling.Profiler).
+    Deux MappedDocument sont comparés sans prétraitement ni recherche de mots-clés
+    (ValueError si keyword ou keywords sont fournis) ; seule la mesure 'lines'
+    leur est applicable. Deux ExternalDocument (MappedDocument hors mémoire) le
+    sont sous leur plafond mémoire, à condition de passer lazy=True.
+
+    :param text1: Premier texte (ou TokenizedDocument, ou MappedDocument).
+    :param text2: Deuxième texte (ou TokenizedDocument, ou MappedDocument).
+    :param keyword: Mot-clé à chercher (None : pas de recherche, 'keyword_search' vaut None).
+    :param keywords: Liste de mots-clés à chercher en une passe ; leurs résultats
+    sont ajoutés sous la clé 'keyword_searches'.
+    :param lazy: Si True, 'word_level_differences' est un générateur : les
+    différences mot à mot sont calculées au moment où elles sont consommées
+    (report_generator.write_report) au lieu d'être toutes conservées en mémoire.
+    :param metrics: Mesures de similarité à calculer en plus du taux de lignes
+    communes ('jaccard', 'cosine', 'edit', 'lines', voir similarity_metrics) ;
+    leurs pourcentages sont ajoutés sous la clé 'similarity_metrics'.
+    :param detect_moves: Si True, les blocs de lignes déplacés sont reconnus
+    (voir compare_lines) au lieu d'apparaître comme supprimés puis insérés.
+    :param workers: Nombre de processus pour la comparaison mot à mot des lignes
+    modifiées (None = tous les cœurs, 1 = en série). Le calcul ne devient parallèle
+    qu'à partir de PARALLEL_MIN_PAIRS lignes modifiées (voir iter_word_level_differences).
     :return: Dictionnaire complet avec tous les résultats.
     """
-    line_comp = compare_lines(text1, text2)
+    if isinstance(text1, MappedDocument) and isinstance(text2, MappedDocument):
+        if keyword is not None or keywords:
+            raise ValueError("La recherche de mots-clés n'est pas disponible pour les MappedDocument")
+        if metrics is not None and set(metrics) - {"lines"}:
+            raise ValueError("Seule la mesure 'lines' est disponible pour les MappedDocument")
+        doc1, doc2 = text1, text2
+    else:
+        doc1, doc2 = tokenize_documents(text1, text2)
+    with stage("compare_lines", lines1=len(_as_lines(doc1)), lines2=len(_as_lines(doc2))):
+        line_comp = compare_lines(doc1, doc2, detect_moves)
 
     # Analyse détaillée mot à mot des lignes différentes
-    word_level_diffs = []
-    for l1, l2 in line_comp['diff']:
-        word_diff = compare_words_in_line(l1, l2)
-        word_level_diffs.append({
-            "line_text1": l1,
-            "line_text2": l2,
-            "word_diff": word_diff
-        })
-
-    similarity = calculate_similarity_rate(text1, text2)
-    uniques = identify_unique_words(text1, text2)
-    keyword_search = search_keyword(text1, text2, keyword)
-
-    return {
+    if lazy:
+        # Étape mesurée pendant la consommation du générateur (écriture du rapport)
+        word_level_diffs = profile_iterator("compare_words_in_line",
+                                            iter_word_level_differences(line_comp['diff'], workers),
+                                            lines=len(line_comp['diff']))
+    else:
+        with stage("compare_words_in_line", lines=len(line_comp['diff'])):
+            word_level_diffs = list(iter_word_level_differences(line_comp['diff'], workers))
+
+    with stage("calculate_similarity_rate"):
+        similarity = calculate_similarity_rate(doc1, doc2, line_comp)
+    with stage("identify_unique_words"):
+        uniques = identify_unique_words(doc1, doc2)
+    keyword_search = None
+    if keyword is not None:
+        with stage("search_keyword"):
+            keyword_search = search_keyword(doc1, doc2, keyword)
+
+    results = {
         "line_comparison": line_comp,
         "word_level_differences": word_level_diffs,
         "similarity_rate": similarity,
         "unique_words": uniques,
         "keyword_search": keyword_search
     }
+    if keywords:
+        keywords = list(keywords)
+        with stage("search_keywords", keywords=len(keywords)):
+            results["keyword_searches"] = search_keywords(doc1, doc2, keywords)
+    if metrics is not None:
+        metrics = list(metrics)
+        with stage("similarity_metrics", metrics=len(metrics)):
+            results["similarity_metrics"] = compute_similarity_metrics(doc1, doc2, metrics, line_comp)
+    return results
 
 if __name__ == "__main__":
     t1 = "Le chat mange une souris"
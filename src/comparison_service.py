@@ -0,0 +1,533 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import signal
+import time
+from collections import deque
+
+from batch_comparison import load_document
+from comparison_engine import compare_documents
+from document_cache import file_content_hash
+from report_generator import generate_report
+from similarity_metrics import SIMILARITY_METRICS
+from text_preprocessor import COMPARISON_MODES, preprocess_lines
+from tokenized_document import tokenize_documents
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Nombre de comparaisons en attente d'un processus au-delà duquel les nouvelles
+# requêtes sont refusées (503) au lieu d'allonger indéfiniment la file
+DEFAULT_MAX_QUEUE = 64
+# Nombre de mesures conservées pour le calcul des latences
+LATENCY_WINDOW = 1024
+# Taille maximale du corps d'une requête HTTP
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error",
+    503: "Service Unavailable"
+}
+
+class ServiceOverloaded(Exception):
+    """
+    Levée lorsque la file d'attente du service est pleine.
+    """
+
+# Tâches exécutées dans les processus du pool : fonctions de module, pour pouvoir
+# être transmises aux processus par pickle.
+
+def _init_worker() -> None:
+    # Ctrl+C est traité par le processus principal, qui arrête le pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _load_job(document: dict, mode: str, cache_dir: str | None) -> str | None:
+    if "path" in document:
+        return load_document(document["path"], mode, cache_dir)
+    return preprocess_lines(document["text"], **COMPARISON_MODES[mode])
+
+def _compare_job(
+        text1: str,
+        text2: str,
+        keywords: list[str],
+        metrics: list[str] | None,
+        report_format: str
+    ) -> tuple[bool, str]:
+    doc1, doc2 = tokenize_documents(text1, text2)
+    # Déjà dans un processus du pool : pas de second niveau de processus
+    results = compare_documents(doc1, doc2, None, keywords, lazy=report_format == "text", metrics=metrics,
+                                workers=1)
+    identical = all(hunk[0] == 'equal' for hunk in results["line_comparison"]["hunks"])
+    if report_format == "text":
+        return identical, generate_report(results)
+    results["identical"] = identical
+    # Sérialisation faite dans le processus de travail, pas dans la boucle d'événements
+    return identical, json.dumps(results, ensure_ascii=False)
+
+class _RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, bytes]:
+    # Ligne de requête, en-têtes, puis corps de Content-Length octets
+    request_line = (await reader.readline()).decode('latin-1').split()
+    if len(request_line) != 3:
+        raise _RequestError(400, "Requête HTTP invalide")
+    method, target, _ = request_line
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise _RequestError(400, "En-tête Content-Length invalide")
+    if length > MAX_BODY_SIZE:
+        raise _RequestError(413, "Corps de requête trop volumineux")
+    try:
+        body = await reader.readexactly(length) if length else b""
+    except asyncio.IncompleteReadError:
+        raise _RequestError(400, "Corps de requête incomplet")
+    return method.upper(), target, body
+
+def _latency_summary(values: deque) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 6),
+        "p50": round(ordered[len(ordered) // 2], 6),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 6),
+        "max": round(ordered[-1], 6)
+    }
+
+class ComparisonService:
+    """
+    Service de comparaison asynchrone (asyncio). L'extraction des documents
+    (PDF compris) et la comparaison s'exécutent dans un pool de processus, si
+    bien que la boucle d'événements n'est jamais bloquée :
+
+        async with ComparisonService(workers=4) as service:
+            identical, body = await service.compare({"path": "a.pdf"}, {"path": "b.pdf"})
+
+    - au plus max_jobs comparaisons s'exécutent en même temps (sémaphore) ;
+      au-delà, les requêtes attendent dans une file de max_queue places, puis
+      sont refusées (ServiceOverloaded),
+    - les requêtes simultanées portant sur les mêmes contenus (empreinte
+      SHA-256) partagent une seule extraction et une seule comparaison,
+    - metrics() expose la profondeur de la file et les latences.
+
+    serve() publie le service en HTTP, sur un port TCP ou une socket Unix.
+    Un document {'path': ...} est lu sur la machine du service et son contenu
+    revient dans la réponse : avec root=None, tout fichier lisible par le
+    processus est exposé aux clients. Passer root pour limiter les chemins
+    acceptés à un répertoire.
+    """
+
+    def __init__(
+            self,
+            workers: int | None = None,
+            max_jobs: int | None = None,
+            max_queue: int = DEFAULT_MAX_QUEUE,
+            cache_dir: str | None = None,
+            root: str | None = None
+        ):
+        """
+        :param workers: Nombre de processus du pool (None = tous les cœurs).
+        :param max_jobs: Nombre maximal de comparaisons simultanées (None = workers).
+        :param max_queue: Nombre maximal de comparaisons en attente.
+        :param cache_dir: Répertoire du cache des documents, ou None.
+        :param root: Répertoire hors duquel les chemins de documents sont refusés,
+                     ou None pour accepter tout chemin.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_jobs = max_jobs or self.workers
+        self.max_queue = max_queue
+        self.cache_dir = cache_dir
+        self.root = os.path.realpath(root) if root is not None else None
+        self._executor = None
+        self._slots = asyncio.Semaphore(self.max_jobs)
+        self._running = 0
+        # Tâches en cours partagées entre requêtes identiques ; une comparaison
+        # admise y figure jusqu'à sa fin, en attente ou en cours d'exécution
+        self._comparisons = {}
+        self._documents = {}
+        self._counters = {
+            "requests": 0, "completed": 0, "failed": 0, "rejected": 0,
+            "deduplicated_comparisons": 0, "deduplicated_documents": 0
+        }
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._queue_waits = deque(maxlen=LATENCY_WINDOW)
+
+    async def __aenter__(self) -> "ComparisonService":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def start(self) -> None:
+        """
+        Démarre le pool de processus.
+        """
+        if self._executor is None:
+            # Imports différés, comme dans batch_comparison
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # Les processus sont créés à la première tâche, alors que des threads
+            # (calcul des empreintes) tournent déjà : un fork pourrait hériter
+            # d'un verrou pris. forkserver les crée depuis un processus sans thread.
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                 initializer=_init_worker)
+
+    async def close(self) -> None:
+        """
+        Arrête le pool de processus après la fin des tâches en cours.
+        """
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown)
+
+    def _shared(self, table: dict, key: tuple, counter: str, factory) -> asyncio.Future:
+        # Renvoie la tâche en cours pour cette clé, ou en crée une
+        task = table.get(key)
+        if task is not None:
+            self._counters[counter] += 1
+            return asyncio.shield(task)
+        task = asyncio.ensure_future(factory())
+        table[key] = task
+
+        def done(finished: asyncio.Future) -> None:
+            table.pop(key, None)
+            # Évite l'avertissement « exception never retrieved » si plus personne n'attend
+            if not finished.cancelled():
+                finished.exception()
+
+        task.add_done_callback(done)
+        # shield : l'abandon d'une requête n'annule pas le travail partagé avec les autres
+        return asyncio.shield(task)
+
+    def _checked_document(self, document: dict) -> dict:
+        # Résout le chemin (liens symboliques, '..') avant toute lecture : c'est
+        # ce chemin résolu, vérifié, que liront les processus du pool
+        if not isinstance(document, dict) or "path" not in document:
+            return document
+        path = document["path"]
+        if not isinstance(path, str):
+            raise ValueError("Le chemin d'un document doit être une chaîne")
+        if self.root is None:
+            return document
+        resolved = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath((self.root, resolved)) != self.root:
+            raise ValueError(f"Chemin hors du répertoire autorisé : {path}")
+        return {"path": resolved}
+
+    async def _document_hash(self, document: dict) -> str:
+        if not isinstance(document, dict):
+            raise ValueError("Chaque document doit être décrit par 'path' ou 'text'")
+        if "path" in document:
+            try:
+                return await asyncio.to_thread(file_content_hash, document["path"])
+            except OSError:
+                raise ValueError(f"Impossible de lire le document : {document['path']}")
+        if "text" in document and isinstance(document["text"], str):
+            return await asyncio.to_thread(lambda: hashlib.sha256(document["text"].encode('utf-8')).hexdigest())
+        raise ValueError("Chaque document doit être décrit par 'path' ou 'text'")
+
+    async def _load(self, document: dict, mode: str) -> str:
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(self._executor, _load_job, document, mode, self.cache_dir)
+        if text is None:
+            raise ValueError(f"Impossible de lire le document : {document.get('path', '<texte>')}")
+        return text
+
+    async def _run(
+            self,
+            documents: tuple[tuple[dict, str], tuple[dict, str]],
+            mode: str,
+            keywords: list[str],
+            metrics: list[str] | None,
+            report_format: str
+        ) -> tuple[bool, str]:
+        queued = time.perf_counter()
+        await self._slots.acquire()
+        self._queue_waits.append(time.perf_counter() - queued)
+
+        self._running += 1
+        try:
+            text1, text2 = await asyncio.gather(*(
+                self._shared(self._documents, (content_hash, mode), "deduplicated_documents",
+                             lambda document=document: self._load(document, mode))
+                for document, content_hash in documents
+            ))
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, _compare_job, text1, text2, keywords, metrics,
+                                              report_format)
+        finally:
+            self._running -= 1
+            self._slots.release()
+
+    async def compare(
+            self,
+            document1: dict,
+            document2: dict,
+            mode: str = "souple",
+            keywords: list[str] | None = None,
+            report_format: str = "json",
+            metrics: list[str] | None = None
+        ) -> tuple[bool, str]:
+        """
+        Compare deux documents dans le pool de processus.
+
+        :param document1: {'path': chemin (.txt ou .pdf), relatif à root le cas
+                          échéant} ou {'text': texte brut}.
+        :param document2: Idem pour le second document.
+        :param mode: Mode de comparaison ('souple' ou 'strict').
+        :param keywords: Mots-clés à rechercher dans les deux documents.
+        :param report_format: 'json' (résultats de compare_documents sérialisés,
+                              avec la clé 'identical') ou 'text' (rapport texte).
+        :param metrics: Mesures de similarité supplémentaires (voir similarity_metrics).
+        :return: Tuple (documents identiques, résultat sérialisé).
+        :raises ValueError: Si la requête est invalide, un document illisible ou
+                            son chemin hors de root.
+        :raises ServiceOverloaded: Si la file d'attente est pleine.
+        """
+        if self._executor is None:
+            raise RuntimeError("Le service n'est pas démarré (start())")
+        start = time.perf_counter()
+        self._counters["requests"] += 1
+        try:
+            if mode not in COMPARISON_MODES:
+                raise ValueError(f"Mode de comparaison inconnu : {mode}")
+            if report_format not in ("json", "text"):
+                raise ValueError(f"Format de résultat inconnu : {report_format}")
+            keywords = [keyword for keyword in (keywords or []) if isinstance(keyword, str) and keyword.strip()]
+            if metrics is not None:
+                metrics = list(metrics)
+                unknown = [name for name in metrics if name not in SIMILARITY_METRICS]
+                if unknown:
+                    raise ValueError(f"Mesure(s) de similarité inconnue(s) : {', '.join(map(str, unknown))}")
+
+            document1, document2 = self._checked_document(document1), self._checked_document(document2)
+            hash1, hash2 = await asyncio.gather(self._document_hash(document1), self._document_hash(document2))
+            key = (hash1, hash2, mode, tuple(keywords), tuple(metrics or ()), report_format)
+            if key not in self._comparisons and len(self._comparisons) >= self.max_jobs + self.max_queue:
+                self._counters["rejected"] += 1
+                raise ServiceOverloaded("File d'attente du service pleine")
+
+            result = await self._shared(
+                self._comparisons, key, "deduplicated_comparisons",
+                lambda: self._run(((document1, hash1), (document2, hash2)), mode, keywords, metrics,
+                                  report_format)
+            )
+        except ServiceOverloaded:
+            raise
+        except BaseException:
+            self._counters["failed"] += 1
+            raise
+        self._counters["completed"] += 1
+        self._latencies.append(time.perf_counter() - start)
+        return result
+
+    def metrics(self) -> dict:
+        """
+        :return: Profondeur de la file, comparaisons en cours, compteurs de
+                 requêtes et latences (secondes) : 'latency' de bout en bout,
+                 'queue_wait' entre l'arrivée et l'obtention d'une place.
+        """
+        return {
+            "queue_depth": len(self._comparisons) - self._running,
+            "in_flight": self._running,
+            "max_jobs": self.max_jobs,
+            "max_queue": self.max_queue,
+            "workers": self.workers,
+            **self._counters,
+            "latency": _latency_summary(self._latencies),
+            "queue_wait": _latency_summary(self._queue_waits)
+        }
+
+    async def _respond(self, method: str, target: str, body: bytes) -> tuple[int, str, str]:
+        path = target.split("?", 1)[0]
+        if path == "/health":
+            return 200, "application/json", json.dumps({"status": "ok"})
+        if path == "/metrics":
+            return 200, "application/json", json.dumps(self.metrics())
+        if path != "/compare":
+            return 404, "application/json", json.dumps({"error": f"Ressource inconnue : {path}"})
+        if method != "POST":
+            return 405, "application/json", json.dumps({"error": "Utiliser POST"})
+
+        try:
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("Le corps de la requête doit être un objet JSON")
+            document1 = request.get("document1")
+            document2 = request.get("document2")
+            if not isinstance(document1, dict) or not isinstance(document2, dict):
+                raise ValueError("Champs 'document1' et 'document2' obligatoires")
+            report_format = request.get("format", "json")
+            _, result = await self.compare(document1, document2, request.get("mode", "souple"),
+                                           request.get("keywords"), report_format, request.get("metrics"))
+        except ServiceOverloaded as e:
+            return 503, "application/json", json.dumps({"error": str(e)}, ensure_ascii=False)
+        except ValueError as e:
+            # json.JSONDecodeError dérive de ValueError
+            if str(e).startswith("Impossible de lire"):
+                status = 422
+            elif str(e).startswith("Chemin hors"):
+                status = 403
+            else:
+                status = 400
+            return status, "application/json", json.dumps({"error": str(e)}, ensure_ascii=False)
+        content_type = "text/plain" if report_format == "text" else "application/json"
+        return 200, content_type, result
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Traite une requête HTTP/1.1 (une requête par connexion). Routes :
+        GET /health, GET /metrics et POST /compare, dont le corps JSON contient
+        'document1', 'document2' ({'path': ...} ou {'text': ...}) et, en option,
+        'mode', 'keywords' (liste), 'metrics' (liste) et 'format' ('json' ou 'text').
+        """
+        try:
+            try:
+                method, target, body = await _read_request(reader)
+                status, content_type, payload = await self._respond(method, target, body)
+            except _RequestError as e:
+                status, content_type, payload = e.status, "application/json", json.dumps({"error": str(e)})
+            except Exception as e:
+                status, content_type, payload = 500, "application/json", json.dumps({"error": str(e)})
+            data = payload.encode('utf-8')
+            headers = [
+                f"HTTP/1.1 {status} {_REASONS[status]}",
+                f"Content-Type: {content_type}; charset=utf-8",
+                f"Content-Length: {len(data)}",
+                "Connection: close"
+            ]
+            if status == 503:
+                headers.append("Retry-After: 1")
+            writer.write(("\r\n".join(headers) + "\r\n\r\n").encode('latin-1') + data)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(
+            self,
+            host: str = DEFAULT_HOST,
+            port: int = DEFAULT_PORT,
+            unix_socket: str | None = None
+        ) -> asyncio.AbstractServer:
+        """
+        Démarre le pool et publie le service en HTTP.
+
+        :param host: Adresse d'écoute TCP.
+        :param port: Port TCP (0 : port libre choisi par le système).
+        :param unix_socket: Chemin d'une socket Unix, utilisée à la place de TCP.
+        :return: Serveur asyncio démarré.
+        """
+        self.start()
+        if unix_socket is not None:
+            return await asyncio.start_unix_server(self.handle_connection, path=unix_socket)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+async def send_request(
+        method: str,
+        target: str,
+        payload: dict | None = None,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        unix_socket: str | None = None
+    ) -> tuple[int, dict | str]:
+    """
+    Client minimal du service, pour les scripts et les tests locaux.
+
+        status, result = await send_request("POST", "/compare",
+                                            {"document1": {"path": "a.txt"}, "document2": {"path": "b.txt"}})
+
+    :param method: Méthode HTTP ('GET' ou 'POST').
+    :param target: Chemin de la ressource ('/compare', '/metrics', '/health').
+    :param payload: Corps JSON de la requête.
+    :param host: Adresse du service.
+    :param port: Port du service.
+    :param unix_socket: Chemin de la socket Unix du service, à la place de TCP.
+    :return: Tuple (code HTTP, réponse décodée : dictionnaire pour du JSON, texte sinon).
+    """
+    if unix_socket is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_socket)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else b""
+        request = (f"{method} {target} HTTP/1.1\r\nHost: {host}\r\n"
+                   f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                   "Connection: close\r\n\r\n")
+        writer.write(request.encode('latin-1') + body)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+
+    head, _, data = response.partition(b"\r\n\r\n")
+    lines = head.decode('latin-1').split("\r\n")
+    status = int(lines[0].split()[1])
+    text = data.decode('utf-8')
+    if any(line.lower().startswith("content-type: application/json") for line in lines[1:]):
+        return status, json.loads(text)
+    return status, text
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Construit l'analyseur des arguments de la ligne de commande du service.
+    """
+    parser = argparse.ArgumentParser(
+        prog="doc-compare-service",
+        description="Service HTTP de comparaison de documents (POST /compare, GET /metrics, GET /health)."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help=f"adresse d'écoute (défaut : {DEFAULT_HOST}) ; les clients peuvent faire lire "
+                             "au service tout fichier .txt ou .pdf situé sous --root")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port d'écoute (défaut : {DEFAULT_PORT})")
+    parser.add_argument("--unix-socket", default=None, help="écoute sur une socket Unix plutôt qu'en TCP")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="nombre de processus de travail (défaut : nombre de cœurs)")
+    parser.add_argument("--max-jobs", type=int, default=None,
+                        help="comparaisons simultanées au maximum (défaut : --workers)")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help=f"comparaisons en attente au maximum (défaut : {DEFAULT_MAX_QUEUE})")
+    parser.add_argument("--cache-dir", default=None, help="répertoire du cache des documents prétraités")
+    parser.add_argument("--root", default=".",
+                        help="seul répertoire dont les documents désignés par 'path' peuvent être lus ; "
+                             "les chemins relatifs y sont résolus (défaut : répertoire courant)")
+    return parser
+
+async def _serve_forever(args: argparse.Namespace) -> None:
+    async with ComparisonService(args.workers, args.max_jobs, args.max_queue, args.cache_dir,
+                                 args.root) as service:
+        server = await service.serve(args.host, args.port, args.unix_socket)
+        where = args.unix_socket or f"http://{args.host}:{args.port}"
+        print(f"Service de comparaison à l'écoute sur {where}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+from collections import Counter
+from collections.abc import Iterable
+
+from comparison_engine import calculate_similarity_rate, compare_documents, compare_words_in_line, split_hunk
+from sequence_alignment import align_lines
+
+# Échange des rôles des deux textes dans un bloc d'alignement
+_SWAPPED_TAGS = {'equal': 'equal', 'replace': 'replace', 'delete': 'insert', 'insert': 'delete'}
+
+def _hunk_counts(hunk: tuple[str, int, int, int, int]) -> tuple[int, int, int, int]:
+    """
+    Nombre d'éléments que split_hunk produit pour un bloc, calculé à partir de
+    ses seules bornes.
+    """
+    tag, i1, i2, j1, j2 = hunk
+    if tag == 'equal':
+        return i2 - i1, 0, 0, 0
+    if tag == 'delete':
+        return 0, 0, i2 - i1, 0
+    if tag == 'insert':
+        return 0, 0, 0, j2 - j1
+    size = min(i2 - i1, j2 - j1)
+    return 0, size, i2 - i1 - size, j2 - j1 - size
+
+def _merge_equal_hunks(hunks: list[tuple]) -> list[tuple]:
+    """
+    Supprime les blocs vides et fusionne les blocs 'equal' consécutifs.
+    """
+    merged = []
+    for hunk in hunks:
+        tag, i1, i2, j1, j2 = hunk
+        if i1 == i2 and j1 == j2:
+            continue
+        if tag == 'equal' and merged and merged[-1][0] == 'equal':
+            merged[-1] = ('equal', merged[-1][1], i2, merged[-1][3], j2)
+        else:
+            merged.append(hunk)
+    return merged
+
+class ComparisonSession:
+    """
+    Comparaison de deux documents maintenue d'une modification à l'autre.
+
+    La session conserve les lignes et leurs empreintes, l'alignement (blocs de
+    compare_lines) et le nombre d'occurrences de chaque mot. Après une
+    modification, seule la zone touchée (étendue aux blocs de différences
+    voisins) est réalignée ; line_comparison, word_level_differences, le taux
+    de similarité et les mots uniques sont corrigés sur place. Le coût d'une
+    mise à jour dépend de la taille de la modification et du nombre de blocs de
+    différences, pas de la longueur des documents.
+
+    L'alignement obtenu est local à la zone modifiée : il peut différer de celui
+    d'une comparaison complète lorsque la modification déplace des lignes loin
+    de leur position d'origine.
+    """
+
+    def __init__(self, text1: str, text2: str):
+        """
+        :param text1: Premier texte (prétraité, lignes séparées par '\\n').
+        :param text2: Deuxième texte.
+        """
+        self.results = compare_documents(text1, text2, None)
+        self.results["line_comparison"]["hunks"] = list(self.results["line_comparison"]["hunks"])
+        self._lines = [text1.splitlines(), text2.splitlines()]
+        self._hashes = [list(map(hash, lines)) for lines in self._lines]
+        self._word_counts = [
+            Counter(word for line in lines for word in line.lower().split())
+            for lines in self._lines
+        ]
+        uniques = self.results["unique_words"]
+        self._only_in = [set(uniques["only_in_text1"]), set(uniques["only_in_text2"])]
+
+    def lines(self, side: int) -> list[str]:
+        """
+        :param side: 1 pour le premier texte, 2 pour le second.
+        :return: Lignes actuelles du texte (à ne pas modifier directement).
+        """
+        return self._lines[side - 1]
+
+    def text(self, side: int) -> str:
+        """
+        :param side: 1 pour le premier texte, 2 pour le second.
+        :return: Texte actuel.
+        """
+        return "\n".join(self._lines[side - 1])
+
+    def update(self, side: int, text: str) -> dict:
+        """
+        Remplace l'un des deux textes par sa nouvelle version. Les lignes
+        inchangées en début et en fin de texte sont repérées grâce aux
+        empreintes des lignes ; seule la zone intermédiaire est recomparée.
+
+        :param side: 1 pour le premier texte, 2 pour le second.
+        :param text: Nouvelle version du texte.
+        :return: Résultats mis à jour (au format de compare_documents).
+        """
+        old_lines = self._lines[side - 1]
+        old_hashes = self._hashes[side - 1]
+        new_lines = text.splitlines()
+        new_hashes = list(map(hash, new_lines))
+
+        limit = min(len(old_lines), len(new_lines))
+        prefix = 0
+        while (prefix < limit and old_hashes[prefix] == new_hashes[prefix]
+               and old_lines[prefix] == new_lines[prefix]):
+            prefix += 1
+        suffix = 0
+        while (suffix < limit - prefix and old_hashes[-1 - suffix] == new_hashes[-1 - suffix]
+               and old_lines[-1 - suffix] == new_lines[-1 - suffix]):
+            suffix += 1
+
+        if prefix == len(old_lines) == len(new_lines):
+            return self.results
+        return self.replace_lines(side, prefix, len(old_lines) - suffix,
+                                  new_lines[prefix:len(new_lines) - suffix])
+
+    def replace_lines(self, side: int, start: int, stop: int, new_lines: Iterable[str]) -> dict:
+        """
+        Remplace les lignes [start, stop[ de l'un des deux textes et met à jour
+        la comparaison.
+
+        :param side: 1 pour le premier texte, 2 pour le second.
+        :param start: Indice (à partir de 0) de la première ligne remplacée.
+        :param stop: Indice de fin (exclu) des lignes remplacées ; start == stop pour une insertion.
+        :param new_lines: Nouvelles lignes.
+        :return: Résultats mis à jour (au format de compare_documents).
+        :raises IndexError: Si l'intervalle ne correspond pas à des lignes du texte.
+        """
+        s = side - 1
+        lines = self._lines[s]
+        if not 0 <= start <= stop <= len(lines):
+            raise IndexError(f"Lignes {start}:{stop} hors du texte {side} ({len(lines)} lignes)")
+        new_lines = list(new_lines)
+        delta = len(new_lines) - (stop - start)
+
+        self._update_word_counts(s, lines[start:stop], new_lines)
+        p, q, region = self._dirty_region(s, start, stop)
+
+        lines[start:stop] = new_lines
+        self._hashes[s][start:stop] = map(hash, new_lines)
+        self._patch(s, p, q, region, start, stop, delta)
+        return self.results
+
+    def _dirty_region(self, s: int, start: int, stop: int) -> tuple[int, int, tuple]:
+        """
+        Détermine les blocs [p, q[ touchés par la modification des lignes
+        [start, stop[ du texte s, ainsi que la zone à réaligner
+        (début et fin dans le texte modifié, début et fin dans l'autre texte).
+        """
+        hunks = self.results["line_comparison"]["hunks"]
+        lo, hi = (1, 2) if s == 0 else (3, 4)
+        other_lo, other_hi = (3, 4) if s == 0 else (1, 2)
+
+        p = q = None
+        for k, hunk in enumerate(hunks):
+            hunk_lo, hunk_hi = hunk[lo], hunk[hi]
+            if hunk_lo > stop:
+                break
+            if hunk[0] == 'equal':
+                touched = hunk_lo < stop and hunk_hi > start
+            else:
+                # Les blocs de différences voisins sont réalignés avec la modification
+                touched = hunk_hi >= start
+            if touched:
+                if p is None:
+                    p = k
+                q = k + 1
+
+        if p is None:
+            # Insertion à la frontière de deux blocs (ou dans un texte vide)
+            p = q = next((k for k, hunk in enumerate(hunks) if hunk[lo] >= start), len(hunks))
+            other = hunks[p][other_lo] if p < len(hunks) else len(self._lines[1 - s])
+            return p, q, (start, stop, other, other)
+
+        first, last = hunks[p], hunks[q - 1]
+        if first[0] == 'equal':
+            region_start, other_start = start, first[other_lo] + (start - first[lo])
+        else:
+            region_start, other_start = first[lo], first[other_lo]
+        if last[0] == 'equal':
+            region_stop, other_stop = stop, last[other_lo] + (stop - last[lo])
+        else:
+            region_stop, other_stop = last[hi], last[other_hi]
+        return p, q, (region_start, region_stop, other_start, other_stop)
+
+    def _patch(self, s: int, p: int, q: int, region: tuple, start: int, stop: int, delta: int) -> None:
+        """
+        Réaligne la zone modifiée et remplace les blocs [p, q[ (et les résultats
+        qui en découlent) par ceux de la nouvelle zone.
+        """
+        line_comp = self.results["line_comparison"]
+        hunks = line_comp["hunks"]
+        lines1, lines2 = self._lines
+
+        def oriented(tag: str, s1: int, s2: int, o1: int, o2: int) -> tuple:
+            # Bloc exprimé dans le sens (texte modifié, autre texte) -> sens (texte 1, texte 2)
+            if s == 0:
+                return (tag, s1, s2, o1, o2)
+            return (_SWAPPED_TAGS[tag], o1, o2, s1, s2)
+
+        def side_bounds(hunk: tuple) -> tuple:
+            # Bloc exprimé dans le sens (texte modifié, autre texte)
+            tag, i1, i2, j1, j2 = hunk
+            return (tag, i1, i2, j1, j2) if s == 0 else (_SWAPPED_TAGS[tag], j1, j2, i1, i2)
+
+        region_start, region_stop, other_start, other_stop = region
+        middle = []
+        if p < q:
+            tag, s1, s2, o1, o2 = side_bounds(hunks[p])
+            if tag == 'equal' and s1 < start:
+                middle.append(oriented('equal', s1, start, o1, o1 + (start - s1)))
+
+        # Réalignement de la seule zone modifiée
+        if s == 0:
+            lo1, hi1, lo2, hi2 = region_start, region_stop + delta, other_start, other_stop
+        else:
+            lo1, hi1, lo2, hi2 = other_start, other_stop, region_start, region_stop + delta
+        for tag, i1, i2, j1, j2 in align_lines(lines1[lo1:hi1], lines2[lo2:hi2]):
+            middle.append((tag, i1 + lo1, i2 + lo1, j1 + lo2, j2 + lo2))
+
+        if p < q:
+            tag, s1, s2, o1, o2 = side_bounds(hunks[q - 1])
+            if tag == 'equal' and s2 > stop:
+                middle.append(oriented('equal', stop + delta, s2 + delta, o1 + (stop - s1), o2))
+
+        # Les blocs voisins sont inclus pour fusionner les blocs 'equal' contigus
+        lo_k = max(p - 1, 0)
+        hi_k = min(q + 1, len(hunks))
+        old_hunks = hunks[lo_k:hi_k]
+        segment = hunks[lo_k:p] + middle + [self._shift(hunk, s, delta) for hunk in hunks[q:hi_k]]
+        new_hunks = _merge_equal_hunks(segment)
+
+        # Position des résultats des blocs remplacés dans les listes de line_comparison
+        offsets = [0, 0, 0, 0]
+        for hunk in hunks[:lo_k]:
+            for index, count in enumerate(_hunk_counts(hunk)):
+                offsets[index] += count
+        old_sizes = [0, 0, 0, 0]
+        for hunk in old_hunks:
+            for index, count in enumerate(_hunk_counts(hunk)):
+                old_sizes[index] += count
+
+        parts = ([], [], [], [])
+        for hunk in new_hunks:
+            for part, items in zip(parts, split_hunk(hunk, lines1, lines2)):
+                part.extend(items)
+
+        keys = ("common", "diff", "unique_to_text1", "unique_to_text2")
+        for key, offset, size, part in zip(keys, offsets, old_sizes, parts):
+            line_comp[key][offset:offset + size] = part
+
+        # Différences mot à mot : seules les paires de lignes nouvelles sont recalculées
+        word_diffs = self.results["word_level_differences"]
+        offset, size = offsets[1], old_sizes[1]
+        known = {(entry["line_text1"], entry["line_text2"]): entry for entry in word_diffs[offset:offset + size]}
+        word_diffs[offset:offset + size] = [
+            known.get((l1, l2)) or {"line_text1": l1, "line_text2": l2, "word_diff": compare_words_in_line(l1, l2)}
+            for l1, l2 in parts[1]
+        ]
+
+        hunks[lo_k:hi_k] = new_hunks
+        if delta:
+            for k in range(lo_k + len(new_hunks), len(hunks)):
+                hunks[k] = self._shift(hunks[k], s, delta)
+
+        self.results["similarity_rate"] = calculate_similarity_rate(lines1, lines2, line_comp)
+
+    @staticmethod
+    def _shift(hunk: tuple, s: int, delta: int) -> tuple:
+        tag, i1, i2, j1, j2 = hunk
+        if s == 0:
+            return (tag, i1 + delta, i2 + delta, j1, j2)
+        return (tag, i1, i2, j1 + delta, j2 + delta)
+
+    def _update_word_counts(self, s: int, old_lines: list[str], new_lines: list[str]) -> None:
+        """
+        Met à jour le nombre d'occurrences des mots (en minuscules) du texte s
+        et les ensembles de mots uniques à chaque texte.
+        """
+        counts = self._word_counts[s]
+        changed = set()
+        for line in old_lines:
+            for word in line.lower().split():
+                counts[word] -= 1
+                if not counts[word]:
+                    del counts[word]
+                    changed.add(word)
+        for line in new_lines:
+            for word in line.lower().split():
+                if word not in counts:
+                    changed.add(word)
+                counts[word] += 1
+
+        if not changed:
+            return
+        counts1, counts2 = self._word_counts
+        only1, only2 = self._only_in
+        for word in changed:
+            in1 = word in counts1
+            in2 = word in counts2
+            if in1 and not in2:
+                only1.add(word)
+            else:
+                only1.discard(word)
+            if in2 and not in1:
+                only2.add(word)
+            else:
+                only2.discard(word)
+        self.results["unique_words"] = {"only_in_text1": list(only1), "only_in_text2": list(only2)}
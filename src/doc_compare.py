@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import sys
+
+from batch_comparison import load_document
+from comparison_engine import compare_documents
+from external_comparison import ExternalDocument
+from profiling import Profiler
+from report_generator import write_report
+from result_export import write_binary, write_jsonl
+from similarity_metrics import SIMILARITY_METRICS
+from text_preprocessor import COMPARISON_MODES
+from tokenized_document import tokenize_documents
+
+# Codes de sortie, à la manière de diff : 0 identiques, 1 différents, 2 erreur
+EXIT_IDENTICAL = 0
+EXIT_DIFFERENT = 1
+EXIT_ERROR = 2
+
+# Taille du tampon d'écriture du fichier de sortie
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Construit l'analyseur des arguments de la ligne de commande.
+    """
+    parser = argparse.ArgumentParser(
+        prog="doc-compare",
+        description=(
+            "Compare deux documents (.txt ou .pdf) et affiche le rapport de comparaison. "
+            "Code de sortie : 0 si les documents sont identiques, 1 s'ils diffèrent, 2 en cas d'erreur."
+        )
+    )
+    parser.add_argument("file1", help="premier document")
+    parser.add_argument("file2", help="second document")
+    parser.add_argument("--mode", choices=sorted(COMPARISON_MODES), default="souple",
+                        help="mode de comparaison (défaut : souple)")
+    parser.add_argument("--keywords", default="", help="mots-clés à rechercher, séparés par des virgules")
+    parser.add_argument("--metrics", default="",
+                        help="mesures de similarité supplémentaires, séparées par des virgules "
+                             f"({', '.join(sorted(SIMILARITY_METRICS))})")
+    parser.add_argument("--detect-moves", action="store_true",
+                        help="reconnaît les blocs de lignes déplacés au lieu de les signaler comme supprimés puis insérés")
+    parser.add_argument("--format", choices=("text", "json", "jsonl", "binary"), default="text",
+                        help="format de sortie : rapport texte, JSON complet, JSON Lines compact "
+                             "ou binaire indexé (--output obligatoire) (défaut : text)")
+    parser.add_argument("--output", default="-", help="fichier de sortie (défaut : sortie standard)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="nombre de processus pour l'extraction des PDF et la comparaison mot à mot "
+                             "des lignes modifiées, utilisés seulement pour les gros documents "
+                             "(défaut : nombre de cœurs ; 1 = en série)")
+    parser.add_argument("--cache-dir", default=None, help="répertoire du cache des documents prétraités")
+    parser.add_argument("--memory-limit", metavar="MO", type=int, default=None,
+                        help="compare hors mémoire deux fichiers .txt de taille quelconque, tels quels "
+                             "(équivalent du mode strict), avec ce plafond de mémoire de travail en Mo")
+    parser.add_argument("--temp-dir", default=None,
+                        help="répertoire des fichiers temporaires de --memory-limit (défaut : celui du système)")
+    parser.add_argument("--profile", metavar="FICHIER", default=None,
+                        help="enregistre le temps de chaque étape au format JSON")
+    parser.add_argument("--trace", metavar="FICHIER", default=None,
+                        help="enregistre le temps de chaque étape au format Chrome trace (chrome://tracing)")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="mesure aussi les allocations de chaque étape (plus lent)")
+    return parser
+
+def _split_list(value: str) -> list[str]:
+    # Liste d'options séparées par des virgules
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.format == "binary" and args.output == "-":
+        parser.error("le format binary nécessite --output FICHIER")
+    unknown = [name for name in _split_list(args.metrics) if name not in SIMILARITY_METRICS]
+    if unknown:
+        parser.error(f"mesure(s) de similarité inconnue(s) : {', '.join(unknown)}")
+    if args.memory_limit is not None:
+        if args.memory_limit <= 0:
+            parser.error("--memory-limit doit être un nombre de Mo positif")
+        if args.keywords or args.detect_moves or args.format == "json" or set(_split_list(args.metrics)) - {"lines"}:
+            parser.error("--memory-limit est incompatible avec --keywords, --detect-moves, "
+                         "--format json et les mesures autres que 'lines'")
+    if not (args.profile or args.trace):
+        return run(args)
+
+    with Profiler(track_allocations=args.profile_memory) as profiler:
+        status = run(args)
+    try:
+        if args.profile:
+            profiler.export_json(args.profile)
+        if args.trace:
+            profiler.export_chrome_trace(args.trace)
+    except OSError as e:
+        print(f"Erreur lors de l'écriture du profil : {e}", file=sys.stderr)
+        return EXIT_ERROR
+    return status
+
+def run(args: argparse.Namespace) -> int:
+    """
+    Compare les deux documents désignés par les arguments et écrit le rapport.
+
+    :param args: Arguments analysés par build_parser().
+    :return: Code de sortie (EXIT_IDENTICAL, EXIT_DIFFERENT ou EXIT_ERROR).
+    """
+    keywords = _split_list(args.keywords)
+    metrics = _split_list(args.metrics)
+    if args.memory_limit is not None:
+        return run_external(args, metrics)
+
+    texts = []
+    for path in (args.file1, args.file2):
+        text = load_document(path, args.mode, args.cache_dir, args.workers)
+        if text is None:
+            print(f"Erreur : impossible de lire '{path}' (fichier absent ou format non supporté)",
+                  file=sys.stderr)
+            return EXIT_ERROR
+        texts.append(text)
+
+    doc1, doc2 = tokenize_documents(*texts)
+    # Hors JSON complet, les différences mot à mot sont calculées pendant l'écriture
+    results = compare_documents(doc1, doc2, None, keywords, lazy=args.format != "json",
+                                metrics=metrics or None, detect_moves=args.detect_moves,
+                                workers=args.workers)
+    return write_results(results, args)
+
+def run_external(args: argparse.Namespace, metrics: list[str]) -> int:
+    """
+    Compare hors mémoire (external_comparison.ExternalDocument) les deux fichiers
+    désignés par les arguments et écrit le rapport.
+
+    :param args: Arguments analysés par build_parser() (avec --memory-limit).
+    :param metrics: Mesures de similarité demandées ('lines' au plus).
+    :return: Code de sortie (EXIT_IDENTICAL, EXIT_DIFFERENT ou EXIT_ERROR).
+    """
+    for path in (args.file1, args.file2):
+        if not os.path.isfile(path) or not path.lower().endswith(".txt"):
+            print(f"Erreur : impossible de lire '{path}' hors mémoire (fichier .txt absent)", file=sys.stderr)
+            return EXIT_ERROR
+
+    memory_limit = args.memory_limit * 1024 * 1024
+    try:
+        with ExternalDocument(args.file1, memory_limit=memory_limit, temp_dir=args.temp_dir) as doc1, \
+                ExternalDocument(args.file2, memory_limit=memory_limit, temp_dir=args.temp_dir) as doc2:
+            results = compare_documents(doc1, doc2, None, lazy=True, metrics=metrics or None,
+                                        workers=args.workers)
+            return write_results(results, args)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Erreur lors de la comparaison hors mémoire : {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+def write_results(results: dict, args: argparse.Namespace) -> int:
+    """
+    Écrit le résultat d'une comparaison dans le format demandé.
+
+    :param results: Dictionnaire retourné par compare_documents.
+    :param args: Arguments analysés par build_parser().
+    :return: Code de sortie (EXIT_IDENTICAL, EXIT_DIFFERENT ou EXIT_ERROR).
+    """
+    identical = all(hunk[0] == 'equal' for hunk in results["line_comparison"]["hunks"])
+
+    output = sys.stdout
+    try:
+        if args.format == "binary":
+            write_binary(results, args.output)
+            return EXIT_IDENTICAL if identical else EXIT_DIFFERENT
+        if args.output != "-":
+            output = open(args.output, 'w', encoding='utf-8', buffering=_WRITE_BUFFER_SIZE)
+        if args.format == "json":
+            results["documents"] = {"text1": args.file1, "text2": args.file2}
+            results["mode"] = args.mode
+            results["identical"] = identical
+            json.dump(results, output, ensure_ascii=False)
+            output.write("\n")
+        elif args.format == "jsonl":
+            write_jsonl(results, output)
+        else:
+            write_report(results, output)
+    except OSError as e:
+        print(f"Erreur lors de l'écriture du rapport : {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return EXIT_IDENTICAL if identical else EXIT_DIFFERENT
+
+if __name__ == "__main__":
+    sys.exit(main())
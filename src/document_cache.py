@@ -0,0 +1,326 @@
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+
+from file_parser import parse_file
+from text_preprocessor import preprocess_lines, preprocess_text
+
+# Emplacement et taille maximale par défaut du cache sur disque
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "doc_comparator")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Version du format stockée dans les clés : à incrémenter si l'extraction ou le
+# prétraitement changent de comportement, pour invalider les anciennes entrées.
+CACHE_FORMAT_VERSION = 1
+
+# Nombre maximal d'empreintes de fichiers mémorisées (les moins récemment utilisées partent)
+MAX_FILE_RECORDS = 10000
+
+# Une éviction ramène le cache à cette fraction de max_bytes (et de MAX_FILE_RECORDS) :
+# le répertoire n'est parcouru de nouveau qu'une fois la marge remplie
+EVICTION_TARGET = 0.8
+
+_FILES_DIRNAME = "files"
+_ENTRY_SUFFIX = ".z"
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+def file_content_hash(filepath: str) -> str:
+    """
+    Calcule l'empreinte SHA-256 du contenu d'un fichier, lu par blocs.
+
+    :param filepath: Chemin d'accès au fichier.
+    :return: Empreinte hexadécimale du contenu.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_key(
+        content_hash: str,
+        ignore_case: bool = True,
+        clean_punctuation: bool = True,
+        normalize_spaces: bool = True,
+        strict_mode: bool = False,
+        raw: bool = False,
+        keep_lines: bool = False
+    ) -> str:
+    """
+    Construit la clé d'une entrée du cache à partir de l'empreinte du fichier et
+    des options de prétraitement. En mode strict le texte n'est pas transformé :
+    la clé est alors celle du texte brut extrait.
+
+    :param content_hash: Empreinte du contenu du fichier (file_content_hash).
+    :param ignore_case: Option de preprocess_text.
+    :param clean_punctuation: Option de preprocess_text.
+    :param normalize_spaces: Option de preprocess_text.
+    :param strict_mode: Option de preprocess_text.
+    :param raw: Si True, clé du texte extrait avant tout prétraitement.
+    :param keep_lines: Si True, clé du texte prétraité ligne par ligne (preprocess_lines).
+    :return: Clé hexadécimale de l'entrée.
+    """
+    if raw or strict_mode:
+        flags = "raw"
+    else:
+        flags = f"{int(ignore_case)}{int(clean_punctuation)}{int(normalize_spaces)}{int(keep_lines)}"
+    return hashlib.sha256(f"v{CACHE_FORMAT_VERSION}:{content_hash}:{flags}".encode()).hexdigest()
+
+class DocumentCache:
+    """
+    Cache persistant des textes extraits et prétraités, adressé par contenu.
+
+    Chaque entrée est stockée compressée (zlib, UTF-8) dans son propre fichier.
+    Le cache n'a pas d'index partagé : la taille d'une entrée est celle de son
+    fichier et la date de modification de celui-ci, renouvelée à chaque lecture,
+    sert à l'éviction LRU au-delà de max_bytes. Plusieurs processus peuvent donc
+    utiliser le même répertoire sans écraser l'état des autres.
+
+    Pour ne pas parcourir tout le répertoire à chaque ajout, chaque instance
+    tient une estimation de la taille du cache : la taille relevée lors du
+    dernier parcours plus celle de ses propres ajouts. Le répertoire n'est
+    parcouru (et le cache ramené à EVICTION_TARGET × max_bytes) que lorsque
+    cette estimation dépasse max_bytes. Les ajouts des autres processus n'y
+    figurent pas : avec plusieurs processus, le cache peut dépasser max_bytes
+    d'au plus (1 - EVICTION_TARGET) × max_bytes par processus.
+
+    L'empreinte du contenu de chaque fichier déjà vu est mémorisée, avec sa date
+    de modification et sa taille, dans un petit fichier du sous-répertoire
+    'files' (évite de relire un fichier inchangé), dans la limite de
+    MAX_FILE_RECORDS fichiers.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param cache_dir: Répertoire du cache (créé si nécessaire).
+        :param max_bytes: Taille totale maximale des entrées, en octets.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Estimations recalées sur le disque à chaque parcours (None : pas encore parcouru)
+        self._estimated_bytes = None
+        self._estimated_records = None
+        os.makedirs(os.path.join(cache_dir, _FILES_DIRNAME), exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + _ENTRY_SUFFIX)
+
+    def _record_path(self, path: str) -> str:
+        name = hashlib.sha256(path.encode('utf-8', 'surrogatepass')).hexdigest()
+        return os.path.join(self.cache_dir, _FILES_DIRNAME, name + ".json")
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _scan(self, directory: str, suffix: str) -> list[tuple[float, int, str]]:
+        # Fichiers (date de modification, taille, chemin) d'un répertoire ;
+        # un fichier supprimé entre-temps par un autre processus est ignoré.
+        found = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(suffix):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        found.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return found
+
+    def _entry_files(self) -> list[tuple[float, int, str]]:
+        entries = []
+        with os.scandir(self.cache_dir) as directories:
+            for directory in directories:
+                if len(directory.name) == 2 and directory.is_dir():
+                    entries.extend(self._scan(directory.path, _ENTRY_SUFFIX))
+        return entries
+
+    def content_hash(self, filepath: str) -> str:
+        """
+        Renvoie l'empreinte du contenu d'un fichier. Si sa date de modification et
+        sa taille n'ont pas changé depuis le dernier calcul, l'empreinte connue est
+        réutilisée sans relire le fichier.
+
+        :param filepath: Chemin d'accès au fichier.
+        :return: Empreinte hexadécimale du contenu.
+        """
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        record_path = self._record_path(path)
+        try:
+            with open(record_path, 'r', encoding='utf-8') as file:
+                known = json.load(file)
+            if known[0] == path and known[1] == stat.st_mtime_ns and known[2] == stat.st_size:
+                os.utime(record_path)
+                return known[3]
+        except (OSError, ValueError, IndexError, TypeError):
+            # Empreinte absente, périmée ou illisible : elle est recalculée
+            pass
+
+        content_hash = file_content_hash(path)
+        record = [path, stat.st_mtime_ns, stat.st_size, content_hash]
+        self._write_atomic(record_path, json.dumps(record).encode('utf-8'))
+        if self._estimated_records is not None:
+            self._estimated_records += 1
+        return content_hash
+
+    def get(self, key: str) -> str | None:
+        """
+        Lit une entrée du cache et la marque comme récemment utilisée.
+
+        :param key: Clé de l'entrée (cache_key).
+        :return: Texte stocké, ou None si l'entrée est absente ou illisible.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            text = zlib.decompress(data).decode('utf-8')
+        except (OSError, zlib.error, UnicodeDecodeError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # Entrée évincée entre-temps par un autre processus
+            pass
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        """
+        Ajoute (ou remplace) une entrée puis applique l'éviction LRU.
+
+        :param key: Clé de l'entrée (cache_key).
+        :param text: Texte à stocker.
+        """
+        data = zlib.compress(text.encode('utf-8'))
+        path = self._entry_path(key)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        self._write_atomic(path, data)
+        if self._estimated_bytes is not None:
+            self._estimated_bytes += len(data) - replaced
+        self._evict()
+
+    def _evict(self) -> None:
+        # Les fichiers présents sur disque font foi : les entrées écrites par
+        # d'autres processus sont comptées et évincées comme les autres.
+        if self._estimated_bytes is None or self._estimated_bytes > self.max_bytes:
+            entries = self._entry_files()
+            total = sum(size for _, size, _ in entries)
+            if total > self.max_bytes:
+                # Les entrées les moins récemment utilisées partent en premier
+                target = self.max_bytes * EVICTION_TARGET
+                for _, size, path in sorted(entries):
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    total -= size
+            self._estimated_bytes = total
+
+        if self._estimated_records is None or self._estimated_records > MAX_FILE_RECORDS:
+            records = self._scan(os.path.join(self.cache_dir, _FILES_DIRNAME), ".json")
+            if len(records) > MAX_FILE_RECORDS:
+                excess = len(records) - int(MAX_FILE_RECORDS * EVICTION_TARGET)
+                for _, _, path in sorted(records)[:excess]:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                self._estimated_records = len(records) - excess
+            else:
+                self._estimated_records = len(records)
+
+    def clear(self) -> None:
+        """
+        Supprime toutes les entrées du cache et les empreintes mémorisées.
+        """
+        files = self._entry_files() + self._scan(os.path.join(self.cache_dir, _FILES_DIRNAME), ".json")
+        for _, _, path in files:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._estimated_bytes = None
+        self._estimated_records = None
+
+_default_cache = None
+
+def get_default_cache() -> DocumentCache:
+    """
+    Renvoie l'instance de cache partagée, située dans DEFAULT_CACHE_DIR.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DocumentCache()
+    return _default_cache
+
+def load_preprocessed_file(
+        filepath: str,
+        ignore_case: bool = True,
+        clean_punctuation: bool = True,
+        normalize_spaces: bool = True,
+        strict_mode: bool = False,
+        cache: DocumentCache | None = None,
+        workers: int | None = 1,
+        keep_lines: bool = False
+    ) -> str | None:
+    """
+    Équivalent de preprocess_text(parse_file(filepath), ...) passant par le cache
+    (ou de preprocess_lines si keep_lines est vrai).
+    Si le texte prétraité est déjà en cache, le fichier n'est ni extrait ni
+    prétraité ; si seul le texte brut est en cache, l'extraction (PDF) est évitée.
+
+    :param filepath: Chemin d'accès au fichier (.txt ou .pdf).
+    :param ignore_case: Option de preprocess_text.
+    :param clean_punctuation: Option de preprocess_text.
+    :param normalize_spaces: Option de preprocess_text.
+    :param strict_mode: Option de preprocess_text.
+    :param cache: Cache à utiliser (par défaut le cache partagé).
+    :param workers: Nombre de processus pour l'extraction des PDF (voir parse_file).
+    :param keep_lines: Si True, conserve le découpage en lignes (preprocess_lines).
+    :return: Texte prétraité, ou None si le fichier n'a pas pu être lu.
+    """
+    if not os.path.isfile(filepath):
+        return None
+    if cache is None:
+        cache = get_default_cache()
+
+    content_hash = cache.content_hash(filepath)
+    key = cache_key(content_hash, ignore_case, clean_punctuation, normalize_spaces, strict_mode,
+                    keep_lines=keep_lines)
+    text = cache.get(key)
+
+    if text is None:
+        raw_key = cache_key(content_hash, raw=True)
+        raw_text = cache.get(raw_key)
+        if raw_text is None:
+            raw_text = parse_file(filepath, workers)
+            if raw_text is None:
+                return None
+            cache.put(raw_key, raw_text)
+
+        preprocess = preprocess_lines if keep_lines else preprocess_text
+        text = preprocess(raw_text, ignore_case, clean_punctuation, normalize_spaces, strict_mode)
+        if key != raw_key:
+            cache.put(key, text)
+
+    return text
@@ -0,0 +1,330 @@
+import mmap
+import tempfile
+from array import array
+from collections.abc import Iterator, Sequence
+
+from mapped_document import SCAN_CHUNK_SIZE, MappedDocument, MappedLinePairs, MappedLines, iter_mapped_alignment
+
+# Plafond mémoire par défaut d'une comparaison hors mémoire (en octets)
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+# Chaque tableau reçoit 1 / SPILL_BUFFER_SHARE du plafond avant d'être écrit sur disque
+SPILL_BUFFER_SHARE = 32
+# Mémoire de travail estimée par élément d'une zone réalignée (align_sequences) ;
+# un quart du plafond est réservé à l'alignement d'une zone
+ALIGN_BYTES_PER_ITEM = 256
+# Mémoire estimée par octet de texte découpé en mots Python (chaînes, liste ou ensemble)
+WORD_SET_OVERHEAD = 16
+# Nombre maximal de partitions (fichiers temporaires) des mots de chaque document
+MAX_WORD_PARTITIONS = 256
+
+_TAG_CODES = {'equal': 0, 'replace': 1, 'delete': 2, 'insert': 3}
+_TAGS = list(_TAG_CODES)
+
+class SpilledArray:
+    """
+    Tableau d'entiers (array) en ajout seul, dont le contenu est écrit dans un
+    fichier temporaire chaque fois que le tampon en mémoire atteint
+    buffer_size octets.
+
+    Une fois complété (freeze), il se lit par values : l'array lui-même s'il n'a
+    jamais débordé, sinon une memoryview sur le fichier projeté en mémoire, dont
+    seules les pages consultées sont chargées (et que le système peut libérer).
+    Le fichier temporaire disparaît à la fermeture.
+    """
+
+    def __init__(self, typecode: str, buffer_size: int, directory: str | None = None):
+        """
+        :param typecode: Type des éléments (voir array), par exemple 'Q' ou 'q'.
+        :param buffer_size: Taille (en octets) du tampon en mémoire.
+        :param directory: Répertoire des fichiers temporaires (None : celui du système).
+        """
+        self.typecode = typecode
+        self.values = self._buffer = array(typecode)
+        self._capacity = max(1, buffer_size // self._buffer.itemsize)
+        self._directory = directory
+        self._file = None
+        self._map = None
+
+    def append(self, value: int) -> None:
+        self._buffer.append(value)
+        if len(self._buffer) >= self._capacity:
+            self._spill()
+
+    def extend(self, values) -> None:
+        self._buffer.extend(values)
+        if len(self._buffer) >= self._capacity:
+            self._spill()
+
+    def _spill(self) -> None:
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(dir=self._directory)
+        self._buffer.tofile(self._file)
+        del self._buffer[:]
+
+    def freeze(self) -> Sequence[int]:
+        """
+        Termine l'écriture du tableau.
+
+        :return: Contenu du tableau (values).
+        """
+        if self._file is not None and self._map is None:
+            if self._buffer:
+                self._spill()
+            self._file.flush()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.values = memoryview(self._map).cast(self.typecode)
+        return self.values
+
+    def close(self) -> None:
+        """
+        Libère la projection en mémoire et supprime le fichier temporaire.
+        """
+        if self._map is not None:
+            self.values.release()
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+
+class SpilledTuples(Sequence):
+    """
+    Suite de tuples de width entiers rangés bout à bout dans un tableau
+    (SpilledArray.values).
+    """
+
+    def __init__(self, values: Sequence[int], width: int):
+        self._values = values
+        self._width = width
+
+    def __len__(self) -> int:
+        return len(self._values) // self._width
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[k] for k in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("indice hors de la suite")
+        start = index * self._width
+        return tuple(self._values[start:start + self._width])
+
+    def __iter__(self) -> Iterator[tuple]:
+        values = iter(self._values)
+        return zip(*[values] * self._width)
+
+class SpilledHunks(SpilledTuples):
+    """
+    Suite des hunks (tag, i1, i2, j1, j2) d'une comparaison hors mémoire.
+    """
+
+    def __init__(self, values: Sequence[int]):
+        super().__init__(values, 5)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return super().__getitem__(index)
+        code, i1, i2, j1, j2 = super().__getitem__(index)
+        return (_TAGS[code], i1, i2, j1, j2)
+
+    def __iter__(self) -> Iterator[tuple[str, int, int, int, int]]:
+        for code, i1, i2, j1, j2 in super().__iter__():
+            yield (_TAGS[code], i1, i2, j1, j2)
+
+class SpilledLines(MappedLines):
+    """
+    MappedLines dont les plages de lignes et leurs cumuls sont lus dans des
+    tableaux écrits sur disque.
+    """
+
+    def __init__(self, document: MappedDocument, ranges: SpilledTuples, ends: Sequence[int]):
+        self._document = document
+        self._ranges = ranges
+        self._ends = ends
+
+class SpilledLinePairs(MappedLinePairs):
+    """
+    MappedLinePairs dont les plages de lignes et leurs cumuls sont lus dans des
+    tableaux écrits sur disque.
+    """
+
+    def __init__(self, document1: MappedDocument, document2: MappedDocument, ranges: SpilledTuples,
+                 starts2: Sequence[int], ends: Sequence[int]):
+        self._document = document1
+        self._document2 = document2
+        self._ranges = ranges
+        self._starts2 = starts2
+        self._ends = ends
+
+class ExternalDocument(MappedDocument):
+    """
+    MappedDocument pour les fichiers plus grands que la mémoire disponible :
+    l'index des lignes (position et empreinte, 16 octets par ligne) est lui
+    aussi écrit dans des fichiers temporaires dès qu'il dépasse une fraction de
+    memory_limit, et le fichier est parcouru par blocs plus petits (scan_chunk_size).
+
+    Deux ExternalDocument se comparent avec comparison_engine.compare_documents
+    (de préférence avec lazy=True) : l'alignement (compare_external_lines) et
+    les mots uniques (external_unique_words) restent alors sous ce plafond, et
+    le résultat a la même structure que pour deux MappedDocument. Les
+    fichiers temporaires du résultat sont rattachés au premier document et
+    supprimés à sa fermeture.
+
+        with ExternalDocument("export1.txt") as doc1, ExternalDocument("export2.txt") as doc2:
+            results = compare_documents(doc1, doc2, None, lazy=True)
+            write_report(results, sys.stdout)
+    """
+
+    def __init__(
+            self,
+            filepath: str,
+            encoding: str = 'utf-8',
+            memory_limit: int = DEFAULT_MEMORY_LIMIT,
+            temp_dir: str | None = None
+        ):
+        """
+        :param filepath: Chemin du fichier texte.
+        :param encoding: Encodage utilisé pour décoder les lignes.
+        :param memory_limit: Plafond (en octets) de la mémoire de travail.
+        :param temp_dir: Répertoire des fichiers temporaires (None : celui du système).
+        """
+        self.memory_limit = memory_limit
+        self.temp_dir = temp_dir
+        # Un bloc découpé en mots (word_count, mots uniques) n'occupe qu'un quart du plafond
+        self.scan_chunk_size = max(1, min(SCAN_CHUNK_SIZE, memory_limit // (4 * WORD_SET_OVERHEAD)))
+        self._spilled = []
+        super().__init__(filepath, encoding)
+
+    def spilled_array(self, typecode: str) -> SpilledArray:
+        """
+        :param typecode: Type des éléments (voir array).
+        :return: Nouveau SpilledArray, supprimé à la fermeture du document.
+        """
+        values = SpilledArray(typecode, self.memory_limit // SPILL_BUFFER_SHARE, self.temp_dir)
+        self._spilled.append(values)
+        return values
+
+    def _scan(self) -> tuple[Sequence[int], Sequence[int]]:
+        starts, hashes = self._index(self.spilled_array('Q'), self.spilled_array('q'))
+        return starts.freeze(), hashes.freeze()
+
+    def close(self) -> None:
+        """
+        Supprime les fichiers temporaires (index et résultats), puis libère la
+        projection en mémoire et ferme le fichier. Les suites de lignes des
+        résultats ne sont plus lisibles ensuite.
+        """
+        self.__dict__.pop('line_blocks', None)
+        for values in self._spilled:
+            values.close()
+        self._spilled = []
+        super().close()
+
+class _RangeWriter:
+    # Plages de lignes (début, fin) et cumul de leurs longueurs, écrits au fil de l'alignement
+    def __init__(self, document: ExternalDocument):
+        self.ranges = document.spilled_array('Q')
+        self.ends = document.spilled_array('Q')
+        self.total = 0
+
+    def add(self, start: int, stop: int) -> None:
+        self.ranges.extend((start, stop))
+        self.total += stop - start
+        self.ends.append(self.total)
+
+    def lines(self, document: MappedDocument) -> SpilledLines:
+        return SpilledLines(document, SpilledTuples(self.ranges.freeze(), 2), self.ends.freeze())
+
+def compare_external_lines(document1: ExternalDocument, document2: ExternalDocument) -> dict:
+    """
+    Équivalent de mapped_document.compare_mapped_lines pour deux
+    ExternalDocument. Les hunks sont produits dans l'ordre du document par
+    l'alignement sur les blocs de lignes délimités par leur contenu
+    (mapped_document.iter_mapped_alignment) : seuls les blocs d'empreintes
+    différentes sont réalignés ligne à ligne, par zones d'au plus un quart du
+    plafond mémoire. Les hunks et les plages de lignes du résultat sont écrits
+    au fur et à mesure dans des fichiers temporaires.
+
+    :param document1: Premier document.
+    :param document2: Deuxième document.
+    :return: Dictionnaire au format de compare_lines.
+    """
+    max_zone = max(2, min(document1.memory_limit, document2.memory_limit) // 4 // ALIGN_BYTES_PER_ITEM)
+    hunks = document1.spilled_array('Q')
+    common, unique1, unique2, diff = (_RangeWriter(document1) for _ in range(4))
+    diff_starts2 = document1.spilled_array('Q')
+
+    for tag, i1, i2, j1, j2 in iter_mapped_alignment(document1, document2, max_zone):
+        hunks.extend((_TAG_CODES[tag], i1, i2, j1, j2))
+        if tag == 'equal':
+            common.add(i1, i2)
+        elif tag == 'delete':
+            unique1.add(i1, i2)
+        elif tag == 'insert':
+            unique2.add(j1, j2)
+        else:
+            # Même répartition que comparison_engine.split_hunk
+            size = min(i2 - i1, j2 - j1)
+            diff.add(i1, i1 + size)
+            diff_starts2.append(j1)
+            if i1 + size < i2:
+                unique1.add(i1 + size, i2)
+            if j1 + size < j2:
+                unique2.add(j1 + size, j2)
+
+    return {
+        'common': common.lines(document1),
+        'diff': SpilledLinePairs(document1, document2, SpilledTuples(diff.ranges.freeze(), 2),
+                                 diff_starts2.freeze(), diff.ends.freeze()),
+        'unique_to_text1': unique1.lines(document1),
+        'unique_to_text2': unique2.lines(document2),
+        'hunks': SpilledHunks(hunks.freeze())
+    }
+
+def _partition_words(document: ExternalDocument, partitions: int) -> list:
+    # Répartit les mots (en minuscules, dédoublonnés bloc par bloc) du document
+    # entre des fichiers temporaires selon leur empreinte
+    files = [tempfile.TemporaryFile(dir=document.temp_dir) for _ in range(partitions)]
+    for position, end in document._chunks():
+        buckets = [[] for _ in range(partitions)]
+        for word in set(document._map[position:end].decode(document.encoding).lower().split()):
+            buckets[hash(word) % partitions].append(word)
+        for file, words in zip(files, buckets):
+            if words:
+                file.write("\n".join(words).encode('utf-8'))
+                file.write(b"\n")
+    return files
+
+def _read_words(file) -> set[str]:
+    file.seek(0)
+    words = set(file.read().decode('utf-8').split("\n"))
+    words.discard("")
+    return words
+
+def external_unique_words(document1: ExternalDocument, document2: ExternalDocument) -> dict:
+    """
+    Équivalent de comparison_engine.identify_unique_words pour deux
+    ExternalDocument. Lorsque les ensembles de mots risquent de dépasser le
+    plafond mémoire, les mots sont d'abord répartis par empreinte entre des
+    fichiers temporaires (au plus MAX_WORD_PARTITIONS par document) : un mot se
+    retrouve dans la même partition pour les deux documents, qui sont ensuite
+    comparées une à une.
+
+    :return: Dictionnaire {'only_in_text1', 'only_in_text2'} (listes de mots).
+    """
+    # Les deux ensembles d'une partition occupent au plus la moitié du plafond
+    memory_limit = min(document1.memory_limit, document2.memory_limit) // 2
+    partitions = -(-(document1.size + document2.size) * WORD_SET_OVERHEAD // memory_limit)
+    partitions = min(partitions, MAX_WORD_PARTITIONS)
+    if partitions <= 1:
+        set1, set2 = document1.lower_words(), document2.lower_words()
+        return {"only_in_text1": list(set1 - set2), "only_in_text2": list(set2 - set1)}
+
+    only_in_text1, only_in_text2 = [], []
+    files1 = _partition_words(document1, partitions)
+    files2 = _partition_words(document2, partitions)
+    for file1, file2 in zip(files1, files2):
+        with file1, file2:
+            set1, set2 = _read_words(file1), _read_words(file2)
+            only_in_text1.extend(set1 - set2)
+            only_in_text2.extend(set2 - set1)
+    return {"only_in_text1": only_in_text1, "only_in_text2": only_in_text2}
@@ -1,5 +1,15 @@
 import os
-import pdfplumber
+from array import array
+from collections.abc import Iterator
+from functools import partial
+
+from parallel import ordered_chunked_map
+from profiling import stage
+
+# Taille (en pages) des tranches confiées à chaque processus d'extraction
+PDF_CHUNK_SIZE = 16
+# En dessous de ce nombre de pages, l'extraction parallèle n'est pas rentable
+PARALLEL_MIN_PAGES = 48
 
 def file_exists(filepath: str) -> bool:
     """
@@ -26,21 +36,138 @@ def read_txt_file(filepath: str) -> str:
         print(f"Erreur lors de la lecture du fichier : {e}")
         return None
 
-def read_pdf_file(filepath: str) -> str:
+def _iter_page_range(pdf, start: int, stop: int) -> Iterator[str]:
+    """
+    Extrait le texte des pages [start, stop) d'un PDF déjà ouvert, en libérant
+    chaque page (cache de mise en page vidé) dès que son texte est extrait.
+    """
+    for index in range(start, stop):
+        page = pdf.pages[index]
+        try:
+            yield page.extract_text() or ""
+        finally:
+            # Page.close() n'existe que dans les versions récentes de pdfplumber
+            close = getattr(page, "close", None) or page.flush_cache
+            close()
+
+def _extract_page_range(filepath: str, pages: range) -> list[str]:
+    """
+    Tâche exécutée par un processus de travail : ouvre le PDF de son côté et
+    extrait le texte des pages de la tranche pages.
+    """
+    import pdfplumber
+
+    with pdfplumber.open(filepath) as pdf:
+        return list(_iter_page_range(pdf, pages.start, pages.stop))
+
+def iter_pdf_pages(
+        filepath: str,
+        workers: int | None = 1,
+        chunk_size: int = PDF_CHUNK_SIZE
+    ) -> Iterator[str]:
+    """
+    Extrait le texte d'un fichier PDF page par page, sous forme de générateur.
+    Chaque page est libérée (cache de mise en page vidé) dès que son texte est
+    extrait, de sorte que la mémoire utilisée reste proportionnelle à une page
+    et non au document entier.
+
+    Avec workers > 1 (ou None pour utiliser tous les cœurs), les pages sont
+    réparties par tranches de chunk_size entre plusieurs processus qui ouvrent
+    chacun le fichier. Les pages sont toujours produites dans l'ordre du
+    document, et seules quelques tranches par processus sont en cours à un
+    instant donné. Les documents de moins de PARALLEL_MIN_PAGES pages sont
+    extraits en série, le démarrage des processus coûtant alors plus qu'il
+    ne rapporte.
+
+    Contrairement à read_pdf_file, les erreurs de lecture sont propagées à
+    l'appelant (un générateur ne peut pas renvoyer None en cours de route).
+
+    :param filepath: Chemin d'accès au fichier PDF.
+    :param workers: Nombre de processus d'extraction (1 = extraction en série).
+    :param chunk_size: Nombre de pages confiées à un processus par tâche.
+    :return: Générateur du texte de chaque page ("" pour une page sans texte).
+    """
+    # Import différé : pdfplumber est lourd à charger et inutile pour les .txt
+    import pdfplumber
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with pdfplumber.open(filepath) as pdf:
+        nb_pages = len(pdf.pages)
+        if workers <= 1 or nb_pages < PARALLEL_MIN_PAGES:
+            yield from _iter_page_range(pdf, 0, nb_pages)
+            return
+
+    chunk_size = max(1, chunk_size)
+    ranges = (range(start, min(start + chunk_size, nb_pages)) for start in range(0, nb_pages, chunk_size))
+    for _, textes in ordered_chunked_map(partial(_extract_page_range, filepath), ranges, workers):
+        yield from textes
+
+def iter_pdf_lines(
+        filepath: str,
+        workers: int | None = 1,
+        chunk_size: int = PDF_CHUNK_SIZE
+    ) -> Iterator[str]:
+    """
+    Parcourt les lignes d'un fichier PDF au fil de l'extraction des pages.
+    Les lignes produites sont identiques à read_pdf_file(filepath).splitlines().
+
+    :param filepath: Chemin d'accès au fichier PDF.
+    :param workers: Nombre de processus d'extraction (voir iter_pdf_pages).
+    :param chunk_size: Nombre de pages confiées à un processus par tâche.
+    :return: Générateur des lignes du document.
+    """
+    for texte in iter_pdf_pages(filepath, workers, chunk_size):
+        if texte:
+            yield from texte.splitlines()
+
+def iter_txt_lines(filepath: str) -> Iterator[str]:
+    """
+    Parcourt les lignes d'un fichier texte sans le charger entièrement en mémoire.
+    Les lignes produites sont identiques à read_txt_file(filepath).splitlines().
+
+    :param filepath: Chemin d'accès au fichier texte.
+    :return: Générateur des lignes du fichier.
+    """
+    with open(filepath, 'r', encoding='utf-8') as file:
+        for line in file:
+            yield from line.splitlines()
+
+def read_pdf_file(
+        filepath: str,
+        workers: int | None = 1,
+        chunk_size: int = PDF_CHUNK_SIZE,
+        with_pages: bool = False
+    ) -> str | tuple[str, array]:
     """
     Extrait le texte d'un fichier PDF.
     
     :param filepath: Chemin d'accès au fichier PDF.
-    :return: Texte extrait du PDF sous forme de chaîne, ou None en cas d'erreur.
+    :param workers: Nombre de processus d'extraction (1 = extraction en série,
+    None = tous les cœurs disponibles).
+    :param chunk_size: Nombre de pages confiées à un processus par tâche.
+    :param with_pages: Si True, renvoie aussi la position de début de chaque
+    page dans le texte (array 'Q', une entrée par page, y compris les pages sans
+    texte), à transmettre à text_preprocessor.preprocess_with_offsets.
+    :return: Texte extrait du PDF sous forme de chaîne (ou tuple (texte, débuts
+    de pages) si with_pages vaut True), ou None en cas d'erreur.
     """
     try:
-        texte_complet = ""
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                texte = page.extract_text()
-                if texte:
-                    texte_complet += texte + "\n"
-        return texte_complet
+        # Une seule concaténation finale au lieu de « += » page après page
+        pages = iter_pdf_pages(filepath, workers, chunk_size)
+        if not with_pages:
+            return "".join(texte + "\n" for texte in pages if texte)
+
+        textes = []
+        page_starts = array('Q')
+        position = 0
+        for texte in pages:
+            page_starts.append(position)
+            if texte:
+                textes.append(texte + "\n")
+                position += len(texte) + 1
+        return "".join(textes), page_starts
     except Exception as e:
         print(f"Erreur lors de la lecture du fichier : {e}")
         return None
@@ -60,13 +187,14 @@ def read_pdf_file(filepath: str) -> str:
 #             content += page.extract_text() or ''
 #             return content
 
-def parse_file(filepath: str) -> str:
+def parse_file(filepath: str, workers: int | None = 1) -> str:
     """
     Détecte l'extension du fichier et appelle la fonction appropriée de lecture
     (texte ou PDF). Gère également la vérification de l'existence du fichier
     et des formats non supportés.
     
     :param filepath: Chemin d'accès au fichier.
+    :param workers: Nombre de processus pour l'extraction des PDF (voir iter_pdf_pages).
     :return: Contenu du fichier sous forme de chaîne, 
     ou None en cas d'erreur ou si le format n'est pas supporté.
     """
@@ -78,9 +206,11 @@ def parse_file(filepath: str) -> str:
         extension = extension.lower()
 
         if extension == '.txt':
-            return read_txt_file(filepath)
+            with stage("parse_file.txt", bytes=os.path.getsize(filepath)):
+                return read_txt_file(filepath)
         elif extension == '.pdf':
-            return read_pdf_file(filepath)
+            with stage("parse_file.pdf", bytes=os.path.getsize(filepath)):
+                return read_pdf_file(filepath, workers)
         else:
             return None 
     
@@ -88,6 +218,31 @@ def parse_file(filepath: str) -> str:
         print(f"Erreur dans parse_file : {e}")
         return None 
     
+
+def iter_file_lines(filepath: str, workers: int | None = 1) -> Iterator[str]:
+    """
+    Équivalent paresseux de parse_file : détecte l'extension du fichier et
+    renvoie un générateur de ses lignes, consommable directement par
+    comparison_engine.compare_lines.
+
+    :param filepath: Chemin d'accès au fichier.
+    :param workers: Nombre de processus pour l'extraction des PDF (voir iter_pdf_pages).
+    :return: Générateur des lignes du fichier, 
+    ou None si le fichier n'existe pas ou si le format n'est pas supporté.
+    """
+    if not os.path.isfile(filepath):
+        return None
+
+    _, extension = os.path.splitext(filepath)
+    extension = extension.lower()
+
+    if extension == '.txt':
+        return iter_txt_lines(filepath)
+    elif extension == '.pdf':
+        return iter_pdf_lines(filepath, workers)
+    else:
+        return None
+    
     
 
     
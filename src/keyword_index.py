@@ -0,0 +1,179 @@
+import re
+from array import array
+from bisect import bisect_left
+from itertools import repeat
+
+from tokenized_document import TokenizedDocument
+
+_WORD_RE = re.compile(r'\b\w+\b')
+
+class KeywordIndex:
+    """
+    Index inversé d'un document : pour chaque mot (en minuscules, sans
+    ponctuation), la liste de ses positions dans la suite des mots du document.
+    Construit une seule fois, il répond ensuite à un nombre quelconque de
+    recherches sans redécouper le texte :
+
+    - mot simple : « contrat »,
+    - expression : « clause de résiliation » (mots consécutifs),
+    - préfixe : « résili* » (tous les mots commençant par « résili »).
+    """
+
+    def __init__(self, text: str | TokenizedDocument):
+        """
+        :param text: Texte du document ou TokenizedDocument déjà découpé.
+        """
+        document = text if isinstance(text, TokenizedDocument) else TokenizedDocument(text)
+        self.vocabulary = document.vocabulary
+        self.token_lines = document.keyword_lines
+
+        postings = {}
+        for position, term_id in enumerate(document.keyword_ids):
+            positions = postings.get(term_id)
+            if positions is None:
+                positions = postings[term_id] = array('I')
+            positions.append(position)
+        self._postings = postings
+        self._sorted_terms = None
+
+    def _term_positions(self, term: str, prefix: bool = False) -> array | list[int]:
+        """
+        :return: Positions triées d'un mot, ou de tous les mots commençant par
+                 term si prefix est vrai.
+        """
+        if not prefix:
+            term_id = self.vocabulary.lookup(term)
+            return self._postings.get(term_id, ()) if term_id is not None else ()
+
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.vocabulary.terms(self._postings))
+        terms = self._sorted_terms
+        positions = []
+        index = bisect_left(terms, term)
+        while index < len(terms) and terms[index].startswith(term):
+            positions.extend(self._postings[self.vocabulary.lookup(terms[index])])
+            index += 1
+        positions.sort()
+        return positions
+
+    def positions(self, query: str) -> list[int]:
+        """
+        Recherche une requête (mot, expression ou préfixe terminé par « * »).
+
+        :param query: Requête ; la casse et la ponctuation sont ignorées.
+        :return: Positions triées (dans la suite des mots) du premier mot de
+                 chaque occurrence.
+        """
+        tokens = _WORD_RE.findall(query.lower())
+        if not tokens:
+            return []
+        prefix = query.rstrip().endswith('*')
+
+        token_positions = [
+            self._term_positions(token, prefix and index == len(tokens) - 1)
+            for index, token in enumerate(tokens)
+        ]
+        if len(tokens) == 1:
+            return list(token_positions[0])
+
+        # Expression : on part du mot le plus rare, puis on ne garde que les
+        # débuts d'occurrence pour lesquels chaque mot est à la bonne distance.
+        order = sorted(range(len(tokens)), key=lambda index: len(token_positions[index]))
+        rarest = order[0]
+        starts = {position - rarest for position in token_positions[rarest] if position >= rarest}
+        for offset in order[1:]:
+            if not starts:
+                break
+            starts.intersection_update(position - offset for position in token_positions[offset])
+        return sorted(starts)
+
+    def count(self, query: str) -> int:
+        """
+        :param query: Requête (voir positions).
+        :return: Nombre d'occurrences de la requête.
+        """
+        return len(self.positions(query))
+
+    def lines(self, query: str) -> list[int]:
+        """
+        :param query: Requête (voir positions).
+        :return: Numéros (à partir de 1) des lignes contenant une occurrence.
+        """
+        token_lines = self.token_lines
+        return sorted({token_lines[position] + 1 for position in self.positions(query)})
+
+    def search(self, query: str) -> dict:
+        """
+        Recherche une requête et renvoie le résultat au format de
+        comparison_engine.search_keyword pour un document.
+
+        :param query: Requête (voir positions).
+        :return: Dictionnaire avec 'found', 'count' et 'lines' (numéros des
+                 lignes contenant une occurrence, à partir de 1).
+        """
+        positions = self.positions(query)
+        token_lines = self.token_lines
+        return {
+            "found": len(positions) > 0,
+            "count": len(positions),
+            "lines": sorted({token_lines[position] + 1 for position in positions})
+        }
+
+def scan_keyword(lines: list[str], query: str) -> dict:
+    """
+    Recherche une seule requête par un parcours direct des lignes, sans
+    construire d'index ni encoder les mots. Pour un mot seul, les lignes qui
+    ne contiennent pas la chaîne ne sont même pas découpées : une recherche
+    isolée coûte bien moins que la construction d'un KeywordIndex, qui n'est
+    amortie qu'à partir de plusieurs requêtes.
+
+    :param lines: Lignes du document.
+    :param query: Requête (voir KeywordIndex.positions).
+    :return: Résultat au format de KeywordIndex.search.
+    """
+    tokens = _WORD_RE.findall(query.lower())
+    if not tokens:
+        return {"found": False, "count": 0, "lines": []}
+    prefix = query.rstrip().endswith('*')
+    findall = _WORD_RE.findall
+
+    if len(tokens) == 1:
+        # Un seul mot : seules les lignes qui contiennent la chaîne sont découpées
+        term = tokens[0]
+        count = 0
+        line_numbers = []
+        for line_number, line in enumerate(lines):
+            line = line.lower()
+            if term not in line:
+                continue
+            if prefix:
+                found = sum(1 for word in findall(line) if word.startswith(term))
+            else:
+                found = findall(line).count(term)
+            if found:
+                count += found
+                line_numbers.append(line_number + 1)
+        return {"found": count > 0, "count": count, "lines": line_numbers}
+
+    # Expression : elle peut s'étendre sur plusieurs lignes, on découpe tout le texte
+    words = []
+    word_lines = []
+    for line_number, line in enumerate(lines):
+        line_words = findall(line.lower())
+        if line_words:
+            words.extend(line_words)
+            word_lines.extend(repeat(line_number, len(line_words)))
+
+    *head, last = tokens
+    if prefix:
+        ends = [position for position, word in enumerate(words) if word.startswith(last)]
+    else:
+        ends = [position for position, word in enumerate(words) if word == last]
+    # Les mots qui précèdent le dernier doivent être exactement head
+    size = len(head)
+    positions = [end - size for end in ends if end >= size and words[end - size:end] == head]
+    return {
+        "found": len(positions) > 0,
+        "count": len(positions),
+        "lines": sorted({word_lines[position] + 1 for position in positions})
+    }
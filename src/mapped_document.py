@@ -0,0 +1,318 @@
+import mmap
+import os
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterator, Sequence
+from functools import cached_property
+from itertools import accumulate, islice
+
+from sequence_alignment import apply_moves, block_levels, iter_block_alignment, iter_merged_hunks, stable_hash
+from sequence_alignment import detect_moves as find_moves
+
+# Taille des blocs lus pour indexer les lignes et comparer des plages d'octets :
+# seule cette quantité de texte est copiée à la fois.
+SCAN_CHUNK_SIZE = 16 * 1024 * 1024
+
+class MappedDocument(Sequence):
+    """
+    Document texte projeté en mémoire (mmap), pour comparer de très gros
+    fichiers sans charger leur texte sous forme de chaînes Python.
+
+    Le fichier est parcouru une seule fois, par blocs, pour calculer la
+    position de début de chaque ligne et une empreinte 64 bits de son contenu.
+    Les lignes sont ensuite fournies à la demande : line_bytes(n) renvoie une
+    vue (memoryview) sans copie, doc[n] décode la seule ligne n.
+
+    Les lignes sont séparées par '\\n' ('\\r\\n' est aussi reconnu) ; le texte
+    est comparé tel quel, sans prétraitement (équivalent du mode strict).
+    Les fonctions de comparison_engine acceptent deux MappedDocument (sauf la
+    recherche de mots-clés), ainsi que generate_statistics_report ; le rapport
+    s'écrit avec report_generator.write_report.
+    """
+
+    # Taille des blocs lus à la fois (voir SCAN_CHUNK_SIZE)
+    scan_chunk_size = SCAN_CHUNK_SIZE
+
+    def __init__(self, filepath: str, encoding: str = 'utf-8'):
+        """
+        :param filepath: Chemin du fichier texte.
+        :param encoding: Encodage utilisé pour décoder les lignes.
+        """
+        self.filepath = filepath
+        self.encoding = encoding
+        self._file = open(filepath, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Un fichier vide ne peut pas être projeté en mémoire
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._starts, self.line_hashes = self._scan()
+
+    def _chunks(self) -> Iterator[tuple[int, int]]:
+        # Découpage du fichier en blocs d'environ scan_chunk_size octets, coupés en fin de ligne
+        data = self._map
+        chunk_size = self.scan_chunk_size
+        position = 0
+        while position < self.size:
+            end = data.rfind(b"\n", position, position + chunk_size)
+            if end == -1:
+                # Ligne plus longue qu'un bloc
+                end = data.find(b"\n", position + chunk_size)
+            end = self.size if end == -1 else end + 1
+            yield position, end
+            position = end
+
+    def _scan(self) -> tuple[array, array]:
+        return self._index(array('Q'), array('q'))
+
+    def _index(self, starts, hashes):
+        # _starts[n] : position du début de la ligne n ; _starts[-1] vaut la fin
+        # du texte (+ 1 si la dernière ligne n'a pas de fin de ligne), de sorte
+        # que la ligne n se termine toujours en _starts[n + 1] - 1.
+        # starts et hashes sont remplis par append / extend (array ou équivalent).
+        starts.append(0)
+        for position, end in self._chunks():
+            chunk = self._map[position:end]
+            pieces = chunk.split(b"\n")
+            if chunk.endswith(b"\n"):
+                pieces.pop()
+            next_starts = accumulate(map(len, pieces), lambda total, length: total + length + 1, initial=position)
+            starts.extend(islice(next_starts, 1, None))
+            if b"\r" in chunk:
+                pieces = [piece[:-1] if piece.endswith(b"\r") else piece for piece in pieces]
+            hashes.extend(map(stable_hash, pieces))
+        return starts, hashes
+
+    def __enter__(self) -> "MappedDocument":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Libère la projection en mémoire et ferme le fichier. Les vues renvoyées
+        par line_bytes doivent avoir été libérées auparavant.
+        """
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.line_hashes)
+
+    @cached_property
+    def line_blocks(self) -> list:
+        """
+        Hiérarchie d'empreintes de blocs de lignes (sequence_alignment.block_levels).
+        """
+        return block_levels(self.line_hashes)
+
+    def _bounds(self, n: int) -> tuple[int, int]:
+        start = self._starts[n]
+        end = self._starts[n + 1] - 1
+        if end > start and self._map[end - 1] == 13:  # '\r' de '\r\n'
+            end -= 1
+        return start, end
+
+    def line_bytes(self, n: int) -> memoryview:
+        """
+        :param n: Numéro (à partir de 0) de la ligne.
+        :return: Vue sans copie sur les octets de la ligne (sans fin de ligne).
+        """
+        start, end = self._bounds(n)
+        return memoryview(self._map)[start:end]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[n] for n in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("numéro de ligne hors du document")
+        start, end = self._bounds(index)
+        return self._map[start:end].decode(self.encoding)
+
+    def __iter__(self) -> Iterator[str]:
+        for n in range(len(self)):
+            yield self[n]
+
+    def word_count(self) -> int:
+        """
+        :return: Nombre de mots (séparés par des espaces) du document, compté bloc par bloc.
+        """
+        return sum(len(self._map[position:end].decode(self.encoding).split()) for position, end in self._chunks())
+
+    def lower_words(self) -> set[str]:
+        """
+        :return: Ensemble des mots en minuscules du document, construit bloc par bloc.
+        """
+        words = set()
+        for position, end in self._chunks():
+            words.update(self._map[position:end].decode(self.encoding).lower().split())
+        return words
+
+    def lines_equal(self, i1: int, i2: int, other: "MappedDocument", j1: int, j2: int) -> bool:
+        """
+        Compare octet par octet les lignes [i1, i2[ du document aux lignes
+        [j1, j2[ d'un autre document, par blocs de scan_chunk_size.
+
+        :return: True si les lignes sont identiques (fins de ligne non comprises).
+        """
+        if i2 - i1 != j2 - j1:
+            return False
+        if i1 == i2:
+            return True
+        start1, end1 = self._starts[i1], self._bounds(i2 - 1)[1]
+        start2, end2 = other._starts[j1], other._bounds(j2 - 1)[1]
+        if end1 - start1 == end2 - start2:
+            chunk_size = self.scan_chunk_size
+            for offset in range(0, end1 - start1, chunk_size):
+                length = min(chunk_size, end1 - start1 - offset)
+                if (self._map[start1 + offset:start1 + offset + length]
+                        != other._map[start2 + offset:start2 + offset + length]):
+                    break
+            else:
+                return True
+        # Fins de ligne différentes ('\r\n' / '\n') ou contenu différent : ligne par ligne
+        return all(self.line_bytes(i) == other.line_bytes(j) for i, j in zip(range(i1, i2), range(j1, j2)))
+
+class MappedLines(Sequence):
+    """
+    Suite de lignes d'un MappedDocument décrite par des plages de numéros de
+    lignes ; chaque ligne n'est décodée qu'au moment où elle est lue.
+    """
+
+    def __init__(self, document: MappedDocument, ranges: list[tuple[int, int]]):
+        self._document = document
+        self._ranges = ranges
+        self._ends = list(accumulate(stop - start for start, stop in ranges))
+
+    def __len__(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    def _line_number(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("indice hors de la suite de lignes")
+        k = bisect_right(self._ends, index)
+        before = self._ends[k - 1] if k else 0
+        return self._ranges[k][0] + index - before
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[k] for k in range(*index.indices(len(self)))]
+        return self._document[self._line_number(index)]
+
+    def __iter__(self) -> Iterator[str]:
+        document = self._document
+        for start, stop in self._ranges:
+            for n in range(start, stop):
+                yield document[n]
+
+class MappedLinePairs(MappedLines):
+    """
+    Suite de paires (ligne du document 1, ligne du document 2) décrite par des
+    plages (début dans le document 1, fin, début dans le document 2).
+    """
+
+    def __init__(self, document1: MappedDocument, document2: MappedDocument, ranges: list[tuple[int, int, int]]):
+        super().__init__(document1, [(start, stop) for start, stop, _ in ranges])
+        self._document2 = document2
+        self._starts2 = [start2 for _, _, start2 in ranges]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[k] for k in range(*index.indices(len(self)))]
+        n = self._line_number(index)
+        k = bisect_right(self._ends, index if index >= 0 else index + len(self))
+        return self._document[n], self._document2[self._starts2[k] + n - self._ranges[k][0]]
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        document1, document2 = self._document, self._document2
+        for (start, stop), start2 in zip(self._ranges, self._starts2):
+            for n in range(start, stop):
+                yield document1[n], document2[start2 + n - start]
+
+def iter_mapped_alignment(
+        document1: MappedDocument,
+        document2: MappedDocument,
+        max_zone: int | None = None
+    ) -> Iterator[tuple[str, int, int, int, int]]:
+    """
+    Aligne deux MappedDocument sur la hiérarchie de blocs de leurs empreintes
+    de lignes (sequence_alignment.iter_block_alignment), puis vérifie octet par
+    octet chaque bloc 'equal' : une collision d'empreintes ne peut donc pas
+    faire passer deux lignes différentes pour identiques.
+
+    :param max_zone: Taille maximale d'une zone alignée d'un seul tenant (voir
+    iter_block_alignment), ou None.
+    :return: Générateur ordonné des hunks fusionnés.
+    """
+    def checked() -> Iterator[tuple[str, int, int, int, int]]:
+        for tag, i1, i2, j1, j2 in iter_block_alignment(document1.line_blocks, document2.line_blocks,
+                                                        max_zone=max_zone):
+            if tag != 'equal' or document1.lines_equal(i1, i2, document2, j1, j2):
+                yield (tag, i1, i2, j1, j2)
+                continue
+            for offset in range(i2 - i1):
+                same = document1.line_bytes(i1 + offset) == document2.line_bytes(j1 + offset)
+                yield ('equal' if same else 'replace', i1 + offset, i1 + offset + 1, j1 + offset, j1 + offset + 1)
+
+    return iter_merged_hunks(checked())
+
+def align_mapped_documents(document1: MappedDocument, document2: MappedDocument) -> list[tuple[str, int, int, int, int]]:
+    """
+    Liste des hunks de iter_mapped_alignment.
+
+    :return: Liste ordonnée des hunks (voir sequence_alignment.align_sequences).
+    """
+    return list(iter_mapped_alignment(document1, document2))
+
+def compare_mapped_lines(document1: MappedDocument, document2: MappedDocument, detect_moves: bool = False) -> dict:
+    """
+    Équivalent de comparison_engine.compare_lines pour deux MappedDocument : les
+    listes de lignes du résultat sont des MappedLines / MappedLinePairs, qui ne
+    décodent les lignes qu'à la lecture. Les blocs déplacés (detect_moves) sont
+    confirmés octet par octet, comme les blocs 'equal'.
+
+    :return: Dictionnaire au format de compare_lines.
+    """
+    hunks = align_mapped_documents(document1, document2)
+    moves = None
+    if detect_moves:
+        moves = [
+            move for move in find_moves(document1.line_hashes, document2.line_hashes, hunks)
+            if document1.lines_equal(move[0], move[1], document2, move[2], move[3])
+        ]
+        hunks = apply_moves(hunks, moves)
+
+    common, diff, unique1, unique2 = [], [], [], []
+    for tag, i1, i2, j1, j2 in hunks:
+        if tag == 'moved':
+            continue
+        if tag == 'equal':
+            common.append((i1, i2))
+        elif tag == 'delete':
+            unique1.append((i1, i2))
+        elif tag == 'insert':
+            unique2.append((j1, j2))
+        else:
+            # Même répartition que comparison_engine.split_hunk
+            size = min(i2 - i1, j2 - j1)
+            diff.append((i1, i1 + size, j1))
+            if i1 + size < i2:
+                unique1.append((i1 + size, i2))
+            if j1 + size < j2:
+                unique2.append((j1 + size, j2))
+
+    result = {
+        'common': MappedLines(document1, common),
+        'diff': MappedLinePairs(document1, document2, diff),
+        'unique_to_text1': MappedLines(document1, unique1),
+        'unique_to_text2': MappedLines(document2, unique2),
+        'hunks': hunks
+    }
+    if moves is not None:
+        result['moved'] = MappedLines(document1, [(i1, i2) for i1, i2, _, _ in moves])
+        result['moves'] = moves
+    return result
@@ -0,0 +1,342 @@
+import json
+import os
+import struct
+from array import array
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from hashlib import blake2b
+from itertools import combinations
+
+from batch_comparison import load_document, summarize_comparison
+from tokenized_document import TokenizedDocument
+
+# Nombre de mots par bardeau (shingle) et nombre de composantes des signatures
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+DEFAULT_THRESHOLD = 0.8
+
+_SIGNATURE_MAGIC = b"DCMH1\n"
+_HASH_BITS = 64
+
+def shingle_hashes(text: str, shingle_size: int = SHINGLE_SIZE) -> set[int]:
+    """
+    Découpe un texte prétraité (text_preprocessor) en bardeaux de shingle_size mots
+    consécutifs et renvoie l'empreinte 64 bits de chacun. L'empreinte (BLAKE2b)
+    ne dépend pas du processus, ce qui permet de conserver les signatures.
+
+    :param text: Texte prétraité.
+    :param shingle_size: Nombre de mots par bardeau.
+    :return: Ensemble des empreintes des bardeaux.
+    """
+    words = text.split()
+    if len(words) < shingle_size:
+        shingles = [' '.join(words)] if words else []
+    else:
+        shingles = (' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+    return {
+        int.from_bytes(blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+        for shingle in shingles
+    }
+
+def minhash_signature(hashes: Iterable[int], num_permutations: int = NUM_PERMUTATIONS) -> array:
+    """
+    Calcule la signature MinHash d'un ensemble d'empreintes par hachage à une
+    seule permutation (« one permutation hashing ») : chaque empreinte est
+    rangée dans l'un des num_permutations compartiments et seul le minimum de
+    chaque compartiment est gardé. Une seule passe suffit au lieu d'une par
+    permutation. Les compartiments vides empruntent la valeur du compartiment
+    non vide suivant (densification par rotation), de sorte que la proportion
+    de composantes égales entre deux signatures estime toujours leur indice de
+    Jaccard.
+
+    :param hashes: Empreintes 64 bits des bardeaux (shingle_hashes).
+    :param num_permutations: Nombre de composantes de la signature.
+    :return: Signature array('Q') ; vide si l'ensemble est vide.
+    """
+    bins = [None] * num_permutations
+    for value in hashes:
+        index = value % num_permutations
+        value //= num_permutations
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+
+    filled = [index for index, value in enumerate(bins) if value is not None]
+    if not filled:
+        return array('Q')
+
+    # Densification : chaque compartiment vide reprend le prochain compartiment
+    # rempli (circulairement), décalé de la distance parcourue.
+    step = (1 << _HASH_BITS) // num_permutations
+    signature = array('Q', [0] * num_permutations)
+    next_filled = filled[0] + num_permutations
+    for index in range(num_permutations - 1, -1, -1):
+        if bins[index] is not None:
+            signature[index] = bins[index]
+            next_filled = index
+        else:
+            distance = next_filled - index
+            signature[index] = (bins[next_filled % num_permutations] + distance * step) % (1 << _HASH_BITS)
+    return signature
+
+def estimate_jaccard(signature1: array, signature2: array) -> float:
+    """
+    :return: Estimation de l'indice de Jaccard entre les deux ensembles de
+             bardeaux (proportion de composantes égales).
+    """
+    if not signature1 or not signature2:
+        return 1.0 if not signature1 and not signature2 else 0.0
+    equal = sum(1 for a, b in zip(signature1, signature2) if a == b)
+    return equal / len(signature1)
+
+def choose_bands(num_permutations: int, threshold: float) -> int:
+    """
+    Choisit le nombre de bandes LSH dont le seuil théorique (1/b)^(1/r) est le
+    plus proche du seuil demandé, parmi les diviseurs de num_permutations.
+
+    :param num_permutations: Nombre de composantes des signatures.
+    :param threshold: Seuil de similarité (Jaccard) visé.
+    :return: Nombre de bandes.
+    """
+    divisors = [bands for bands in range(1, num_permutations + 1) if num_permutations % bands == 0]
+    return min(
+        divisors,
+        key=lambda bands: abs((1 / bands) ** (bands / num_permutations) - threshold)
+    )
+
+class MinHashIndex:
+    """
+    Index LSH de signatures MinHash : les signatures sont découpées en bandes et
+    deux documents deviennent candidats dès qu'une de leurs bandes est identique.
+    Seules les paires candidates ont ensuite besoin d'une comparaison complète.
+    L'index peut être enregistré puis rechargé pour tester de nouveaux documents
+    sans recalculer les signatures du corpus.
+    """
+
+    def __init__(
+            self,
+            num_permutations: int = NUM_PERMUTATIONS,
+            threshold: float = DEFAULT_THRESHOLD,
+            shingle_size: int = SHINGLE_SIZE
+        ):
+        """
+        :param num_permutations: Nombre de composantes des signatures.
+        :param threshold: Seuil de similarité (Jaccard) visé par le découpage en bandes.
+        :param shingle_size: Nombre de mots par bardeau.
+        """
+        self.num_permutations = num_permutations
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands = choose_bands(num_permutations, threshold)
+        self.rows = num_permutations // self.bands
+        self.signatures = {}
+        self._buckets = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.signatures
+
+    def _band_keys(self, signature: array) -> Iterator[tuple]:
+        rows = self.rows
+        for band in range(self.bands):
+            yield (band, *signature[band * rows:(band + 1) * rows])
+
+    def signature(self, text: str) -> array:
+        """
+        :param text: Texte prétraité.
+        :return: Signature du texte avec les paramètres de l'index.
+        """
+        return minhash_signature(shingle_hashes(text, self.shingle_size), self.num_permutations)
+
+    def add(self, doc_id: str, signature: array) -> None:
+        """
+        Ajoute (ou remplace) la signature d'un document.
+
+        :param doc_id: Identifiant du document (par exemple son chemin).
+        :param signature: Signature calculée avec les mêmes paramètres.
+        """
+        if doc_id in self.signatures:
+            self.remove(doc_id)
+        self.signatures[doc_id] = signature
+        for key in self._band_keys(signature):
+            self._buckets[key].append(doc_id)
+
+    def remove(self, doc_id: str) -> None:
+        """
+        :param doc_id: Identifiant du document à retirer de l'index.
+        """
+        signature = self.signatures.pop(doc_id)
+        for key in self._band_keys(signature):
+            bucket = self._buckets[key]
+            bucket.remove(doc_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def query(self, signature: array) -> dict[str, float]:
+        """
+        Recherche les documents candidats pour une signature.
+
+        :param signature: Signature du document recherché.
+        :return: Dictionnaire {identifiant: Jaccard estimé} des candidats.
+        """
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+        return {doc_id: estimate_jaccard(signature, self.signatures[doc_id]) for doc_id in candidates}
+
+    def candidate_pairs(self) -> dict[tuple[str, str], float]:
+        """
+        :return: Dictionnaire {(identifiant 1, identifiant 2): Jaccard estimé}
+                 de toutes les paires partageant au moins une bande.
+        """
+        pairs = {}
+        for bucket in self._buckets.values():
+            for doc1, doc2 in combinations(sorted(bucket), 2):
+                if (doc1, doc2) not in pairs:
+                    pairs[(doc1, doc2)] = estimate_jaccard(self.signatures[doc1], self.signatures[doc2])
+        return pairs
+
+    def save(self, filepath: str) -> None:
+        """
+        Enregistre l'index : un en-tête JSON (paramètres, identifiants) suivi des
+        signatures brutes en entiers 64 bits.
+
+        :param filepath: Chemin du fichier de signatures.
+        """
+        doc_ids = list(self.signatures)
+        header = json.dumps({
+            "num_permutations": self.num_permutations,
+            "threshold": self.threshold,
+            "shingle_size": self.shingle_size,
+            "documents": doc_ids,
+            "lengths": [len(self.signatures[doc_id]) for doc_id in doc_ids]
+        }).encode('utf-8')
+
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(_SIGNATURE_MAGIC)
+            file.write(struct.pack('<Q', len(header)))
+            file.write(header)
+            for doc_id in doc_ids:
+                self.signatures[doc_id].tofile(file)
+        os.replace(tmp_path, filepath)
+
+    @classmethod
+    def load(cls, filepath: str) -> "MinHashIndex":
+        """
+        :param filepath: Chemin d'un fichier écrit par save.
+        :return: Index reconstruit (les bandes sont recalculées à la lecture).
+        :raises ValueError: Si le fichier n'est pas un fichier de signatures.
+        """
+        with open(filepath, 'rb') as file:
+            if file.read(len(_SIGNATURE_MAGIC)) != _SIGNATURE_MAGIC:
+                raise ValueError(f"Fichier de signatures invalide : {filepath}")
+            (header_size,) = struct.unpack('<Q', file.read(8))
+            header = json.loads(file.read(header_size))
+            index = cls(header["num_permutations"], header["threshold"], header["shingle_size"])
+            for doc_id, length in zip(header["documents"], header["lengths"]):
+                signature = array('Q')
+                signature.fromfile(file, length)
+                index.add(doc_id, signature)
+        return index
+
+def _document_signature(filepath: str, mode: str, num_permutations: int, shingle_size: int) -> array | None:
+    text = load_document(filepath, mode)
+    if text is None:
+        return None
+    return minhash_signature(shingle_hashes(text, shingle_size), num_permutations)
+
+def index_documents(
+        index: MinHashIndex,
+        paths: list[str],
+        mode: str = "souple",
+        workers: int | None = None
+    ) -> list[str]:
+    """
+    Calcule (en parallèle) la signature des documents absents de l'index et les
+    y ajoute.
+
+    :param index: Index à compléter.
+    :param paths: Chemins des documents.
+    :param mode: Mode de prétraitement ('souple' ou 'strict').
+    :param workers: Nombre de processus (None = tous les cœurs, 1 = en série).
+    :return: Liste des documents qui n'ont pas pu être lus.
+    """
+    paths = [path for path in paths if path not in index]
+    workers = workers or os.cpu_count() or 1
+    arguments = (paths, [mode] * len(paths), [index.num_permutations] * len(paths),
+                 [index.shingle_size] * len(paths))
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            signatures = list(executor.map(_document_signature, *arguments, chunksize=16))
+    else:
+        signatures = list(map(_document_signature, *arguments))
+
+    unreadable = []
+    for path, signature in zip(paths, signatures):
+        if signature is None:
+            unreadable.append(path)
+        else:
+            index.add(path, signature)
+    return unreadable
+
+def find_near_duplicates(
+        paths: list[str],
+        threshold: float = DEFAULT_THRESHOLD,
+        mode: str = "souple",
+        workers: int | None = None,
+        index: MinHashIndex | None = None
+    ) -> Iterator[dict]:
+    """
+    Recherche les paires de documents quasi identiques d'un corpus. Les
+    signatures MinHash et l'index LSH désignent les paires candidates ; seules
+    celles dont le Jaccard estimé atteint le seuil sont comparées ligne à ligne.
+
+    Si un index déjà rempli est fourni (MinHashIndex.load), seules les paires
+    impliquant au moins un des documents de paths sont examinées : c'est le cas
+    d'un lot de nouveaux documents confronté à un corpus existant.
+
+    :param paths: Chemins des documents à examiner.
+    :param threshold: Seuil de similarité (Jaccard estimé) des candidats retenus.
+    :param mode: Mode de prétraitement ('souple' ou 'strict').
+    :param workers: Nombre de processus pour le calcul des signatures.
+    :param index: Index existant à compléter, ou None pour un nouvel index.
+    :return: Générateur de dictionnaires {document1, document2,
+             estimated_jaccard, similarity_rate, ...} triés par Jaccard décroissant.
+    """
+    if index is None:
+        index = MinHashIndex(threshold=threshold)
+    corpus_size = len(index)
+    index_documents(index, paths, mode, workers)
+
+    if corpus_size == 0:
+        # Nouvel index : toutes les paires partageant une bande
+        pairs = index.candidate_pairs()
+    else:
+        # Corpus existant : seuls les compartiments des nouveaux documents sont parcourus
+        pairs = {}
+        for path in dict.fromkeys(paths):
+            if path not in index:
+                continue
+            for other, jaccard in index.query(index.signatures[path]).items():
+                if other != path:
+                    pairs[(path, other) if path < other else (other, path)] = jaccard
+    candidates = [(pair, jaccard) for pair, jaccard in pairs.items() if jaccard >= threshold]
+    candidates.sort(key=lambda item: item[1], reverse=True)
+
+    # Un même document apparaît souvent dans plusieurs paires candidates
+    load = lru_cache(maxsize=256)(lambda path: load_document(path, mode))
+    for (path1, path2), jaccard in candidates:
+        text1 = load(path1)
+        text2 = load(path2)
+        if text1 is None or text2 is None:
+            continue
+        document1 = TokenizedDocument(text1)
+        document2 = TokenizedDocument(text2, document1.vocabulary)
+        record = {"document1": path1, "document2": path2, "estimated_jaccard": round(jaccard, 4)}
+        record.update(summarize_comparison(document1, document2))
+        yield record
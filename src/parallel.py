@@ -0,0 +1,50 @@
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+
+def ordered_chunked_map(
+        fn: Callable,
+        batches: Iterable,
+        workers: int
+    ) -> Iterator[tuple]:
+    """
+    Applique fn à chaque lot de batches dans un pool de processus et produit
+    les résultats dans l'ordre des lots, au fur et à mesure.
+
+    Fenêtre glissante : au plus deux lots par processus sont en cours à un
+    instant donné, si bien que la mémoire occupée ne dépend pas du nombre de
+    lots, et batches n'est consommé qu'au rythme des résultats. Si le
+    générateur est fermé avant la fin, les lots pas encore commencés sont
+    abandonnés et la sortie n'attend que ceux en cours. Avec workers <= 1,
+    les lots sont traités en série, sans pool.
+
+    :param fn: Fonction de module (transmise aux processus par pickle) appelée
+               avec un lot.
+    :param batches: Lots à traiter (itérable, éventuellement paresseux).
+    :param workers: Nombre de processus.
+    :return: Générateur de tuples (lot, fn(lot)).
+    """
+    batches = iter(batches)
+    if workers <= 1:
+        for batch in batches:
+            yield batch, fn(batch)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for batch in batches:
+                pending.append((batch, executor.submit(fn, batch)))
+                if len(pending) >= 2 * workers:
+                    break
+            while pending:
+                batch, future = pending.popleft()
+                result = future.result()
+                following = next(batches, None)
+                if following is not None:
+                    pending.append((following, executor.submit(fn, following)))
+                yield batch, result
+        finally:
+            for _, future in pending:
+                future.cancel()
@@ -0,0 +1,391 @@
+import hashlib
+import re
+import sqlite3
+from collections import deque
+from collections.abc import Iterable, Iterator
+from hashlib import blake2b
+
+from batch_comparison import load_document
+from text_preprocessor import COMPARISON_MODES
+
+# Nombre de mots par k-gramme et taille de la fenêtre de winnowing : tout passage
+# commun d'au moins PASSAGE_GRAM_SIZE + WINNOW_WINDOW - 1 mots partage au moins
+# une empreinte ; plus la fenêtre est grande, moins l'index garde d'empreintes
+# (environ 2 / (WINNOW_WINDOW + 1) par mot).
+PASSAGE_GRAM_SIZE = 8
+WINNOW_WINDOW = 8
+
+# Version du schéma de la base : une base d'une autre version est refusée
+PASSAGE_INDEX_VERSION = 1
+# Nombre d'empreintes insérées par requête
+_INSERT_BATCH_SIZE = 10000
+
+# Hachage polynomial des k-grammes (empreintes de 61 bits, qui tiennent dans un
+# entier signé SQLite), modulo un nombre premier de Mersenne
+_GRAM_BASE = 1_000_003
+_GRAM_MODULUS = (1 << 61) - 1
+
+_WORD_RE = re.compile(r'\S+')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    text_hash TEXT NOT NULL,
+    words INTEGER NOT NULL,
+    fingerprints INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    hash INTEGER NOT NULL,
+    document INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    PRIMARY KEY (hash, document, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fingerprints_document ON fingerprints (document);
+"""
+
+def winnow_fingerprints(
+        text: str,
+        gram_size: int = PASSAGE_GRAM_SIZE,
+        window: int = WINNOW_WINDOW
+    ) -> list[tuple[int, int, int, int]]:
+    """
+    Calcule les empreintes d'un texte prétraité (text_preprocessor) par winnowing :
+    le texte est découpé en k-grammes de gram_size mots consécutifs, et seule
+    l'empreinte minimale de chaque fenêtre de window k-grammes consécutifs est
+    gardée (la plus à droite en cas d'égalité). Les empreintes ne dépendent pas
+    du processus (BLAKE2b des mots), ce qui permet de les conserver sur disque.
+
+    :param text: Texte prétraité.
+    :param gram_size: Nombre de mots par k-gramme.
+    :param window: Nombre de k-grammes par fenêtre.
+    :return: Liste ordonnée de quadruplets (empreinte, position du premier mot,
+             début et fin du k-gramme en caractères dans text).
+    """
+    matches = list(_WORD_RE.finditer(text))
+    if not matches:
+        return []
+    # Un texte plus court qu'un k-gramme forme un seul k-gramme
+    size = min(gram_size, len(matches))
+
+    word_hashes = {}
+    values = []
+    for match in matches:
+        word = match.group()
+        value = word_hashes.get(word)
+        if value is None:
+            value = word_hashes[word] = int.from_bytes(
+                blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little') % _GRAM_MODULUS
+        values.append(value)
+
+    # Hachage glissant : on retire le mot sortant (pondéré par base^(size-1))
+    grams = []
+    high = pow(_GRAM_BASE, size - 1, _GRAM_MODULUS)
+    current = 0
+    for i, value in enumerate(values):
+        if i >= size:
+            current -= values[i - size] * high
+        current = (current * _GRAM_BASE + value) % _GRAM_MODULUS
+        if i >= size - 1:
+            grams.append(current)
+
+    # Minimum glissant : la file garde les candidats d'empreintes croissantes
+    fingerprints = []
+    window = min(window, len(grams))
+    candidates = deque()
+    selected = -1
+    for i, value in enumerate(grams):
+        while candidates and grams[candidates[-1]] >= value:
+            candidates.pop()
+        candidates.append(i)
+        if candidates[0] <= i - window:
+            candidates.popleft()
+        if i >= window - 1 and candidates[0] != selected:
+            selected = candidates[0]
+            fingerprints.append((grams[selected], selected, matches[selected].start(),
+                                 matches[selected + size - 1].end()))
+    return fingerprints
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class PassageIndex:
+    """
+    Index persistant (base SQLite) des passages d'un corpus de documents : pour
+    chaque document, les empreintes de winnowing de son texte prétraité, avec leur
+    position. Un nouveau texte est confronté au corpus entier par une seule
+    jointure sur les empreintes, sans comparer les documents un à un ; les
+    documents peuvent être ajoutés, remplacés ou retirés un par un.
+
+    Les positions sont des indices de caractères dans le texte prétraité
+    (load_document), qui peuvent être ramenés au texte d'origine par
+    text_preprocessor.preprocess_with_offsets.
+    """
+
+    def __init__(
+            self,
+            filepath: str,
+            mode: str | None = None,
+            gram_size: int | None = None,
+            window: int | None = None
+        ):
+        """
+        Ouvre (ou crée) un index. Les paramètres d'un index existant sont ceux
+        de sa création ; les paramètres omis prennent ces valeurs ou, pour un
+        nouvel index, les valeurs par défaut.
+
+        :param filepath: Chemin de la base SQLite.
+        :param mode: Mode de prétraitement des documents ('souple' ou 'strict').
+        :param gram_size: Nombre de mots par k-gramme.
+        :param window: Taille de la fenêtre de winnowing.
+        :raises ValueError: Si un paramètre diffère de celui d'un index existant,
+                            ou si la base n'est pas un index de passages.
+        """
+        self.filepath = filepath
+        self.connection = sqlite3.connect(filepath)
+        try:
+            self.connection.executescript(_SCHEMA)
+            stored = dict(self.connection.execute("SELECT name, value FROM settings"))
+            requested = {"version": PASSAGE_INDEX_VERSION, "mode": mode, "gram_size": gram_size, "window": window}
+            defaults = {"version": PASSAGE_INDEX_VERSION, "mode": "souple",
+                        "gram_size": PASSAGE_GRAM_SIZE, "window": WINNOW_WINDOW}
+            settings = {}
+            for name, default in defaults.items():
+                value = requested[name]
+                if name in stored:
+                    value_type = type(default)
+                    if value is not None and value_type(stored[name]) != value:
+                        raise ValueError(f"Index de passages {filepath} : {name} vaut {stored[name]}, "
+                                         f"et non {value}")
+                    value = value_type(stored[name])
+                settings[name] = default if value is None else value
+            if settings["mode"] not in COMPARISON_MODES:
+                raise ValueError(f"Mode de comparaison inconnu : {settings['mode']}")
+            with self.connection:
+                self.connection.executemany("INSERT OR IGNORE INTO settings VALUES (?, ?)",
+                                            [(name, str(value)) for name, value in settings.items()])
+        except (sqlite3.DatabaseError, ValueError) as e:
+            self.connection.close()
+            # Base verrouillée ou occupée (OperationalError) : erreur transitoire, propagée telle quelle
+            if isinstance(e, (ValueError, sqlite3.OperationalError)):
+                raise
+            raise ValueError(f"Index de passages invalide : {filepath} ({e})") from e
+
+        self.mode = settings["mode"]
+        self.gram_size = settings["gram_size"]
+        self.window = settings["window"]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "PassageIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def __contains__(self, name: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM documents WHERE name = ?", (name,)).fetchone() is not None
+
+    def names(self) -> list[str]:
+        """
+        :return: Identifiants des documents indexés, triés.
+        """
+        return [name for (name,) in self.connection.execute("SELECT name FROM documents ORDER BY name")]
+
+    def fingerprints(self, text: str) -> list[tuple[int, int, int, int]]:
+        """
+        :param text: Texte prétraité.
+        :return: Empreintes du texte avec les paramètres de l'index (voir winnow_fingerprints).
+        """
+        return winnow_fingerprints(text, self.gram_size, self.window)
+
+    def add_text(self, name: str, text: str) -> bool:
+        """
+        Ajoute (ou remplace) un document à partir de son texte prétraité.
+
+        :param name: Identifiant du document (par exemple son chemin).
+        :param text: Texte prétraité dans le mode de l'index.
+        :return: False si le document était déjà indexé avec le même texte, True sinon.
+        """
+        text_hash = _text_hash(text)
+        row = self.connection.execute("SELECT text_hash FROM documents WHERE name = ?", (name,)).fetchone()
+        if row is not None and row[0] == text_hash:
+            return False
+
+        fingerprints = self.fingerprints(text)
+        with self.connection:
+            self._remove(name)
+            cursor = self.connection.execute(
+                "INSERT INTO documents (name, text_hash, words, fingerprints) VALUES (?, ?, ?, ?)",
+                (name, text_hash, len(text.split()), len(fingerprints)))
+            document = cursor.lastrowid
+            for offset in range(0, len(fingerprints), _INSERT_BATCH_SIZE):
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO fingerprints VALUES (?, ?, ?, ?, ?)",
+                    [(value, document, position, start, end)
+                     for value, position, start, end in fingerprints[offset:offset + _INSERT_BATCH_SIZE]])
+        return True
+
+    def add_document(self, filepath: str, cache_dir: str | None = None) -> bool | None:
+        """
+        Lit, prétraite (mode de l'index) et ajoute un document, identifié par son chemin.
+
+        :param filepath: Chemin du document (.txt ou .pdf).
+        :param cache_dir: Répertoire du cache des documents prétraités.
+        :return: True si le document a été ajouté ou mis à jour, False s'il était
+                 déjà indexé à l'identique, None s'il n'a pas pu être lu.
+        """
+        text = load_document(filepath, self.mode, cache_dir)
+        if text is None:
+            return None
+        return self.add_text(filepath, text)
+
+    def _remove(self, name: str) -> bool:
+        row = self.connection.execute("SELECT id FROM documents WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return False
+        self.connection.execute("DELETE FROM fingerprints WHERE document = ?", row)
+        self.connection.execute("DELETE FROM documents WHERE id = ?", row)
+        return True
+
+    def remove(self, name: str) -> bool:
+        """
+        :param name: Identifiant du document à retirer de l'index.
+        :return: True si le document était indexé.
+        """
+        with self.connection:
+            return self._remove(name)
+
+    def query_text(self, text: str, limit: int | None = 10, exclude: str | None = None) -> list[dict]:
+        """
+        Recherche les documents indexés qui partagent des passages avec un texte.
+
+        Les empreintes communes sont regroupées en passages : deux empreintes
+        d'un même document se suivent dans un passage lorsqu'elles gardent le
+        même décalage de mots entre les deux textes et sont distantes d'au plus
+        une fenêtre. Les documents sont classés par nombre d'empreintes du texte
+        retrouvées (puis par identifiant).
+
+        :param text: Texte prétraité dans le mode de l'index.
+        :param limit: Nombre maximal de documents renvoyés (None = tous).
+        :param exclude: Identifiant d'un document à ignorer (le texte lui-même s'il est indexé).
+        :return: Liste triée de dictionnaires {'document', 'shared_fingerprints',
+                 'coverage' (pourcentage des empreintes du texte retrouvées),
+                 'matched_words' (mots du texte couverts par les passages), 'passages'}. Chaque passage est un dictionnaire
+                 {'words', 'start', 'end' (caractères du texte), 'document_start',
+                 'document_end' (caractères du document indexé)}, dans l'ordre du texte.
+        """
+        fingerprints = self.fingerprints(text)
+        if not fingerprints:
+            return []
+
+        connection = self.connection
+        # Transaction validée (ou annulée) à la sortie : aucun verrou n'est gardé
+        # sur l'index entre deux recherches, pour les autres processus.
+        with connection:
+            connection.execute("CREATE TEMP TABLE IF NOT EXISTS query (hash INTEGER, position INTEGER, "
+                               "start INTEGER, end INTEGER)")
+            connection.execute("DELETE FROM temp.query")
+            connection.executemany("INSERT INTO temp.query VALUES (?, ?, ?, ?)", fingerprints)
+            # Classement en SQL ; seuls les documents retenus sont ensuite lus en détail.
+            # CROSS JOIN impose de partir des empreintes du texte (recherches par empreinte).
+            ranking = connection.execute(
+                "SELECT d.id, d.name, COUNT(DISTINCT q.position) AS shared "
+                "FROM temp.query AS q CROSS JOIN fingerprints AS f ON f.hash = q.hash "
+                "CROSS JOIN documents AS d ON d.id = f.document WHERE d.name IS NOT ? "
+                "GROUP BY d.id ORDER BY shared DESC, d.name LIMIT ?",
+                (exclude, -1 if limit is None else limit)).fetchall()
+            candidates = []
+            for document, name, shared in ranking:
+                matches = connection.execute(
+                    "SELECT q.position, q.start, q.end, f.position, f.start, f.end "
+                    "FROM temp.query AS q CROSS JOIN fingerprints AS f ON f.hash = q.hash AND f.document = ? "
+                    "ORDER BY q.position, f.position", (document,))
+                candidate = {"document": name, "shared_fingerprints": shared,
+                             "coverage": round(shared / len(fingerprints) * 100, 2)}
+                candidate.update(self._passages(matches))
+                candidates.append(candidate)
+            # Vidée avant la validation ; en cas d'erreur, l'annulation de la transaction suffit
+            connection.execute("DELETE FROM temp.query")
+        return candidates
+
+    def query_document(self, filepath: str, limit: int | None = 10, cache_dir: str | None = None) -> list[dict] | None:
+        """
+        Équivalent de query_text pour un fichier, lu et prétraité dans le mode
+        de l'index ; le document lui-même est ignoré s'il est indexé.
+
+        :param filepath: Chemin du document (.txt ou .pdf).
+        :param limit: Nombre maximal de documents renvoyés (None = tous).
+        :param cache_dir: Répertoire du cache des documents prétraités.
+        :return: Candidats (voir query_text), ou None si le document n'a pas pu être lu.
+        """
+        text = load_document(filepath, self.mode, cache_dir)
+        if text is None:
+            return None
+        return self.query_text(text, limit, exclude=filepath)
+
+    def _passages(self, matches: Iterable[tuple]) -> dict:
+        # Passages ouverts, indexés par décalage de mots entre les deux textes
+        passages = []
+        open_passages = {}
+        for position, start, end, doc_position, doc_start, doc_end in matches:
+            shift = doc_position - position
+            passage = open_passages.get(shift)
+            if passage is not None and position - passage["last"] <= self.window:
+                passage["last"] = position
+                passage["end"] = max(passage["end"], end)
+                passage["document_end"] = max(passage["document_end"], doc_end)
+            else:
+                passage = {"first": position, "last": position, "start": start, "end": end,
+                           "document_start": doc_start, "document_end": doc_end}
+                open_passages[shift] = passage
+                passages.append(passage)
+
+        # Mots du texte couverts par au moins un passage (passages dans l'ordre du texte)
+        matched_words = 0
+        covered_until = 0
+        for passage in passages:
+            first, stop = passage.pop("first"), passage.pop("last") + self.gram_size
+            passage["words"] = stop - first
+            if stop > covered_until:
+                matched_words += stop - max(first, covered_until)
+                covered_until = stop
+
+        return {
+            "matched_words": matched_words,
+            "passages": [{key: passage[key] for key in ("words", "start", "end", "document_start", "document_end")}
+                         for passage in passages]
+        }
+
+def find_shared_passages(
+        index: PassageIndex,
+        paths: list[str],
+        limit: int | None = 10,
+        cache_dir: str | None = None
+    ) -> Iterator[dict]:
+    """
+    Recherche, pour chaque document, les documents de l'index qui partagent des
+    passages avec lui, puis l'ajoute à l'index : un document est aussi confronté
+    aux documents qui le précèdent dans paths.
+
+    :param index: Index de passages à interroger et compléter.
+    :param paths: Chemins des documents.
+    :param limit: Nombre maximal de documents candidats par document.
+    :param cache_dir: Répertoire du cache des documents prétraités.
+    :return: Générateur de dictionnaires {'document', 'candidates'} (voir
+             PassageIndex.query_text), ou {'document', 'error'}.
+    """
+    for path in paths:
+        text = load_document(path, index.mode, cache_dir)
+        if text is None:
+            yield {"document": path, "error": "document illisible ou format non supporté"}
+            continue
+        yield {"document": path, "candidates": index.query_text(text, limit, exclude=path)}
+        index.add_text(path, text)
@@ -0,0 +1,263 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import nullcontext
+
+# Profileur actif (None : instrumentation désactivée)
+_active_profiler = None
+
+# Contexte vide réutilisable, renvoyé par stage() quand aucun profileur n'est actif
+_NULL_STAGE = nullcontext()
+
+def stage(name: str, **sizes: int):
+    """
+    Délimite une étape à mesurer : `with stage("compare_lines", lines=n): ...`.
+    Sans profileur actif, renvoie un contexte vide partagé : le coût se limite
+    à un appel de fonction et à une lecture de variable globale.
+
+    :param name: Nom de l'étape.
+    :param sizes: Tailles des entrées de l'étape (lignes, octets, pages...).
+    :return: Gestionnaire de contexte.
+    """
+    profiler = _active_profiler
+    if profiler is None:
+        return _NULL_STAGE
+    return _Stage(profiler, name, sizes)
+
+def is_enabled() -> bool:
+    """
+    Indique si un profileur est actif, pour éviter de calculer des tailles
+    coûteuses lorsque l'instrumentation est désactivée.
+    """
+    return _active_profiler is not None
+
+def profile_iterator(name: str, iterable: Iterable, **sizes: int) -> Iterable:
+    """
+    Mesure comme une étape la production des éléments d'un itérateur consommé
+    paresseusement (par exemple pendant l'écriture du rapport) : le temps de
+    chaque élément est cumulé, sans le temps passé par le consommateur entre
+    deux éléments, et un seul enregistrement est émis quand l'itérateur est
+    épuisé ou fermé. Sans profileur actif, l'itérable est renvoyé tel quel.
+
+    :param name: Nom de l'étape.
+    :param iterable: Itérable à mesurer.
+    :param sizes: Tailles des entrées de l'étape ; le nombre d'éléments produits
+                  est ajouté sous la clé 'items'.
+    :return: Itérable produisant les mêmes éléments.
+    """
+    if not is_enabled():
+        return iterable
+    return _profiled(_active_profiler, name, iter(iterable), sizes)
+
+def _profiled(profiler: "Profiler", name: str, iterator: Iterator, sizes: dict) -> Iterator:
+    start = depth = None
+    wall_time = cpu_time = 0.0
+    count = 0
+    try:
+        while True:
+            begin, cpu = time.perf_counter(), time.process_time()
+            if start is None:
+                start, depth = begin, len(profiler._stack())
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                wall_time += time.perf_counter() - begin
+                cpu_time += time.process_time() - cpu
+            count += 1
+            yield item
+    finally:
+        # Fermeture anticipée : l'itérateur mesuré est fermé lui aussi
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+        if start is not None:
+            profiler._emit({
+                "name": name,
+                "start": start - profiler._origin,
+                "wall_time": wall_time,
+                "cpu_time": cpu_time,
+                "depth": depth,
+                "thread": threading.get_ident(),
+                "sizes": {**sizes, "items": count}
+            })
+
+class _Stage:
+    __slots__ = ("profiler", "name", "sizes", "frame")
+
+    def __init__(self, profiler: "Profiler", name: str, sizes: dict):
+        self.profiler = profiler
+        self.name = name
+        self.sizes = sizes
+        self.frame = None
+
+    def __enter__(self) -> "_Stage":
+        self.frame = self.profiler._enter(self.name)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.profiler._exit(self.frame, self.name, self.sizes)
+
+class Profiler:
+    """
+    Enregistre, pour chaque étape délimitée par stage(), le temps écoulé, le
+    temps CPU, les tailles d'entrée et, en option, les allocations mémoire
+    (tracemalloc). S'utilise comme gestionnaire de contexte :
+
+        with Profiler() as profiler:
+            compare_documents(texte1, texte2, None)
+        profiler.export_chrome_trace("trace.json")
+
+    Les étapes imbriquées sont enregistrées avec leur profondeur ; chaque
+    enregistrement est aussi transmis au callback éventuel dès la fin de l'étape.
+    """
+
+    def __init__(self, track_allocations: bool = False, callback: Callable[[dict], None] | None = None):
+        """
+        :param track_allocations: Si True, mesure les allocations de chaque étape
+        (tracemalloc, qui ralentit nettement l'exécution).
+        :param callback: Fonction appelée avec chaque enregistrement terminé.
+        """
+        self.track_allocations = track_allocations
+        self.callback = callback
+        self.records = []
+        self._origin = time.perf_counter()
+        self._stacks = threading.local()
+        self._previous = None
+        self._started_tracemalloc = False
+
+    def __enter__(self) -> "Profiler":
+        global _active_profiler
+        self._previous = _active_profiler
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        _active_profiler = self
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global _active_profiler
+        _active_profiler = self._previous
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _stack(self) -> list:
+        stack = getattr(self._stacks, "frames", None)
+        if stack is None:
+            stack = self._stacks.frames = []
+        return stack
+
+    def _enter(self, name: str) -> dict:
+        stack = self._stack()
+        frame = {"depth": len(stack)}
+        if self.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            # Le pic de l'étape parente est conservé avant la remise à zéro du pic
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frame["memory"] = current
+            frame["peak"] = current
+        stack.append(frame)
+        frame["cpu"] = time.process_time()
+        frame["start"] = time.perf_counter()
+        return frame
+
+    def _exit(self, frame: dict, name: str, sizes: dict) -> None:
+        end = time.perf_counter()
+        cpu = time.process_time() - frame["cpu"]
+        stack = self._stack()
+        stack.pop()
+
+        record = {
+            "name": name,
+            "start": frame["start"] - self._origin,
+            "wall_time": end - frame["start"],
+            "cpu_time": cpu,
+            "depth": frame["depth"],
+            "thread": threading.get_ident(),
+            "sizes": sizes
+        }
+        if self.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(frame["peak"], peak)
+            record["allocated_bytes"] = current - frame["memory"]
+            record["peak_bytes"] = peak - frame["memory"]
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+
+        self._emit(record)
+
+    def _emit(self, record: dict) -> None:
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def summary(self) -> dict:
+        """
+        Agrège les enregistrements par nom d'étape.
+
+        :return: Dictionnaire {étape: {'count', 'wall_time', 'cpu_time'}} (temps cumulés, en secondes).
+        """
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record["name"], {"count": 0, "wall_time": 0.0, "cpu_time": 0.0})
+            total["count"] += 1
+            total["wall_time"] += record["wall_time"]
+            total["cpu_time"] += record["cpu_time"]
+        return totals
+
+    def to_dict(self) -> dict:
+        """
+        :return: Enregistrements et résumé, sérialisables en JSON.
+        """
+        return {"records": self.records, "summary": self.summary()}
+
+    def export_json(self, filepath: str) -> None:
+        """
+        Enregistre les mesures au format JSON.
+
+        :param filepath: Chemin du fichier de sortie.
+        """
+        with open(filepath, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Convertit les mesures au format « Trace Event » de Chrome (événements
+        complets 'X', en microsecondes), lisible par chrome://tracing ou Perfetto.
+
+        :return: Dictionnaire {'traceEvents': [...]}.
+        """
+        pid = os.getpid()
+        events = []
+        for record in self.records:
+            args = dict(record["sizes"])
+            args["cpu_time_ms"] = round(record["cpu_time"] * 1000, 3)
+            if "allocated_bytes" in record:
+                args["allocated_bytes"] = record["allocated_bytes"]
+                args["peak_bytes"] = record["peak_bytes"]
+            events.append({
+                "name": record["name"],
+                "ph": "X",
+                "ts": round(record["start"] * 1e6, 3),
+                "dur": round(record["wall_time"] * 1e6, 3),
+                "pid": pid,
+                "tid": record["thread"],
+                "args": args
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, filepath: str) -> None:
+        """
+        Enregistre les mesures au format Chrome trace (voir to_chrome_trace).
+
+        :param filepath: Chemin du fichier de sortie.
+        """
+        with open(filepath, 'w', encoding='utf-8') as file:
+            json.dump(self.to_chrome_trace(), file)
@@ -1,82 +1,163 @@
-def summarize_line_differences(line_comparison: dict) -> str:
+from collections.abc import Iterator
+from typing import TextIO
+
+from mapped_document import MappedDocument
+from profiling import stage
+from tokenized_document import TokenizedDocument
+
+# Taille du tampon d'écriture des rapports exportés dans un fichier
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Libellés des mesures de similarité (similarity_metrics) dans les rapports
+SIMILARITY_METRIC_LABELS = {
+    "lines": "Lignes communes",
+    "jaccard": "Jaccard (mots)",
+    "cosine": "Cosinus TF-IDF (mots)",
+    "edit": "Distance d'édition (mots)"
+}
+
+def iter_line_differences(line_comparison: dict) -> Iterator[str]:
     """
-    Génère un résumé clair des différences ligne par ligne entre deux documents.
+    Produit une à une les lignes du résumé des différences ligne par ligne
+    (voir summarize_line_differences), sans construire le résumé complet.
 
     :param line_comparison: Résultat retourné par compare_lines().
-    :return: Résumé texte avec indicateurs (+/-/=) pour chaque type de ligne.
+    :return: Générateur des lignes du résumé (sans fin de ligne).
     """
-    summary = []
+    empty = True
 
     # Lignes identiques
     if line_comparison.get("common"):
-        summary.append("=== Lignes identiques ===")
+        empty = False
+        yield "=== Lignes identiques ==="
         for line in line_comparison["common"]:
-            summary.append(f"= {line}")
-        summary.append("")  # Ligne vide pour aérer
+            yield f"= {line}"
+        yield ""  # Ligne vide pour aérer
 
-    # Lignes différentes (même position mais contenu différent)
+    # Lignes modifiées (appariées par l'alignement)
     if line_comparison.get("diff"):
-        summary.append("=== Lignes différentes (position équivalente) ===")
+        empty = False
+        yield "=== Lignes modifiées ==="
         for l1, l2 in line_comparison["diff"]:
-            summary.append(f"- {l1}")
-            summary.append(f"+ {l2}")
-        summary.append("")
+            yield f"- {l1}"
+            yield f"+ {l2}"
+        yield ""
+
+    # Blocs déplacés (compare_lines(..., detect_moves=True))
+    if line_comparison.get("moves"):
+        empty = False
+        yield "=== Blocs déplacés ==="
+        yield from iter_moved_blocks(line_comparison)
+        yield ""
 
     # Lignes présentes uniquement dans le document 1
     if line_comparison.get("unique_to_text1"):
-        summary.append("=== Lignes uniquement dans le document 1 ===")
+        empty = False
+        yield "=== Lignes uniquement dans le document 1 ==="
         for line in line_comparison["unique_to_text1"]:
-            summary.append(f"- {line}")
-        summary.append("")
+            yield f"- {line}"
+        yield ""
 
     # Lignes présentes uniquement dans le document 2
     if line_comparison.get("unique_to_text2"):
-        summary.append("=== Lignes uniquement dans le document 2 ===")
+        empty = False
+        yield "=== Lignes uniquement dans le document 2 ==="
         for line in line_comparison["unique_to_text2"]:
-            summary.append(f"+ {line}")
-        summary.append("")
+            yield f"+ {line}"
+        yield ""
 
-    if not summary:
-        summary.append("Aucune différence détectée. Les documents sont identiques.")
+    if empty:
+        yield "Aucune différence détectée. Les documents sont identiques."
 
-    return "\n".join(summary)
+def iter_moved_blocks(line_comparison: dict) -> Iterator[str]:
+    """
+    Décrit chaque bloc déplacé sur une seule ligne : positions (à partir de 1)
+    dans les deux textes, nombre de lignes et première ligne du bloc.
+
+    :param line_comparison: Résultat de compare_lines(..., detect_moves=True).
+    :return: Générateur des lignes de description (sans fin de ligne).
+    """
+    moved = line_comparison["moved"]
+    offset = 0
+    for i1, i2, j1, j2 in line_comparison["moves"]:
+        size = i2 - i1
+        yield (f"~ Lignes {i1 + 1}-{i2} du texte 1 → lignes {j1 + 1}-{j2} du texte 2 "
+               f"({size} lignes) : « {moved[offset]} »")
+        offset += size
+
+def summarize_line_differences(line_comparison: dict) -> str:
+    """
+    Génère un résumé clair des différences ligne par ligne entre deux documents.
+
+    :param line_comparison: Résultat retourné par compare_lines().
+    :return: Résumé texte avec indicateurs (+/-/=) pour chaque type de ligne.
+    """
+    return "\n".join(iter_line_differences(line_comparison))
+
+def write_line_differences(line_comparison: dict, stream: TextIO) -> None:
+    """
+    Écrit le résumé des différences ligne par ligne directement dans un flux
+    (fichier ouvert, sys.stdout...), ligne après ligne : la mémoire utilisée
+    ne dépend pas de la taille du résumé.
+
+    :param line_comparison: Résultat retourné par compare_lines().
+    :param stream: Flux texte de destination.
+    """
+    _write_lines(iter_line_differences(line_comparison), stream)
+
+def _write_lines(lines: Iterator[str], stream: TextIO) -> None:
+    # Même contenu que "\n".join(lines), écrit au fur et à mesure
+    for line in lines:
+        stream.write(line)
+        break
+    for line in lines:
+        stream.write("\n")
+        stream.write(line)
+
+def _line_and_word_counts(text: str | TokenizedDocument | MappedDocument) -> tuple[int, int]:
+    # Un MappedDocument est compté sans être chargé ni découpé en chaînes
+    if isinstance(text, MappedDocument):
+        return len(text), text.word_count()
+    document = text if isinstance(text, TokenizedDocument) else TokenizedDocument(text)
+    return len(document.lines), len(document.word_ids)
 
 def generate_statistics_report(
-        text1: str,
-        text2: str,
+        text1: str | TokenizedDocument | MappedDocument,
+        text2: str | TokenizedDocument | MappedDocument,
         comparison_result: dict
     ) -> str:
     """
     Génère un résumé des statistiques globales de la comparaison.
 
-    :param text1: Contenu du premier texte.
-    :param text2: Contenu du second texte.
+    :param text1: Contenu du premier texte (ou TokenizedDocument déjà découpé, ou MappedDocument).
+    :param text2: Contenu du second texte (ou TokenizedDocument déjà découpé, ou MappedDocument).
     :param comparison_result: Dictionnaire retourné par compare_documents.
     :return: Texte du résumé des statistiques.
     """
     stats = []
 
     # Lignes
-    nb_lignes_text1 = len(text1.splitlines())
-    nb_lignes_text2 = len(text2.splitlines())
+    nb_lignes_text1, nb_mots_text1 = _line_and_word_counts(text1)
+    nb_lignes_text2, nb_mots_text2 = _line_and_word_counts(text2)
     nb_lignes_communes = len(comparison_result["line_comparison"].get("common", []))
     nb_lignes_diff = len(comparison_result["line_comparison"].get("diff", []))
     nb_uniques_1 = len(comparison_result["line_comparison"].get("unique_to_text1", []))
     nb_uniques_2 = len(comparison_result["line_comparison"].get("unique_to_text2", []))
+    moves = comparison_result["line_comparison"].get("moves")
 
     stats.append("=== Statistiques sur les lignes ===")
     stats.append(f"Nombre total de lignes dans le texte 1 : {nb_lignes_text1}")
     stats.append(f"Nombre total de lignes dans le texte 2 : {nb_lignes_text2}")
     stats.append(f"Lignes identiques : {nb_lignes_communes}")
-    stats.append(f"Lignes différentes (à la même position) : {nb_lignes_diff}")
+    stats.append(f"Lignes modifiées : {nb_lignes_diff}")
     stats.append(f"Lignes uniquement dans le texte 1 : {nb_uniques_1}")
     stats.append(f"Lignes uniquement dans le texte 2 : {nb_uniques_2}")
+    if moves is not None:
+        stats.append(f"Lignes déplacées : {len(comparison_result['line_comparison']['moved'])} "
+                     f"({len(moves)} bloc(s))")
     stats.append("")
 
     # Mots
-    nb_mots_text1 = len(text1.split())
-    nb_mots_text2 = len(text2.split())
-
     stats.append("=== Statistiques sur les mots ===")
     stats.append(f"Nombre total de mots dans le texte 1 : {nb_mots_text1}")
     stats.append(f"Nombre total de mots dans le texte 2 : {nb_mots_text2}")
@@ -87,6 +168,8 @@ def generate_statistics_report(
     # Taux de similarité
     stats.append("=== Taux de similarité ===")
     stats.append(f"{comparison_result['similarity_rate']} %")
+    for name, value in comparison_result.get("similarity_metrics", {}).items():
+        stats.append(f"{SIMILARITY_METRIC_LABELS.get(name, name)} : {value} %")
     stats.append("")
 
     return "\n".join(stats)
@@ -107,64 +190,133 @@ def format_keyword_search(keyword: str, result: dict) -> str:
     for doc, data in result.items():
         presence = "✔️ Présent" if data["found"] else "❌ Absent"
         count = data["count"]
-        lines.append(f"- Dans {doc} : {presence}, nombre d’occurrences : {count}")
+        entry = f"- Dans {doc} : {presence}, nombre d’occurrences : {count}"
+        # Numéros de lignes fournis par l'index des mots-clés (search_keywords)
+        if data.get("lines"):
+            entry += f", lignes : {', '.join(map(str, data['lines']))}"
+        lines.append(entry)
     
     lines.append("")  # Ligne vide pour séparer proprement
     return "\n".join(lines)
 
-def generate_report(comparison_results: dict) -> str:
+def format_keyword_searches(results: dict) -> str:
     """
-    Génère un rapport texte structuré à partir des résultats de comparaison.
+    Affiche les résultats d'une recherche de plusieurs mots-clés.
 
-    :param comparison_results: Dictionnaire retourné par compare_documents.
-    :return: Chaîne de caractères représentant le rapport complet.
+    :param results: Dictionnaire retourné par search_keywords ({mot-clé: résultat}).
+    :return: Texte formaté contenant les résultats de chaque mot-clé.
     """
-    lines = []
+    return "\n".join(format_keyword_search(keyword, result) for keyword, result in results.items())
+
+def iter_report_lines(comparison_results: dict) -> Iterator[str]:
+    """
+    Produit une à une les lignes du rapport de comparaison (voir
+    generate_report). Les différences mot à mot sont consommées au fur et à
+    mesure : comparison_results["word_level_differences"] peut être un
+    générateur (compare_documents(..., lazy=True)).
 
-    lines.append("==== Rapport de comparaison ====\n")
+    :param comparison_results: Dictionnaire retourné par compare_documents.
+    :return: Générateur des lignes du rapport (sans fin de ligne).
+    """
+    yield "==== Rapport de comparaison ====\n"
 
     similarity = comparison_results["similarity_rate"]
-    lines.append(f"Taux de similarité : {similarity:.2f}%\n")
+    yield f"Taux de similarité : {similarity:.2f}%\n"
+
+    metrics = comparison_results.get("similarity_metrics")
+    if metrics:
+        yield "=== Mesures de similarité ==="
+        for name, value in metrics.items():
+            yield f"{SIMILARITY_METRIC_LABELS.get(name, name)} : {value:.2f}%"
+        yield ""
 
     line_comp = comparison_results["line_comparison"]
     nb_common = len(line_comp["common"])
     nb_diff = len(line_comp["diff"])
     nb_unique1 = len(line_comp["unique_to_text1"])
     nb_unique2 = len(line_comp["unique_to_text2"])
-    total = nb_common + nb_diff + nb_unique1 + nb_unique2
-
-    lines.append("=== Statistiques des lignes ===")
-    lines.append(f"Total de lignes analysées : {total}")
-    lines.append(f"Lignes identiques         : {nb_common}")
-    lines.append(f"Lignes différentes        : {nb_diff}")
-    lines.append(f"Lignes uniquement dans texte 1 : {nb_unique1}")
-    lines.append(f"Lignes uniquement dans texte 2 : {nb_unique2}\n")
-
-    lines.append("=== Lignes différentes (avec détails mot à mot) ===")
+    moves = line_comp.get("moves")
+    nb_moved = len(line_comp["moved"]) if moves is not None else 0
+    total = nb_common + nb_diff + nb_unique1 + nb_unique2 + nb_moved
+
+    yield "=== Statistiques des lignes ==="
+    yield f"Total de lignes analysées : {total}"
+    yield f"Lignes identiques         : {nb_common}"
+    yield f"Lignes différentes        : {nb_diff}"
+    yield f"Lignes uniquement dans texte 1 : {nb_unique1}"
+    if moves is None:
+        yield f"Lignes uniquement dans texte 2 : {nb_unique2}\n"
+    else:
+        yield f"Lignes uniquement dans texte 2 : {nb_unique2}"
+        yield f"Lignes déplacées          : {nb_moved}\n"
+        if moves:
+            yield "=== Blocs déplacés ==="
+            yield from iter_moved_blocks(line_comp)
+            yield ""
+
+    yield "=== Lignes différentes (avec détails mot à mot) ==="
     for diff in comparison_results["word_level_differences"]:
-        lines.append("- Ligne dans texte 1 : " + diff["line_text1"])
-        lines.append("+ Ligne dans texte 2 : " + diff["line_text2"])
+        yield "- Ligne dans texte 1 : " + diff["line_text1"]
+        yield "+ Ligne dans texte 2 : " + diff["line_text2"]
         word_diff = diff["word_diff"]
-        if word_diff["differences"]:
-            lines.append("  > Mots différents :")
-            for w1, w2 in word_diff["differences"]:
-                lines.append(f"    - {w1}  ≠  {w2}")
-        lines.append("")
+        if word_diff["ops"]:
+            yield "  > Mots différents :"
+            words1, words2 = diff["line_text1"].split(), diff["line_text2"].split()
+            for tag, i1, i2, j1, j2 in word_diff["ops"]:
+                removed, added = " ".join(words1[i1:i2]), " ".join(words2[j1:j2])
+                if tag == 'replace':
+                    yield f"    - {removed}  ≠  {added}"
+                elif tag == 'delete':
+                    yield f"    - {removed}  (supprimé)"
+                else:
+                    yield f"    + {added}  (ajouté)"
+        char_diff = word_diff.get("char_diff")
+        if char_diff is not None:
+            yield (f"  > Passage modifié (à partir du caractère {char_diff['position'] + 1}) : "
+                   f"« {char_diff['removed']} » → « {char_diff['added']} »")
+        yield ""
 
     uniques = comparison_results["unique_words"]
-    lines.append("=== Mots uniques ===")
-    lines.append(f"Mots uniques au texte 1 : {', '.join(uniques['only_in_text1']) or 'Aucun'}")
-    lines.append(f"Mots uniques au texte 2 : {', '.join(uniques['only_in_text2']) or 'Aucun'}\n")
+    yield "=== Mots uniques ==="
+    yield f"Mots uniques au texte 1 : {', '.join(uniques['only_in_text1']) or 'Aucun'}"
+    yield f"Mots uniques au texte 2 : {', '.join(uniques['only_in_text2']) or 'Aucun'}\n"
 
     keyword_search = comparison_results["keyword_search"]
-    lines.append("=== Résultat de la recherche du mot-clé ===")
-    lines.append(f"Texte 1 : {'Oui' if keyword_search['text1']['found'] else 'Non'} "
-                 f"({keyword_search['text1']['count']} occurrence(s))")
-    lines.append(f"Texte 2 : {'Oui' if keyword_search['text2']['found'] else 'Non'} "
-                 f"({keyword_search['text2']['count']} occurrence(s))\n")
+    if keyword_search is not None:
+        yield "=== Résultat de la recherche du mot-clé ==="
+        yield (f"Texte 1 : {'Oui' if keyword_search['text1']['found'] else 'Non'} "
+               f"({keyword_search['text1']['count']} occurrence(s))")
+        yield (f"Texte 2 : {'Oui' if keyword_search['text2']['found'] else 'Non'} "
+               f"({keyword_search['text2']['count']} occurrence(s))\n")
 
-    lines.append("==== Fin du rapport ====\n")
-    return "\n".join(lines)
+    # Recherche de plusieurs mots-clés (compare_documents(..., keywords=...))
+    if comparison_results.get("keyword_searches"):
+        yield format_keyword_searches(comparison_results["keyword_searches"])
+
+    yield "==== Fin du rapport ====\n"
+
+def generate_report(comparison_results: dict) -> str:
+    """
+    Génère un rapport texte structuré à partir des résultats de comparaison.
+
+    :param comparison_results: Dictionnaire retourné par compare_documents.
+    :return: Chaîne de caractères représentant le rapport complet.
+    """
+    with stage("generate_report", lines=len(comparison_results["line_comparison"]["diff"])):
+        return "\n".join(iter_report_lines(comparison_results))
+
+def write_report(comparison_results: dict, stream: TextIO) -> None:
+    """
+    Écrit le rapport de comparaison directement dans un flux (fichier ouvert,
+    sys.stdout...), section par section : la mémoire utilisée reste constante
+    quelle que soit la taille des différences. Le texte écrit est identique à
+    celui de generate_report.
+
+    :param comparison_results: Dictionnaire retourné par compare_documents.
+    :param stream: Flux texte de destination.
+    """
+    with stage("write_report", lines=len(comparison_results["line_comparison"]["diff"])):
+        _write_lines(iter_report_lines(comparison_results), stream)
 
 def export_report_to_file(report_text: str, file_path: str = "rapport_comparaison.txt") -> None:
     """
@@ -180,6 +332,21 @@ def export_report_to_file(report_text: str, file_path: str = "rapport_comparaiso
     except Exception as e:
         print(f"❌ Erreur lors de l'export du rapport : {e}")
 
+def write_report_to_file(comparison_results: dict, file_path: str = "rapport_comparaison.txt") -> None:
+    """
+    Écrit le rapport de comparaison dans un fichier texte au fur et à mesure de
+    sa génération (write_report), sans construire le rapport en mémoire.
+
+    :param comparison_results: Dictionnaire retourné par compare_documents.
+    :param file_path: Chemin du fichier de sortie (par défaut : 'rapport_comparaison.txt').
+    """
+    try:
+        with open(file_path, 'w', encoding='utf-8', buffering=_WRITE_BUFFER_SIZE) as file:
+            write_report(comparison_results, file)
+        print(f"✅ Rapport exporté avec succès dans '{file_path}'")
+    except Exception as e:
+        print(f"❌ Erreur lors de l'export du rapport : {e}")
+
 
 if __name__ == "__main__":
     print("Ce module est destiné à être importé et utilisé dans d'autres scripts.")
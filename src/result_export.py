@@ -0,0 +1,258 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Iterator
+from typing import TextIO
+
+RESULT_FORMAT = "doc-comparator-result"
+RESULT_FORMAT_VERSION = 1
+
+# Format binaire :
+#   en-tête      : _MAGIC puis _HEADER (nombre de blocs, nombre d'enregistrements,
+#                  positions de la table des enregistrements et des métadonnées)
+#   blocs        : un _HUNK de taille fixe par bloc d'alignement (accès direct au bloc n)
+#   enregistrements : différences mot à mot, en JSON compact UTF-8, bout à bout
+#   index        : positions (uint64) de début de chaque enregistrement, plus la fin
+#   métadonnées  : JSON (statistiques, taux et mesures de similarité, mots uniques, mots-clés)
+_MAGIC = b"DCRES\x00\x01\n"
+_HEADER = struct.Struct("<QQQQ")
+_HUNK = struct.Struct("<BIIII")
+_TAG_CODES = {'equal': 0, 'replace': 1, 'delete': 2, 'insert': 3, 'moved': 4}
+_TAGS = {code: tag for tag, code in _TAG_CODES.items()}
+
+def _statistics(comparison_results: dict) -> dict:
+    line_comp = comparison_results["line_comparison"]
+    hunks = line_comp["hunks"]
+    statistics = {
+        "lines_text1": hunks[-1][2] if hunks else 0,
+        "lines_text2": hunks[-1][4] if hunks else 0,
+        "common_lines": len(line_comp["common"]),
+        "changed_lines": len(line_comp["diff"]),
+        "lines_only_in_text1": len(line_comp["unique_to_text1"]),
+        "lines_only_in_text2": len(line_comp["unique_to_text2"]),
+        "similarity_rate": comparison_results["similarity_rate"]
+    }
+    if "moves" in line_comp:
+        statistics["moved_lines"] = len(line_comp["moved"])
+    return statistics
+
+def _metadata(comparison_results: dict) -> dict:
+    metadata = {
+        "format": RESULT_FORMAT,
+        "version": RESULT_FORMAT_VERSION,
+        "statistics": _statistics(comparison_results),
+        "unique_words": comparison_results["unique_words"],
+        "keyword_search": comparison_results.get("keyword_search")
+    }
+    if "moves" in comparison_results["line_comparison"]:
+        # Blocs déplacés (i1, i2, j1, j2) ; leurs extrémités sont aussi des blocs 'moved'
+        metadata["moves"] = comparison_results["line_comparison"]["moves"]
+    if comparison_results.get("similarity_metrics"):
+        metadata["similarity_metrics"] = comparison_results["similarity_metrics"]
+    if comparison_results.get("keyword_searches"):
+        metadata["keyword_searches"] = comparison_results["keyword_searches"]
+    return metadata
+
+def iter_word_diff_records(comparison_results: dict) -> Iterator[dict]:
+    """
+    Produit les différences mot à mot sous forme d'enregistrements compacts :
+    numéros (à partir de 0) des deux lignes au lieu de leur texte. Les
+    différences sont consommées au fur et à mesure, y compris lorsqu'elles sont
+    fournies par un générateur (compare_documents(..., lazy=True)).
+
+    :param comparison_results: Dictionnaire retourné par compare_documents.
+    :return: Générateur de dictionnaires {'line1', 'line2', 'differences',
+             'only_in_line1', 'only_in_line2', 'ops'}.
+    """
+    # Les paires de lignes modifiées sont, dans l'ordre, les lignes appariées des blocs 'replace'
+    positions = (
+        (i1 + k, j1 + k)
+        for tag, i1, i2, j1, j2 in comparison_results["line_comparison"]["hunks"] if tag == 'replace'
+        for k in range(min(i2 - i1, j2 - j1))
+    )
+    for (line1, line2), diff in zip(positions, comparison_results["word_level_differences"]):
+        word_diff = diff["word_diff"]
+        yield {
+            "line1": line1,
+            "line2": line2,
+            "differences": word_diff["differences"],
+            "only_in_line1": word_diff["only_in_line1"],
+            "only_in_line2": word_diff["only_in_line2"],
+            "ops": word_diff["ops"]
+        }
+
+def write_jsonl(comparison_results: dict, stream: TextIO) -> None:
+    """
+    Écrit le résultat d'une comparaison au format JSON Lines, un enregistrement
+    par ligne, sans recopier le texte des lignes :
+
+    - {"type": "header", ...} : format, statistiques, mots uniques, mots-clés,
+    - {"type": "hunk", "tag", "i1", "i2", "j1", "j2"} : un par bloc d'alignement,
+    - {"type": "word_diff", "line1", "line2", ...} : une par paire de lignes modifiées.
+
+    :param comparison_results: Dictionnaire retourné par compare_documents.
+    :param stream: Flux texte de destination.
+    """
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    stream.write(dumps({"type": "header", **_metadata(comparison_results)}) + "\n")
+    for tag, i1, i2, j1, j2 in comparison_results["line_comparison"]["hunks"]:
+        stream.write(dumps({"type": "hunk", "tag": tag, "i1": i1, "i2": i2, "j1": j1, "j2": j2}) + "\n")
+    for record in iter_word_diff_records(comparison_results):
+        stream.write(dumps({"type": "word_diff", **record}) + "\n")
+
+def iter_jsonl(stream: TextIO) -> Iterator[dict]:
+    """
+    Relit un résultat écrit par write_jsonl, enregistrement par enregistrement.
+
+    :param stream: Flux texte ouvert en lecture.
+    :return: Générateur des enregistrements.
+    :raises ValueError: Si le flux n'est pas un résultat exporté par write_jsonl.
+    """
+    first = True
+    for line in stream:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if first and (record.get("type") != "header" or record.get("format") != RESULT_FORMAT):
+            raise ValueError("Le flux n'est pas un résultat de comparaison exporté")
+        first = False
+        yield record
+
+def write_binary(comparison_results: dict, filepath: str) -> None:
+    """
+    Écrit le résultat d'une comparaison au format binaire indexé, relisible
+    sans chargement complet par ResultFile.
+
+    :param comparison_results: Dictionnaire retourné par compare_documents.
+    :param filepath: Chemin du fichier de sortie.
+    """
+    hunks = comparison_results["line_comparison"]["hunks"]
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    with open(filepath, 'wb') as file:
+        file.write(_MAGIC)
+        file.write(bytes(_HEADER.size))  # réécrit une fois les positions connues
+
+        pack = _HUNK.pack
+        # Écriture au fil des blocs : les blocs peuvent être lus sur disque (external_comparison)
+        file.writelines(pack(_TAG_CODES[tag], i1, i2, j1, j2) for tag, i1, i2, j1, j2 in hunks)
+
+        offsets = array('Q')
+        position = file.tell()
+        for record in iter_word_diff_records(comparison_results):
+            data = encode(record).encode('utf-8')
+            offsets.append(position)
+            file.write(data)
+            position += len(data)
+        offsets.append(position)
+
+        index_offset = position
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        file.write(offsets.tobytes())
+        metadata_offset = file.tell()
+        file.write(encode(_metadata(comparison_results)).encode('utf-8'))
+
+        file.seek(len(_MAGIC))
+        file.write(_HEADER.pack(len(hunks), len(offsets) - 1, index_offset, metadata_offset))
+
+class ResultFile:
+    """
+    Lecture paresseuse d'un résultat écrit par write_binary. Le fichier est
+    projeté en mémoire (mmap) : seuls les blocs et enregistrements consultés
+    sont lus, ce qui permet d'ouvrir un résultat de plusieurs Go et d'accéder
+    directement au bloc n ou à la différence mot à mot n.
+
+        with ResultFile("resultat.dcr") as result:
+            print(result.metadata["statistics"])
+            tag, i1, i2, j1, j2 = result.hunk(1000)
+    """
+
+    def __init__(self, filepath: str):
+        """
+        :param filepath: Chemin du fichier binaire.
+        :raises ValueError: Si le fichier n'est pas au format attendu.
+        """
+        self._file = open(filepath, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Fichier de résultat vide : {filepath}")
+        if self._map[:len(_MAGIC)] != _MAGIC:
+            self.close()
+            raise ValueError(f"Format de résultat non reconnu : {filepath}")
+
+        (self.hunk_count, self.record_count, self._index_offset,
+         self._metadata_offset) = _HEADER.unpack_from(self._map, len(_MAGIC))
+        self._hunks_offset = len(_MAGIC) + _HEADER.size
+        self._metadata = None
+
+    def __enter__(self) -> "ResultFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Libère la projection en mémoire et ferme le fichier.
+        """
+        self._map.close()
+        self._file.close()
+
+    @property
+    def metadata(self) -> dict:
+        """
+        Métadonnées du résultat (statistiques, mots uniques, recherches de mots-clés).
+        """
+        if self._metadata is None:
+            self._metadata = json.loads(self._map[self._metadata_offset:].decode('utf-8'))
+        return self._metadata
+
+    def hunk(self, n: int) -> tuple[str, int, int, int, int]:
+        """
+        :param n: Numéro (à partir de 0) du bloc d'alignement.
+        :return: Bloc (tag, i1, i2, j1, j2).
+        :raises IndexError: Si le bloc n'existe pas.
+        """
+        if not 0 <= n < self.hunk_count:
+            raise IndexError(f"Bloc {n} hors limites ({self.hunk_count} blocs)")
+        code, i1, i2, j1, j2 = _HUNK.unpack_from(self._map, self._hunks_offset + n * _HUNK.size)
+        return (_TAGS[code], i1, i2, j1, j2)
+
+    def iter_hunks(self, start: int = 0, stop: int | None = None) -> Iterator[tuple[str, int, int, int, int]]:
+        """
+        :param start: Numéro du premier bloc.
+        :param stop: Numéro de fin (exclu), None pour aller jusqu'au dernier bloc.
+        :return: Générateur des blocs [start, stop[.
+        """
+        stop = self.hunk_count if stop is None else min(stop, self.hunk_count)
+        # Lecture bloc par bloc dans la projection, sans copier la table des blocs
+        unpack_from, size, data = _HUNK.unpack_from, _HUNK.size, self._map
+        for offset in range(self._hunks_offset + start * size, self._hunks_offset + stop * size, size):
+            code, i1, i2, j1, j2 = unpack_from(data, offset)
+            yield (_TAGS[code], i1, i2, j1, j2)
+
+    def word_diff(self, n: int) -> dict:
+        """
+        :param n: Numéro (à partir de 0) de la paire de lignes modifiées.
+        :return: Enregistrement de la différence mot à mot (voir iter_word_diff_records).
+        :raises IndexError: Si l'enregistrement n'existe pas.
+        """
+        if not 0 <= n < self.record_count:
+            raise IndexError(f"Enregistrement {n} hors limites ({self.record_count} enregistrements)")
+        start, stop = struct.unpack_from("<QQ", self._map, self._index_offset + n * 8)
+        return json.loads(self._map[start:stop].decode('utf-8'))
+
+    def iter_word_diffs(self, start: int = 0, stop: int | None = None) -> Iterator[dict]:
+        """
+        :param start: Numéro du premier enregistrement.
+        :param stop: Numéro de fin (exclu), None pour aller jusqu'au dernier.
+        :return: Générateur des différences mot à mot [start, stop[.
+        """
+        stop = self.record_count if stop is None else min(stop, self.record_count)
+        for n in range(start, stop):
+            yield self.word_diff(n)
@@ -0,0 +1,794 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from hashlib import blake2b
+from itertools import compress, repeat
+
+
+# Au-delà de ce coût (nombre d'insertions + suppressions), l'algorithme de Myers
+# abandonne : la zone est découpée sur des fenêtres de lignes uniques ou, faute
+# de mieux, traitée comme un remplacement en bloc. Cela borne le temps de calcul
+# sur des zones entièrement réécrites.
+MYERS_MAX_COST = 2000
+# Tailles (en lignes) des fenêtres essayées comme ancres lorsqu'une zone dépasse
+# MYERS_MAX_COST sans ligne unique : voir _window_anchors.
+ANCHOR_WINDOW_SIZES = (4, 16)
+
+# Au-delà de ce nombre de cellules (éléments d'une zone × éléments de l'autre),
+# align_words délègue la zone à matching_blocks : le calcul bit-parallèle garde
+# une ligne de cellules / 8 octets par élément pour remonter l'alignement.
+WORD_LCS_MAX_CELLS = 10 ** 8
+
+# Découpage en blocs des empreintes de lignes (block_levels) : un élément clôt un
+# bloc lorsque les bits BLOCK_MASK de son empreinte mélangée sont nuls, soit des
+# blocs d'environ BLOCK_MASK + 1 éléments. La hiérarchie s'arrête dès qu'un
+# niveau compte moins de BLOCK_MIN_COUNT éléments.
+BLOCK_MASK = 63
+BLOCK_MIN_COUNT = 1024
+# Alignement par fenêtres des zones de plus de max_zone éléments (iter_block_alignment) :
+# après une fenêtre sans élément commun, la reprise est cherchée au plus
+# RESYNC_REACH fenêtres plus loin dans chacun des deux textes.
+RESYNC_REACH = 16
+# Détection des déplacements (detect_moves) : nombre minimal de lignes d'un bloc
+# déplacé, et nombre maximal de positions candidates examinées par fenêtre, qui
+# borne le coût sur les textes très répétitifs.
+MOVE_MIN_LINES = 3
+MOVE_MAX_CANDIDATES = 8
+# Hachage glissant polynomial des fenêtres de lignes, modulo un nombre premier de Mersenne
+_ROLLING_BASE = 1_000_003
+_ROLLING_MODULUS = (1 << 61) - 1
+# Multiplicateur de Fibonacci : répartit uniformément les bits d'identifiants consécutifs
+_MIX = 0x9E3779B97F4A7C15
+
+def stable_hash(data: bytes) -> int:
+    """
+    Empreinte 64 bits (signée, pour un array 'q') d'une suite d'octets. Calculée
+    par BLAKE2b, elle est identique d'un processus à l'autre, contrairement à
+    hash() dont la graine change à chaque lancement : les blocs, et donc les
+    hunks, ne dépendent pas de l'exécution.
+
+    :param data: Octets à hacher.
+    :return: Entier signé sur 64 bits.
+    """
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), 'little', signed=True)
+
+def hash_lines(lines1: list[str], lines2: list[str]) -> tuple[list[int], list[int]]:
+    """
+    Remplace chaque ligne par un identifiant entier partagé entre les deux textes.
+    Deux lignes identiques reçoivent le même identifiant, ce qui permet ensuite de
+    comparer des entiers au lieu de chaînes.
+
+    :param lines1: Lignes du premier texte.
+    :param lines2: Lignes du second texte.
+    :return: Tuple (identifiants du texte 1, identifiants du texte 2).
+    """
+    table = {}
+    ids1 = [table.setdefault(line, len(table)) for line in lines1]
+    ids2 = [table.setdefault(line, len(table)) for line in lines2]
+    return ids1, ids2
+
+def _unique_anchors(a, b, a_lo: int, a_hi: int, b_lo: int, b_hi: int) -> list[tuple[int, int]] | None:
+    """
+    Recherche les lignes présentes exactement une fois dans chacune des deux zones
+    (ancres de l'algorithme « patience ») et garde la plus longue sous-suite
+    croissante de ces ancres.
+
+    :return: Liste ordonnée de couples (position dans a, position dans b),
+             ou None si les deux zones n'ont aucune ligne en commun.
+    """
+    counts_a = Counter(a[a_lo:a_hi])
+    counts_b = Counter(b[b_lo:b_hi])
+
+    if counts_a.keys().isdisjoint(counts_b.keys()):
+        return None
+
+    positions_b = {}
+    for j in range(b_lo, b_hi):
+        value = b[j]
+        if counts_b[value] == 1 and counts_a.get(value) == 1:
+            positions_b[value] = j
+
+    if not positions_b:
+        return []
+
+    candidates = [(i, positions_b[a[i]]) for i in range(a_lo, a_hi) if a[i] in positions_b]
+    return _longest_increasing(candidates)
+
+def _longest_increasing(candidates: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    # Plus longue sous-suite de couples (i, j), triés par i, croissante sur j (tri par patience)
+    tails = []        # plus petite fin de sous-suite pour chaque longueur
+    tails_index = []  # indice du candidat correspondant
+    previous = [-1] * len(candidates)
+    for index, (_, j) in enumerate(candidates):
+        k = bisect_left(tails, j)
+        if k > 0:
+            previous[index] = tails_index[k - 1]
+        if k == len(tails):
+            tails.append(j)
+            tails_index.append(index)
+        else:
+            tails[k] = j
+            tails_index[k] = index
+
+    anchors = []
+    index = tails_index[-1] if tails_index else -1
+    while index != -1:
+        anchors.append(candidates[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+def _window_anchors(a, b, a_lo: int, a_hi: int, b_lo: int, b_hi: int) -> list[tuple[int, int]]:
+    """
+    Ancres de secours d'une zone sans ligne unique et trop coûteuse pour
+    l'algorithme de Myers : les fenêtres de ANCHOR_WINDOW_SIZES lignes
+    consécutives présentes exactement une fois dans chacune des deux zones. Dans
+    un texte fait de lignes répétées, une suite de quelques lignes est le plus
+    souvent unique.
+
+    :return: Liste ordonnée de couples (position dans a, position dans b) des
+             lignes des fenêtres retenues (vide si aucune fenêtre n'est unique).
+    """
+    for size in ANCHOR_WINDOW_SIZES:
+        counts_a = Counter(tuple(a[i:i + size]) for i in range(a_lo, a_hi - size + 1))
+        positions_b = {}
+        for j in range(b_lo, b_hi - size + 1):
+            window = tuple(b[j:j + size])
+            if counts_a.get(window) == 1:
+                # Une fenêtre répétée dans b est écartée (position -1)
+                positions_b[window] = -1 if window in positions_b else j
+        candidates = [(i, positions_b[window]) for i in range(a_lo, a_hi - size + 1)
+                      if positions_b.get(window := tuple(a[i:i + size]), -1) >= 0]
+        if not candidates:
+            continue
+
+        # Lignes des fenêtres compatibles : une fenêtre qui chevauche la
+        # précédente n'est gardée que si elle la prolonge sur la même diagonale
+        anchors = []
+        end_a = end_b = -1
+        for i, j in _longest_increasing(candidates):
+            if i >= end_a and j >= end_b:
+                anchors.extend((i + k, j + k) for k in range(size))
+            elif i - j == end_a - end_b:
+                anchors.extend((i + k, j + k) for k in range(end_a - i, size))
+            else:
+                continue
+            end_a, end_b = i + size, j + size
+        return anchors
+    return []
+
+def _myers_matches(a, b, a_lo: int, a_hi: int, b_lo: int, b_hi: int, max_cost: int):
+    """
+    Algorithme de Myers en O(ND) sur une zone des deux séquences.
+
+    :return: Liste des couples (i, j) de lignes appariées, ou None si le coût
+             dépasse max_cost.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    max_d = min(n + m, max_cost)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+
+    found = None
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                found = d
+                break
+        trace.append(v[offset - d:offset + d + 1])
+        if found is not None:
+            break
+
+    if found is None:
+        return None
+
+    # Remontée du chemin pour retrouver les diagonales (lignes identiques)
+    matches = []
+    x, y = n, m
+    for d in range(found, 0, -1):
+        previous_v = trace[d - 1]
+        k = x - y
+        if k == -d or (k != d and previous_v[k - 1 + d - 1] < previous_v[k + 1 + d - 1]):
+            previous_k = k + 1
+        else:
+            previous_k = k - 1
+        previous_x = previous_v[previous_k + d - 1]
+        previous_y = previous_x - previous_k
+        while x > previous_x and y > previous_y:
+            x -= 1
+            y -= 1
+            matches.append((a_lo + x, b_lo + y))
+        x, y = previous_x, previous_y
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        matches.append((a_lo + x, b_lo + y))
+
+    matches.reverse()
+    return matches
+
+def matching_blocks(a, b, max_cost: int = MYERS_MAX_COST) -> list[tuple[int, int, int]]:
+    """
+    Calcule les blocs de lignes identiques entre deux séquences d'identifiants.
+
+    Stratégie :
+    - suppression du préfixe et du suffixe communs,
+    - découpage récursif sur les lignes uniques aux deux zones (patience diff),
+    - algorithme de Myers sur les zones restantes sans ancre,
+    - au-delà de max_cost, découpage sur les fenêtres de lignes uniques aux deux
+      zones (_window_anchors) ; une zone sans telle fenêtre reste un remplacement.
+
+    :param a: Séquence d'identifiants du premier texte.
+    :param b: Séquence d'identifiants du second texte.
+    :param max_cost: Coût maximal accepté par l'algorithme de Myers sur une zone.
+    :return: Liste triée de triplets (i, j, taille) comme difflib.get_matching_blocks,
+             sans le bloc sentinelle final.
+    """
+    matches = []
+    stack = [(0, len(a), 0, len(b))]
+
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+
+        # Préfixe commun
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            matches.append((a_lo, b_lo))
+            a_lo += 1
+            b_lo += 1
+
+        # Suffixe commun
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+            matches.append((a_hi, b_hi))
+
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+
+        anchors = _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi)
+        if anchors is None:
+            # Aucune ligne commune : la zone est un remplacement pur
+            continue
+        if anchors:
+            previous_a, previous_b = a_lo, b_lo
+            for i, j in anchors:
+                matches.append((i, j))
+                stack.append((previous_a, i, previous_b, j))
+                previous_a, previous_b = i + 1, j + 1
+            stack.append((previous_a, a_hi, previous_b, b_hi))
+            continue
+
+        zone_matches = _myers_matches(a, b, a_lo, a_hi, b_lo, b_hi, max_cost)
+        if zone_matches is None:
+            # Zone trop coûteuse : découpage sur des fenêtres de lignes uniques,
+            # à défaut de quoi la zone reste un remplacement en bloc
+            anchors = _window_anchors(a, b, a_lo, a_hi, b_lo, b_hi)
+            if anchors:
+                previous_a, previous_b = a_lo, b_lo
+                for i, j in anchors:
+                    matches.append((i, j))
+                    if previous_a < i or previous_b < j:
+                        stack.append((previous_a, i, previous_b, j))
+                    previous_a, previous_b = i + 1, j + 1
+                stack.append((previous_a, a_hi, previous_b, b_hi))
+        elif zone_matches:
+            matches.extend(zone_matches)
+
+    matches.sort()
+    return _group_matches(matches)
+
+def _group_matches(matches: list[tuple[int, int]]) -> list[tuple[int, int, int]]:
+    # Regroupement des couples consécutifs (triés) en blocs
+    blocks = []
+    for i, j in matches:
+        if blocks:
+            last_i, last_j, size = blocks[-1]
+            if last_i + size == i and last_j + size == j:
+                blocks[-1] = (last_i, last_j, size + 1)
+                continue
+        blocks.append((i, j, 1))
+    return blocks
+
+def _blocks_to_hunks(blocks: list[tuple[int, int, int]], len_a: int, len_b: int) -> list[tuple[str, int, int, int, int]]:
+    # Hunks couvrant les deux séquences à partir des blocs identiques triés
+    hunks = []
+    i = j = 0
+    for block_i, block_j, size in blocks + [(len_a, len_b, 0)]:
+        if i < block_i and j < block_j:
+            hunks.append(('replace', i, block_i, j, block_j))
+        elif i < block_i:
+            hunks.append(('delete', i, block_i, j, j))
+        elif j < block_j:
+            hunks.append(('insert', i, i, j, block_j))
+        if size:
+            hunks.append(('equal', block_i, block_i + size, block_j, block_j + size))
+        i, j = block_i + size, block_j + size
+    return hunks
+
+def align_sequences(a, b, max_cost: int = MYERS_MAX_COST) -> list[tuple[str, int, int, int, int]]:
+    """
+    Aligne deux séquences et les décrit sous forme de blocs (hunks), au même format
+    que difflib.SequenceMatcher.get_opcodes :
+    ('equal' | 'replace' | 'delete' | 'insert', i1, i2, j1, j2).
+
+    :param a: Séquence d'identifiants (ou de lignes) du premier texte.
+    :param b: Séquence d'identifiants (ou de lignes) du second texte.
+    :param max_cost: Coût maximal accepté par l'algorithme de Myers sur une zone.
+    :return: Liste ordonnée des hunks couvrant les deux séquences.
+    """
+    return _blocks_to_hunks(matching_blocks(a, b, max_cost), len(a), len(b))
+
+def _lcs_matches(a, b, a_lo: int, a_hi: int, b_lo: int, b_hi: int) -> list[tuple[int, int]]:
+    """
+    Plus longue sous-séquence commune de a[a_lo:a_hi] et b[b_lo:b_hi] par
+    l'algorithme bit-parallèle d'Allison et Dix : chaque ligne de la matrice de
+    programmation dynamique est codée dans un entier de b_hi - b_lo bits, dont le
+    bit y est nul lorsque la longueur de la sous-séquence commune augmente à la
+    colonne y. Les lignes sont conservées pour remonter l'alignement.
+
+    :return: Couples (i, j) d'éléments appariés, dans l'ordre décroissant.
+    """
+    width = b_hi - b_lo
+    positions = {}
+    for y in range(width):
+        value = b[b_lo + y]
+        positions[value] = positions.get(value, 0) | (1 << y)
+    get = positions.get
+
+    mask = (1 << width) - 1
+    row = mask
+    rows = [row]
+    for i in range(a_lo, a_hi):
+        matched = row & get(a[i], 0)
+        row = ((row + matched) | (row - matched)) & mask
+        rows.append(row)
+
+    # Remontée depuis le coin : diagonale sur deux éléments égaux, sinon vers la
+    # gauche si la longueur ne baisse pas (bit à 1), sinon vers le haut
+    matches = []
+    x, y = a_hi - a_lo, width
+    while x and y:
+        if a[a_lo + x - 1] == b[b_lo + y - 1]:
+            x -= 1
+            y -= 1
+            matches.append((a_lo + x, b_lo + y))
+        elif rows[x] >> (y - 1) & 1:
+            y -= 1
+        else:
+            x -= 1
+    return matches
+
+def align_words(a, b, max_cells: int = WORD_LCS_MAX_CELLS) -> list[tuple[str, int, int, int, int]]:
+    """
+    Aligne deux séquences courtes d'éléments hachables (par exemple les mots
+    d'une ligne) sur leur plus longue sous-séquence commune, sous forme de hunks
+    (voir align_sequences).
+
+    Les préfixe et suffixe communs sont retirés d'abord ; seule la zone restante
+    est alignée, par l'algorithme bit-parallèle d'Allison et Dix (_lcs_matches),
+    soit un coût proportionnel à la taille de la modification et non à celle des
+    séquences. Une zone de plus de max_cells cellules est confiée à matching_blocks.
+
+    :param a: Première séquence.
+    :param b: Deuxième séquence.
+    :param max_cells: Nombre maximal de cellules calculées par l'algorithme bit-parallèle.
+    :return: Liste ordonnée des hunks couvrant les deux séquences.
+    """
+    start, end_a, end_b = 0, len(a), len(b)
+    while start < end_a and start < end_b and a[start] == b[start]:
+        start += 1
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+
+    if start == end_a or start == end_b:
+        middle = []
+    elif (end_a - start) * (end_b - start) > max_cells:
+        middle = [(i + start, j + start, size)
+                  for i, j, size in matching_blocks(a[start:end_a], b[start:end_b])]
+    else:
+        matches = _lcs_matches(a, b, start, end_a, start, end_b)
+        matches.reverse()
+        middle = _group_matches(matches)
+
+    blocks = [(0, 0, start)] if start else []
+    blocks += middle
+    if end_a < len(a):
+        blocks.append((end_a, end_b, len(a) - end_a))
+    return _blocks_to_hunks(blocks, len(a), len(b))
+
+def align_lines(lines1: list[str], lines2: list[str]) -> list[tuple[str, int, int, int, int]]:
+    """
+    Aligne deux listes de lignes en passant par leurs identifiants entiers.
+
+    :param lines1: Lignes du premier texte.
+    :param lines2: Lignes du second texte.
+    :return: Liste ordonnée des hunks (voir align_sequences).
+    """
+    ids1, ids2 = hash_lines(lines1, lines2)
+    return align_sequences(ids1, ids2)
+
+def iter_merged_hunks(hunks: Iterable[tuple[str, int, int, int, int]]) -> Iterator[tuple[str, int, int, int, int]]:
+    """
+    Fusionne les hunks consécutifs de même nature : blocs 'equal' contigus d'une
+    part, blocs de différences contigus d'autre part (en un seul 'replace',
+    'delete' ou 'insert'). Les hunks sont lus et produits au fur et à mesure.
+
+    :param hunks: Hunks ordonnés couvrant les deux séquences.
+    :return: Générateur des hunks fusionnés.
+    """
+    pending = None
+    for hunk in hunks:
+        if hunk[1] == hunk[2] and hunk[3] == hunk[4]:
+            continue
+        if pending is not None and (hunk[0] == 'equal') == (pending[0] == 'equal'):
+            _, i1, _, j1, _ = pending
+            _, _, i2, _, j2 = hunk
+            if hunk[0] == 'equal':
+                tag = 'equal'
+            else:
+                tag = 'replace' if i1 < i2 and j1 < j2 else ('delete' if i1 < i2 else 'insert')
+            pending = (tag, i1, i2, j1, j2)
+        else:
+            if pending is not None:
+                yield pending
+            pending = hunk
+    if pending is not None:
+        yield pending
+
+def merge_hunks(hunks: Iterable[tuple[str, int, int, int, int]]) -> list[tuple[str, int, int, int, int]]:
+    """
+    Liste des hunks fusionnés (voir iter_merged_hunks).
+
+    :param hunks: Hunks ordonnés couvrant les deux séquences.
+    :return: Liste ordonnée des hunks fusionnés.
+    """
+    return list(iter_merged_hunks(hunks))
+
+def _block_bounds(values: array, mask: int) -> array:
+    # Découpage dépendant du contenu : un bloc se termine après chaque élément
+    # dont l'empreinte mélangée a ses bits `mask` nuls. Une insertion ne déplace
+    # donc que les frontières voisines, pas celles de tout le reste du document.
+    mixed = map(int.__rshift__, map(int.__mul__, values, repeat(_MIX)), repeat(32))
+    ends = compress(range(1, len(values) + 1), map(int.__eq__, map(int.__and__, mixed, repeat(mask)), repeat(0)))
+    bounds = array('Q', [0])
+    bounds.extend(ends)
+    if bounds[-1] != len(values):
+        bounds.append(len(values))
+    return bounds
+
+def block_levels(fingerprints: array, mask: int = BLOCK_MASK, min_count: int = BLOCK_MIN_COUNT) -> list[tuple[array, array | None]]:
+    """
+    Construit une hiérarchie d'empreintes de blocs (arbre de Merkle) au-dessus
+    des empreintes de lignes d'un document. Le niveau 0 est le tableau
+    d'empreintes lui-même ; chaque niveau suivant regroupe les éléments du
+    niveau précédent en blocs délimités par leur contenu (voir BLOCK_MASK) et
+    associe à chaque bloc une empreinte 64 bits de ses éléments.
+
+    Deux documents presque identiques partagent ainsi la quasi-totalité de leurs
+    blocs : align_block_levels les reconnaît sans parcourir leurs lignes.
+
+    :param fingerprints: Empreintes entières des lignes (array, par exemple
+                         TokenizedDocument.line_ids ou MappedDocument.line_hashes).
+    :param mask: Masque de découpage (taille moyenne des blocs : mask + 1).
+    :param min_count: Nombre d'éléments en dessous duquel aucun niveau n'est ajouté.
+    :return: Liste de couples (empreintes du niveau, bornes des blocs dans le
+             niveau précédent) ; les bornes valent None pour le niveau 0.
+    """
+    levels = [(fingerprints, None)]
+    current = fingerprints
+    while len(current) >= min_count:
+        bounds = _block_bounds(current, mask)
+        if 2 * (len(bounds) - 1) > len(current):
+            # Blocs trop petits (lignes répétées) : un niveau de plus n'apporterait rien
+            break
+        current = array('q', [stable_hash(current[start:end].tobytes()) for start, end in zip(bounds, bounds[1:])])
+        levels.append((current, bounds))
+    return levels
+
+def _line_range(levels: list, level: int, lo: int, hi: int) -> tuple[int, int]:
+    # Convertit une plage d'éléments d'un niveau en plage de lignes
+    while level > 0:
+        bounds = levels[level][1]
+        lo, hi = bounds[lo], bounds[hi]
+        level -= 1
+    return lo, hi
+
+def _resync(seq1, seq2, a_lo: int, a_end: int, a_hi: int, b_lo: int, b_end: int, b_hi: int,
+            reach: int) -> tuple[str, int, int, int, int] | None:
+    # Fenêtre sans élément commun : insertion (ou suppression) plus longue que la
+    # fenêtre ? Le premier élément de la suite d'un texte présent dans la fenêtre
+    # de l'autre indique l'écart ; le plus court des deux est sauté (hunk relatif
+    # à la fenêtre), ou None si aucune reprise n'est trouvée.
+    window1, window2 = set(seq1[a_lo:a_end]), set(seq2[b_lo:b_end])
+    j = next((j for j in range(b_end, min(b_hi, b_end + reach)) if seq2[j] in window1), None)
+    i = next((i for i in range(a_end, min(a_hi, a_end + reach)) if seq1[i] in window2), None)
+    if j is not None and (i is None or j - b_lo <= i - a_lo):
+        return ('insert', 0, 0, 0, j - b_lo)
+    if i is not None:
+        return ('delete', 0, i - a_lo, 0, 0)
+    return None
+
+def _zone_hunks(seq1, seq2, a_lo: int, a_hi: int, b_lo: int, b_hi: int, max_cost: int,
+                max_zone: int | None, refined: bool = False) -> Iterator[tuple[str, int, int, int, int]]:
+    # Aligne seq1[a_lo:a_hi] et seq2[b_lo:b_hi] (hunks en positions absolues). Une
+    # zone de plus de max_zone éléments est parcourue par fenêtres d'au plus
+    # max_zone éléments : seuls les hunks jusqu'au dernier 'equal' d'une fenêtre
+    # sont retenus, la suite est réalignée avec la fenêtre suivante. Chaque fenêtre
+    # repart ainsi d'un point commun aux deux textes, quel que soit le décalage
+    # accumulé par les insertions et suppressions précédentes. Avec refined (blocs
+    # réalignés ensuite au niveau inférieur), une fenêtre sans élément commun
+    # renvoie le reste de la zone en un seul 'replace' : il sera parcouru ligne
+    # à ligne, sans frontière arbitraire entre deux fenêtres.
+    while max_zone is not None and a_hi - a_lo + b_hi - b_lo > max_zone:
+        a_end = a_lo + min(a_hi - a_lo, max(max_zone // 2, max_zone - (b_hi - b_lo)))
+        b_end = b_lo + min(b_hi - b_lo, max_zone - (a_end - a_lo))
+        hunks = align_sequences(seq1[a_lo:a_end], seq2[b_lo:b_end], max_cost)
+        last = next((k for k in range(len(hunks) - 1, -1, -1) if hunks[k][0] == 'equal'), None)
+        if last is not None:
+            del hunks[last + 1:]
+        elif refined and a_end > a_lo and b_end > b_lo:
+            yield ('replace', a_lo, a_hi, b_lo, b_hi)
+            return
+        elif a_end > a_lo and b_end > b_lo:
+            skip = _resync(seq1, seq2, a_lo, a_end, a_hi, b_lo, b_end, b_hi, RESYNC_REACH * max_zone)
+            # Sans reprise, la fenêtre est retenue entière
+            if skip is not None:
+                hunks = [skip]
+        for tag, i1, i2, j1, j2 in hunks:
+            yield (tag, i1 + a_lo, i2 + a_lo, j1 + b_lo, j2 + b_lo)
+        a_lo, b_lo = a_lo + hunks[-1][2], b_lo + hunks[-1][4]
+    for tag, i1, i2, j1, j2 in align_sequences(seq1[a_lo:a_hi], seq2[b_lo:b_hi], max_cost):
+        yield (tag, i1 + a_lo, i2 + a_lo, j1 + b_lo, j2 + b_lo)
+
+def iter_block_alignment(
+        levels1: list,
+        levels2: list,
+        max_cost: int = MYERS_MAX_COST,
+        max_zone: int | None = None
+    ) -> Iterator[tuple[str, int, int, int, int]]:
+    """
+    Aligne deux documents à partir de leurs hiérarchies de blocs (block_levels),
+    du niveau le plus grossier vers les lignes : les blocs d'empreintes égales
+    dont les lignes sont confirmées identiques (comparaison des tableaux
+    d'empreintes, en C) deviennent directement des hunks 'equal', les blocs
+    supprimés ou insérés des hunks 'delete' / 'insert', et seules les zones
+    remplacées sont réalignées au niveau inférieur. Un bloc égal qui imposerait
+    plus d'insertions et de suppressions qu'il n'apparie de lignes (bloc déplacé
+    loin de ses voisins) n'est pas retenu : il est réaligné avec les blocs
+    modifiés qui l'entourent.
+
+    Les zones sont traitées en profondeur d'abord : les hunks sont produits dans
+    l'ordre du document, sans être tous conservés. Avec max_zone, une zone de
+    plus de max_zone éléments (des deux côtés) est alignée par fenêtres
+    successives qui repartent chacune de la dernière ligne commune trouvée, ce
+    qui borne la mémoire de travail au prix d'un alignement approché dans ces
+    seules zones.
+
+    :param levels1: Hiérarchie de blocs du premier document.
+    :param levels2: Hiérarchie de blocs du second document.
+    :param max_cost: Coût maximal accepté par l'algorithme de Myers sur une zone.
+    :param max_zone: Taille maximale d'une zone alignée d'un seul tenant, ou None.
+    :return: Générateur des hunks (non fusionnés, voir iter_merged_hunks).
+    """
+    lines1, lines2 = levels1[0][0], levels2[0][0]
+
+    def children(level: int, a_lo: int, a_hi: int, b_lo: int, b_hi: int) -> Iterator[tuple]:
+        # Hunks définitifs (chaîne en tête) et zones à réaligner au niveau inférieur
+        fingerprints1, bounds1 = levels1[level]
+        fingerprints2, bounds2 = levels2[level]
+        start1, end1 = _line_range(levels1, level, a_lo, a_hi)
+        start2, end2 = _line_range(levels2, level, b_lo, b_hi)
+        # Décalage (en lignes) de la dernière ancre retenue et de la fin de la zone
+        offset, end_offset = start2 - start1, end2 - end1
+
+        def zone(i1: int, i2: int, j1: int, j2: int) -> tuple:
+            if i1 < i2 and j1 < j2:
+                return (level - 1, bounds1[i1], bounds1[i2], bounds2[j1], bounds2[j2])
+            line_i1, line_i2 = _line_range(levels1, level, i1, i2)
+            line_j1, line_j2 = _line_range(levels2, level, j1, j2)
+            return ('delete' if i1 < i2 else 'insert', line_i1, line_i2, line_j1, line_j2)
+
+        pending = None  # début des blocs modifiés en attente d'une ancre
+        for tag, i1, i2, j1, j2 in _zone_hunks(fingerprints1, fingerprints2, a_lo, a_hi, b_lo, b_hi,
+                                               max_cost, max_zone, refined=True):
+            if tag == 'equal':
+                line_i1, line_i2 = _line_range(levels1, level, i1, i2)
+                line_j1, line_j2 = _line_range(levels2, level, j1, j2)
+                shift = line_j1 - line_i1
+                # Insertions et suppressions supplémentaires imposées par l'ancre : un
+                # bloc déplacé loin de ses voisins en impose plus qu'il n'apparie de
+                # lignes, et ferait perdre les lignes proches réécrites autour de lui.
+                detour = abs(shift - offset) + abs(end_offset - shift) - abs(end_offset - offset)
+                if detour <= 2 * (line_i2 - line_i1) and lines1[line_i1:line_i2] == lines2[line_j1:line_j2]:
+                    if pending is not None:
+                        yield zone(pending[0], i1, pending[1], j1)
+                        pending = None
+                    offset = shift
+                    yield (tag, line_i1, line_i2, line_j1, line_j2)
+                    continue
+            # Blocs modifiés, ancre écartée ou collision d'empreintes : les blocs
+            # consécutifs forment une seule zone, réalignée au niveau inférieur
+            if pending is None:
+                pending = (i1, j1)
+        if pending is not None:
+            yield zone(pending[0], a_hi, pending[1], b_hi)
+
+    top = min(len(levels1), len(levels2)) - 1
+    # Pile de générateurs, un par niveau en cours : les éléments sont produits
+    # dans l'ordre du document, sans liste de toutes les zones d'un niveau
+    stack = [iter([(top, 0, len(levels1[top][0]), 0, len(levels2[top][0]))])]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+        elif isinstance(item[0], str):
+            yield item
+        elif item[0] == 0:
+            yield from _zone_hunks(lines1, lines2, *item[1:], max_cost, max_zone)
+        else:
+            stack.append(children(*item))
+
+def align_block_levels(levels1: list, levels2: list, max_cost: int = MYERS_MAX_COST) -> list[tuple[str, int, int, int, int]]:
+    """
+    Liste des hunks fusionnés de l'alignement par blocs (voir iter_block_alignment).
+    Sans niveau de blocs (documents courts), équivaut à align_sequences sur les
+    empreintes des lignes.
+
+    :param levels1: Hiérarchie de blocs du premier document.
+    :param levels2: Hiérarchie de blocs du second document.
+    :param max_cost: Coût maximal accepté par l'algorithme de Myers sur une zone.
+    :return: Liste ordonnée des hunks (voir align_sequences).
+    """
+    if min(len(levels1), len(levels2)) == 1:
+        return align_sequences(levels1[0][0], levels2[0][0], max_cost)
+    return merge_hunks(iter_block_alignment(levels1, levels2, max_cost))
+
+def _window_hashes(ids, lo: int, hi: int, size: int) -> list[int]:
+    # Empreinte glissante de chaque fenêtre de `size` éléments de ids[lo:hi] :
+    # l'empreinte de la fenêtre suivante se déduit de la précédente en O(1).
+    if hi - lo < size:
+        return []
+    base, modulus = _ROLLING_BASE, _ROLLING_MODULUS
+    power = pow(base, size - 1, modulus)
+    value = 0
+    for element in ids[lo:lo + size]:
+        value = (value * base + element) % modulus
+    hashes = [value]
+    for start in range(lo + 1, hi - size + 1):
+        value = ((value - ids[start - 1] * power) * base + ids[start + size - 1]) % modulus
+        hashes.append(value)
+    return hashes
+
+def detect_moves(
+        a,
+        b,
+        hunks: list[tuple[str, int, int, int, int]],
+        min_lines: int = MOVE_MIN_LINES
+    ) -> list[tuple[int, int, int, int]]:
+    """
+    Recherche les blocs de lignes déplacés : suites d'au moins min_lines lignes
+    supprimées à un endroit du texte 1 et insérées telles quelles ailleurs dans
+    le texte 2 (par exemple un article de contrat renuméroté).
+
+    Les fenêtres de min_lines lignes des zones supprimées sont indexées par une
+    empreinte glissante ; celles des zones insérées y sont cherchées, puis chaque
+    correspondance confirmée est prolongée tant que les lignes restent égales.
+    Le coût reste linéaire en nombre de lignes modifiées.
+
+    :param a: Identifiants des lignes du texte 1 (hash_lines, line_ids...).
+    :param b: Identifiants des lignes du texte 2.
+    :param hunks: Alignement des deux textes (align_sequences).
+    :param min_lines: Taille minimale d'un bloc déplacé.
+    :return: Liste, triée par position dans le texte 1, de quadruplets
+             (i1, i2, j1, j2) : a[i1:i2] se retrouve en b[j1:j2].
+    """
+    index = {}
+    for tag, i1, i2, _, _ in hunks:
+        if tag in ('delete', 'replace'):
+            for start, value in enumerate(_window_hashes(a, i1, i2, min_lines), i1):
+                index.setdefault(value, []).append((start, i2))
+
+    used = bytearray(len(a))  # lignes du texte 1 déjà attribuées à un déplacement
+    moves = []
+    for tag, _, _, j1, j2 in hunks:
+        if tag not in ('insert', 'replace') or not index:
+            continue
+        hashes = _window_hashes(b, j1, j2, min_lines)
+        j = j1
+        while j + min_lines <= j2:
+            match = None
+            for start, stop in index.get(hashes[j - j1], ())[:MOVE_MAX_CANDIDATES]:
+                # Un bloc déjà attribué compte au moins min_lines lignes : s'il
+                # chevauche la fenêtre, il en contient la première ou la dernière ligne.
+                if (not used[start] and not used[start + min_lines - 1]
+                        and a[start:start + min_lines] == b[j:j + min_lines]):
+                    match = start, stop
+                    break
+            if match is None:
+                j += 1
+                continue
+            start, stop = match
+            size = min_lines
+            while (start + size < stop and j + size < j2 and not used[start + size]
+                   and a[start + size] == b[j + size]):
+                size += 1
+            used[start:start + size] = b"\x01" * size
+            moves.append((start, start + size, j, j + size))
+            j += size
+    moves.sort()
+    return moves
+
+def _split_ranges(lo: int, hi: int, moved: list[tuple[int, int]]) -> list[tuple[bool, int, int]]:
+    # Découpe [lo, hi[ en segments (déplacé ?, début, fin) selon les plages déplacées triées
+    segments = []
+    position = lo
+    for start, stop in moved[bisect_right(moved, (lo, -1)):bisect_left(moved, (hi, -1))]:
+        if position < start:
+            segments.append((False, position, start))
+        segments.append((True, start, stop))
+        position = stop
+    if position < hi:
+        segments.append((False, position, hi))
+    return segments
+
+def apply_moves(
+        hunks: list[tuple[str, int, int, int, int]],
+        moves: list[tuple[int, int, int, int]]
+    ) -> list[tuple[str, int, int, int, int]]:
+    """
+    Découpe les hunks de différences autour des blocs déplacés (detect_moves).
+    Chaque extrémité d'un déplacement devient un hunk 'moved' : côté source
+    ('moved', i1, i2, j, j), côté destination ('moved', i, i, j1, j2). Les lignes
+    restantes forment des hunks 'replace', 'delete' ou 'insert', appariés dans
+    l'ordre ; la liste couvre toujours les deux textes dans l'ordre.
+
+    :param hunks: Alignement des deux textes.
+    :param moves: Blocs déplacés (i1, i2, j1, j2).
+    :return: Nouvelle liste ordonnée de hunks.
+    """
+    if not moves:
+        return hunks
+    sources = sorted((i1, i2) for i1, i2, _, _ in moves)
+    targets = sorted((j1, j2) for _, _, j1, j2 in moves)
+
+    result = []
+    for hunk in hunks:
+        tag, i1, i2, j1, j2 = hunk
+        if tag == 'equal':
+            result.append(hunk)
+            continue
+        segments2 = _split_ranges(j1, j2, targets)
+        k = 0
+        j = j1
+        for moved, start, stop in _split_ranges(i1, i2, sources):
+            if moved:
+                result.append(('moved', start, stop, j, j))
+                continue
+            # Destinations de déplacements situées avant les prochaines lignes restantes du texte 2
+            while k < len(segments2) and segments2[k][0]:
+                result.append(('moved', start, start, segments2[k][1], segments2[k][2]))
+                j = segments2[k][2]
+                k += 1
+            if k < len(segments2):
+                _, start2, stop2 = segments2[k]
+                result.append(('replace', start, stop, start2, stop2))
+                j = stop2
+                k += 1
+            else:
+                result.append(('delete', start, stop, j, j))
+        for moved, start2, stop2 in segments2[k:]:
+            result.append(('moved' if moved else 'insert', i2, i2, start2, stop2))
+    return result
@@ -0,0 +1,183 @@
+import math
+from collections import Counter
+from collections.abc import Callable, Iterable, Sequence
+from operator import mul
+
+from tokenized_document import TokenizedDocument
+
+# Au-delà de ce nombre de cellules (mots d'une zone × mots de l'autre), la distance
+# d'édition d'une zone modifiée est estimée par une borne inférieure au lieu d'être
+# calculée : le calcul bit-parallèle coûte environ cellules / 64 opérations.
+EDIT_DISTANCE_MAX_CELLS = 10 ** 9
+
+# Une mesure reçoit les deux documents (même vocabulaire) et le résultat de
+# compare_lines, et renvoie un pourcentage de similarité (0.0 à 100.0).
+SimilarityMetric = Callable[[TokenizedDocument, TokenizedDocument, dict], float]
+
+SIMILARITY_METRICS: dict[str, SimilarityMetric] = {}
+
+def register_metric(name: str, metric: SimilarityMetric) -> None:
+    """
+    Ajoute (ou remplace) une mesure de similarité utilisable par
+    compute_similarity_metrics et compare_documents(..., metrics=[name]).
+
+    :param name: Nom de la mesure.
+    :param metric: Fonction (document 1, document 2, résultat de compare_lines) -> pourcentage.
+    """
+    SIMILARITY_METRICS[name] = metric
+
+def token_jaccard(doc1: TokenizedDocument, doc2: TokenizedDocument, line_comparison: dict | None = None) -> float:
+    """
+    Indice de Jaccard des ensembles de mots (en minuscules) des deux documents :
+    indépendant de l'ordre des mots et du découpage en lignes.
+
+    :return: Pourcentage de similarité (entre 0.0 et 100.0).
+    """
+    words1 = doc1.lower_word_counts.keys()
+    words2 = doc2.lower_word_counts.keys()
+    common = len(words1 & words2)
+    union = len(words1) + len(words2) - common
+    if union == 0:
+        return 100.0
+    return round(common / union * 100, 2)
+
+def _sum_of_squares(counts: Counter) -> int:
+    values = counts.values()
+    return sum(map(mul, values, values))
+
+def tfidf_cosine(doc1: TokenizedDocument, doc2: TokenizedDocument, line_comparison: dict | None = None) -> float:
+    """
+    Similarité cosinus des vecteurs TF-IDF des mots (en minuscules) des deux
+    documents. L'IDF est calculée sur la paire, avec lissage
+    (idf = ln((1 + N) / (1 + df)) + 1, N = 2) : les mots propres à un seul
+    document pèsent davantage que les mots partagés.
+
+    :return: Pourcentage de similarité (entre 0.0 et 100.0).
+    """
+    counts1 = doc1.lower_word_counts
+    counts2 = doc2.lower_word_counts
+    if not counts1 or not counts2:
+        return 100.0 if not counts1 and not counts2 else 0.0
+
+    # idf vaut 1 pour les mots présents dans les deux documents
+    unique_weight = (math.log(3 / 2) + 1) ** 2
+    # Produits calculés par map / operator.mul, sans boucle interprétée
+    shared = list(counts1.keys() & counts2.keys())
+    shared1 = list(map(counts1.__getitem__, shared))
+    shared2 = list(map(counts2.__getitem__, shared))
+    dot = sum(map(mul, shared1, shared2))
+    shared_square1 = sum(map(mul, shared1, shared1))
+    shared_square2 = sum(map(mul, shared2, shared2))
+    norm1 = shared_square1 + unique_weight * (_sum_of_squares(counts1) - shared_square1)
+    norm2 = shared_square2 + unique_weight * (_sum_of_squares(counts2) - shared_square2)
+    return round(min(dot / math.sqrt(norm1 * norm2), 1.0) * 100, 2)
+
+def edit_distance(a: Sequence, b: Sequence, max_cells: int = EDIT_DISTANCE_MAX_CELLS) -> int:
+    """
+    Distance d'édition (Levenshtein) entre deux séquences d'éléments hachables,
+    par l'algorithme bit-parallèle de Myers (formulation de Hyyrö) : les colonnes
+    de la matrice de programmation dynamique sont codées dans des entiers, soit
+    len(a) itérations de quelques opérations sur des entiers de len(b) bits.
+
+    Les préfixe et suffixe communs sont retirés d'abord. Si la zone restante
+    dépasse max_cells cellules, la distance renvoyée est une borne inférieure
+    (plus grande longueur moins le nombre d'éléments communs).
+
+    :param a: Première séquence (par exemple d'identifiants de mots).
+    :param b: Deuxième séquence.
+    :param max_cells: Nombre maximal de cellules calculées exactement.
+    :return: Nombre minimal d'insertions, suppressions et substitutions.
+    """
+    start, end_a, end_b = 0, len(a), len(b)
+    while start < end_a and start < end_b and a[start] == b[start]:
+        start += 1
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+
+    # Le motif codé en bits est la plus courte des deux séquences
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if m == 0:
+        return len(a)
+    if len(a) * m > max_cells:
+        return len(a) - sum((Counter(a) & Counter(b)).values())
+
+    positions = {}
+    for i, value in enumerate(b):
+        positions[value] = positions.get(value, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    vertical_plus, vertical_minus, score = mask, 0, m
+    get = positions.get
+    for value in a:
+        equal = get(value, 0)
+        x_vertical = equal | vertical_minus
+        x_horizontal = (((equal & vertical_plus) + vertical_plus) ^ vertical_plus) | equal
+        horizontal_plus = vertical_minus | (~(x_horizontal | vertical_plus) & mask)
+        horizontal_minus = vertical_plus & x_horizontal
+        if horizontal_plus & high:
+            score += 1
+        elif horizontal_minus & high:
+            score -= 1
+        horizontal_plus = ((horizontal_plus << 1) | 1) & mask
+        horizontal_minus = (horizontal_minus << 1) & mask
+        vertical_plus = horizontal_minus | (~(x_vertical | horizontal_plus) & mask)
+        vertical_minus = horizontal_plus & x_vertical
+    return score
+
+def edit_similarity(doc1: TokenizedDocument, doc2: TokenizedDocument, line_comparison: dict) -> float:
+    """
+    Similarité fondée sur la distance d'édition mot à mot (mots en minuscules) :
+    1 - distance / nombre de mots du plus long document.
+
+    La distance est calculée zone par zone : seuls les mots des blocs
+    d'alignement non identiques (line_comparison['hunks']) sont comparés, ce qui
+    reste quasi linéaire pour deux documents proches. Un paragraphe dont seules
+    les coupures de lignes ont changé forme un seul bloc et garde une distance nulle.
+
+    :return: Pourcentage de similarité (entre 0.0 et 100.0).
+    """
+    words1, words2 = doc1.lower_word_ids, doc2.lower_word_ids
+    longest = max(len(words1), len(words2))
+    if longest == 0:
+        return 100.0
+
+    starts1, starts2 = doc1.line_word_starts, doc2.line_word_starts
+    distance = 0
+    for tag, i1, i2, j1, j2 in line_comparison['hunks']:
+        # Les blocs déplacés (detect_moves) sont comptés comme inchangés
+        if tag not in ('equal', 'moved'):
+            distance += edit_distance(words1[starts1[i1]:starts1[i2]], words2[starts2[j1]:starts2[j2]])
+    return round(max(1 - distance / longest, 0.0) * 100, 2)
+
+register_metric("jaccard", token_jaccard)
+register_metric("cosine", tfidf_cosine)
+register_metric("edit", edit_similarity)
+
+def compute_similarity_metrics(
+        doc1: TokenizedDocument,
+        doc2: TokenizedDocument,
+        metrics: Iterable[str],
+        line_comparison: dict
+    ) -> dict[str, float]:
+    """
+    Calcule plusieurs mesures de similarité sur les découpages déjà partagés
+    par les deux documents (identifiants de mots, comptages), sans les redécouper.
+
+    :param doc1: Premier document (même vocabulaire que doc2).
+    :param doc2: Deuxième document.
+    :param metrics: Noms des mesures (voir SIMILARITY_METRICS).
+    :param line_comparison: Résultat de compare_lines pour ces deux documents.
+    :return: Dictionnaire {nom de la mesure: pourcentage}.
+    :raises ValueError: Si une mesure est inconnue.
+    """
+    metrics = list(metrics)
+    unknown = [name for name in metrics if name not in SIMILARITY_METRICS]
+    if unknown:
+        raise ValueError(f"Mesure(s) de similarité inconnue(s) : {', '.join(unknown)} "
+                         f"(disponibles : {', '.join(sorted(SIMILARITY_METRICS))})")
+    return {name: SIMILARITY_METRICS[name](doc1, doc2, line_comparison) for name in metrics}
@@ -1,5 +1,26 @@
 import re
 import string
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator
+from itertools import accumulate
+
+from profiling import stage
+
+# Tables et expressions précompilées une seule fois pour tout le module
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+_PUNCTUATION_RE = re.compile('[' + re.escape(string.punctuation) + ']+')
+_WHITESPACE_RE = re.compile(r'\s+')
+# Suites de mots séparés par une seule espace, recopiées telles quelles par la
+# normalisation des espaces (mots sans ponctuation si elle est supprimée)
+_WORDS_RE = re.compile(r'\S+(?: \S+)*')
+_WORD_NO_PUNCTUATION = r'[^\s' + re.escape(string.punctuation) + ']+'
+_WORDS_NO_PUNCTUATION_RE = re.compile(_WORD_NO_PUNCTUATION + '(?: ' + _WORD_NO_PUNCTUATION + ')*')
+_NO_PUNCTUATION_RE = re.compile('[^' + re.escape(string.punctuation) + ']+')
+# Table ASCII fusionnant passage en minuscules et suppression de la ponctuation
+_ASCII_LOWER_NO_PUNCTUATION_TABLE = str.maketrans(
+    string.ascii_uppercase, string.ascii_lowercase, string.punctuation
+)
 
 def convert_to_lowercase(text: str) -> str:
     """
@@ -17,7 +38,11 @@ def remove_punctuation(text: str) -> str:
     :param text: Texte contenant éventuellement de la ponctuation.
     :return: Texte sans ponctuation.
     """
-    return ''.join(char for char in text if char not in string.punctuation)
+    # str.translate dispose d'un chemin rapide pour l'ASCII ; au-delà,
+    # l'expression régulière précompilée est nettement plus rapide.
+    if text.isascii():
+        return text.translate(_PUNCTUATION_TABLE)
+    return _PUNCTUATION_RE.sub('', text)
 
 def normalize_whitespaces(text: str) -> str:
     """
@@ -29,8 +54,9 @@ def normalize_whitespaces(text: str) -> str:
     :return: Texte avec des espaces standardisés.
     """
     text = text.strip()
-    text = re.sub(r'\s+', ' ', text)
+    text = _WHITESPACE_RE.sub(' ', text)
     return text
+
 def apply_strict_mode(text: str) -> str:
     """
     Applique le mode strict sur le texte de sorte qu'aucune modification (minuscule,
@@ -66,14 +92,357 @@ def preprocess_text(
     """
     if strict_mode:
         return apply_strict_mode(text)
-    if ignore_case:
-        text = convert_to_lowercase(text)
-    if clean_punctuation:
-        text = remove_punctuation(text)
-    if normalize_spaces:
-        text = normalize_whitespaces(text)
-    return text
-    
+
+    with stage("preprocess_text", chars=len(text)):
+        if ignore_case and clean_punctuation and text.isascii():
+            # Texte ASCII : minuscules et ponctuation traitées en une seule passe
+            text = text.translate(_ASCII_LOWER_NO_PUNCTUATION_TABLE)
+        else:
+            if ignore_case:
+                text = convert_to_lowercase(text)
+            if clean_punctuation:
+                text = remove_punctuation(text)
+
+        if normalize_spaces:
+            # Équivalent à strip() suivi de re.sub(r'\s+', ' ', ...) : str.split()
+            # et \s reconnaissent exactement les mêmes caractères d'espacement.
+            text = ' '.join(text.split())
+        return text
+
+def preprocess_stream(
+        chunks: Iterable[str],
+        ignore_case: bool = True,
+        clean_punctuation: bool = True,
+        normalize_spaces: bool = True,
+        strict_mode: bool = False
+    ) -> Iterator[str]:
+    """
+    Variante de preprocess_text pour un texte fourni par morceaux (par exemple
+    les lignes de file_parser.iter_file_lines, fins de ligne comprises, ou les
+    pages d'un PDF). La concaténation des morceaux produits est identique à
+    preprocess_text(''.join(chunks), ...).
+
+    Chaque morceau est coupé après son dernier caractère d'espacement ; le mot
+    incomplet qui suit est reporté sur le morceau suivant, afin que la mise en
+    minuscules (sigma final grec) et la fusion des espaces ne dépendent pas du
+    découpage.
+
+    :param chunks: Itérable de morceaux de texte consécutifs.
+    :param ignore_case: Si True, le texte sera transformé en minuscules.
+    :param clean_punctuation: Si True, la ponctuation sera supprimée.
+    :param normalize_spaces: Si True, les espaces du texte seront normalisés.
+    :param strict_mode: Si True, aucune transformation n'est appliquée (mode strict).
+    :return: Générateur des morceaux de texte prétraités.
+    """
+    if strict_mode:
+        yield from chunks
+        return
+
+    def transform(piece: str) -> str:
+        return preprocess_text(piece, ignore_case, clean_punctuation, normalize_spaces=False)
+
+    def pieces() -> Iterator[str]:
+        pending = []
+        for chunk in chunks:
+            cut = len(chunk)
+            while cut and not chunk[cut - 1].isspace():
+                cut -= 1
+            if not cut:
+                pending.append(chunk)
+                continue
+            pending.append(chunk[:cut])
+            yield transform(''.join(pending))
+            pending = [chunk[cut:]]
+        rest = ''.join(pending)
+        if rest:
+            yield transform(rest)
+
+    if not normalize_spaces:
+        yield from pieces()
+        return
+
+    emitted = False       # au moins un mot a déjà été produit
+    space_pending = False # des espaces ont été vus depuis le dernier mot produit
+    for piece in pieces():
+        words = piece.split()
+        if not words:
+            space_pending = space_pending or bool(piece)
+            continue
+        if emitted and (space_pending or piece[0].isspace()):
+            yield ' '
+        yield ' '.join(words)
+        emitted = True
+        space_pending = piece[-1].isspace()
+
+
+def preprocess_lines(
+        text: str,
+        ignore_case: bool = True,
+        clean_punctuation: bool = True,
+        normalize_spaces: bool = True,
+        strict_mode: bool = False
+    ) -> str:
+    """
+    Variante de preprocess_text qui conserve le découpage en lignes : la
+    normalisation des espaces s'applique à chaque ligne séparément au lieu de
+    fusionner tout le texte en une seule ligne. C'est la forme attendue par la
+    comparaison ligne à ligne de comparison_engine.
+
+    :param text: Texte original à prétraiter.
+    :param ignore_case: Si True, le texte sera transformé en minuscules.
+    :param clean_punctuation: Si True, la ponctuation sera supprimée.
+    :param normalize_spaces: Si True, les espaces de chaque ligne seront normalisés.
+    :param strict_mode: Si True, aucune transformation n'est appliquée (mode strict).
+    :return: Texte prétraité, lignes séparées par '\\n'.
+    """
+    if strict_mode:
+        return apply_strict_mode(text)
+
+    with stage("preprocess_lines", chars=len(text)):
+        # Minuscules et ponctuation ne touchent pas aux séparateurs de lignes
+        text = preprocess_text(text, ignore_case, clean_punctuation, normalize_spaces=False)
+        if normalize_spaces:
+            text = '\n'.join(' '.join(line.split()) for line in text.splitlines())
+        return text
+
+def _line_starts(text: str) -> array:
+    # Position de début de chaque ligne (découpage de str.splitlines)
+    return array('Q', accumulate(map(len, text.splitlines(True)), initial=0))[:-1] if text else array('Q')
+
+class OffsetMap:
+    """
+    Correspondance entre les positions d'un texte prétraité et celles du texte
+    d'origine, construite par preprocess_with_offsets.
+
+    Elle est codée par plages : normalized_starts[k] est le début (dans le texte
+    prétraité) d'une suite de caractères qui proviennent, dans le même ordre et
+    sans trou, du texte d'origine à partir de original_starts[k]. Une nouvelle
+    plage ne commence qu'après un caractère supprimé ou des espaces fusionnés,
+    soit quelques entiers par signe de ponctuation au lieu d'un par caractère.
+
+    Les débuts de lignes des deux textes et, pour un PDF, les débuts de pages
+    (file_parser.read_pdf_file(..., with_pages=True)) sont conservés à côté :
+    chaque position se projette sur le texte d'origine, puis sur sa ligne et sa
+    page, par recherche dichotomique (O(log n)), sans relire le fichier.
+    """
+
+    def __init__(
+            self,
+            normalized_starts: array,
+            original_starts: array,
+            normalized_length: int,
+            original_length: int,
+            line_starts: array,
+            source_line_starts: array,
+            page_starts: array | None = None
+        ):
+        """
+        :param normalized_starts: Début de chaque plage dans le texte prétraité (croissant).
+        :param original_starts: Début correspondant de chaque plage dans le texte d'origine.
+        :param normalized_length: Longueur du texte prétraité.
+        :param original_length: Longueur du texte d'origine.
+        :param line_starts: Début de chaque ligne du texte prétraité.
+        :param source_line_starts: Début de chaque ligne du texte d'origine.
+        :param page_starts: Début de chaque page dans le texte d'origine, ou None.
+        """
+        self.normalized_starts = normalized_starts
+        self.original_starts = original_starts
+        self.normalized_length = normalized_length
+        self.original_length = original_length
+        self.line_starts = line_starts
+        self.source_line_starts = source_line_starts
+        self.page_starts = page_starts
+
+    def to_original(self, offset: int) -> int:
+        """
+        :param offset: Position dans le texte prétraité.
+        :return: Position du caractère correspondant dans le texte d'origine
+        (longueur du texte d'origine pour la fin du texte prétraité).
+        """
+        if offset >= self.normalized_length:
+            return self.original_length
+        k = bisect_right(self.normalized_starts, offset) - 1
+        return self.original_starts[k] + offset - self.normalized_starts[k]
+
+    def original_range(self, start: int, end: int) -> tuple[int, int]:
+        """
+        :param start: Début d'un passage du texte prétraité.
+        :param end: Fin (exclue) du passage.
+        :return: (début, fin exclue) du passage correspondant dans le texte
+        d'origine, ponctuation et espaces intérieurs compris.
+        """
+        if end <= start:
+            position = self.to_original(start)
+            return position, position
+        return self.to_original(start), self.to_original(end - 1) + 1
+
+    def line_range(self, line1: int, line2: int) -> tuple[int, int]:
+        """
+        Projette les lignes [line1, line2[ du texte prétraité (numéros à partir
+        de 0, comme ceux des hunks de comparison_engine.compare_lines).
+
+        :return: (début, fin exclue) des lignes dans le texte d'origine.
+        """
+        line_starts = self.line_starts
+        start = line_starts[line1] if line1 < len(line_starts) else self.normalized_length
+        end = line_starts[line2] - 1 if line2 < len(line_starts) else self.normalized_length
+        return self.original_range(start, end)
+
+    def source_position(self, offset: int) -> dict:
+        """
+        :param offset: Position dans le texte prétraité.
+        :return: Dictionnaire {'offset', 'line', 'column'} de la position
+        correspondante dans le texte d'origine (ligne et colonne à partir de 1),
+        avec 'page' et 'page_line' (ligne dans la page) pour un PDF.
+        """
+        original = self.to_original(offset)
+        line = max(bisect_right(self.source_line_starts, original) - 1, 0)
+        column = original - (self.source_line_starts[line] if self.source_line_starts else 0)
+        position = {'offset': original, 'line': line + 1, 'column': column + 1}
+        if self.page_starts:
+            page = max(bisect_right(self.page_starts, original) - 1, 0)
+            first_line = max(bisect_right(self.source_line_starts, self.page_starts[page]) - 1, 0)
+            position['page'] = page + 1
+            position['page_line'] = line - first_line + 1
+        return position
+
+    def line_position(self, line: int, column: int = 0) -> dict:
+        """
+        Comme source_position, pour une position donnée par ligne et colonne du
+        texte prétraité (par exemple le 'char_diff' de compare_words_in_line).
+
+        :param line: Numéro (à partir de 0) de la ligne du texte prétraité.
+        :param column: Position (à partir de 0) dans cette ligne.
+        :return: Voir source_position.
+        """
+        start = self.line_starts[line] if line < len(self.line_starts) else self.normalized_length
+        return self.source_position(start + column)
+
+def preprocess_with_offsets(
+        text: str,
+        ignore_case: bool = True,
+        clean_punctuation: bool = True,
+        normalize_spaces: bool = True,
+        strict_mode: bool = False,
+        keep_lines: bool = True,
+        page_starts: array | None = None
+    ) -> tuple[str, OffsetMap]:
+    """
+    Variante de preprocess_lines (ou de preprocess_text si keep_lines vaut
+    False) qui renvoie, avec le texte prétraité, la correspondance de ses
+    positions avec le texte d'origine (OffsetMap). Le texte prétraité est
+    identique à celui des fonctions d'origine.
+
+    :param text: Texte original à prétraiter.
+    :param ignore_case: Si True, le texte sera transformé en minuscules.
+    :param clean_punctuation: Si True, la ponctuation sera supprimée.
+    :param normalize_spaces: Si True, les espaces seront normalisés.
+    :param strict_mode: Si True, aucune transformation n'est appliquée (mode strict).
+    :param keep_lines: Si True, le découpage en lignes est conservé (preprocess_lines).
+    :param page_starts: Début de chaque page dans le texte, pour un PDF
+    (voir file_parser.read_pdf_file), ou None.
+    :return: Tuple (texte prétraité, OffsetMap).
+    """
+    source_line_starts = _line_starts(text)
+    if strict_mode:
+        return text, OffsetMap(array('Q', [0]), array('Q', [0]), len(text), len(text),
+                               source_line_starts, source_line_starts, page_starts)
+
+    with stage("preprocess_with_offsets", chars=len(text)):
+        lowered = text.lower() if ignore_case else text
+        # Rare : certains caractères changent de longueur en minuscules ('İ' → 'i̇') ;
+        # origin donne alors la position d'origine de chaque caractère de lowered.
+        origin = None
+        if len(lowered) != len(text):
+            origin = array('Q')
+            for k, char in enumerate(text):
+                origin.extend([k] * len(char.lower()))
+
+        normalized_starts, original_starts = array('Q'), array('Q')
+        pieces = []
+        position = 0
+        shift = None  # décalage (origine - prétraité) de la plage en cours
+
+        def emit(piece: str, start: int) -> None:
+            nonlocal position, shift
+            if origin is None:
+                if start - position != shift:
+                    shift = start - position
+                    normalized_starts.append(position)
+                    original_starts.append(start)
+            else:
+                for k in range(len(piece)):
+                    if origin[start + k] - position - k != shift:
+                        shift = origin[start + k] - position - k
+                        normalized_starts.append(position + k)
+                        original_starts.append(origin[start + k])
+            pieces.append(piece)
+            position += len(piece)
+
+        if not normalize_spaces:
+            if clean_punctuation:
+                for match in _NO_PUNCTUATION_RE.finditer(lowered):
+                    emit(match.group(), match.start())
+            elif lowered:
+                emit(lowered, 0)
+        else:
+            words_re = _WORDS_NO_PUNCTUATION_RE if clean_punctuation else _WORDS_RE
+            if keep_lines:
+                if clean_punctuation:
+                    # Les lignes sont découpées après suppression de la ponctuation
+                    # (',\r.\n' ne forme alors qu'un seul saut de ligne) : les débuts
+                    # de lignes du texte sans ponctuation sont ramenés dans lowered.
+                    kept_starts, kept_origins, kept = [], [], 0
+                    for match in _NO_PUNCTUATION_RE.finditer(lowered):
+                        kept_starts.append(kept)
+                        kept_origins.append(match.start())
+                        kept += match.end() - match.start()
+
+                    def to_lowered(offset: int) -> int:
+                        k = bisect_right(kept_starts, offset) - 1
+                        return kept_origins[k] + offset - kept_starts[k]
+
+                    line_starts = _line_starts(_PUNCTUATION_RE.sub('', lowered))[1:]
+                    bounds = [0, *map(to_lowered, line_starts), len(lowered)]
+                    breaks = [to_lowered(start - 1) for start in line_starts]
+                else:
+                    bounds = [*_line_starts(lowered), len(lowered)]
+                    breaks = [start - 1 for start in bounds[1:-1]]
+            else:
+                bounds, breaks = [0, len(lowered)], []
+            for n in range(len(bounds) - 1):
+                start, end = bounds[n], bounds[n + 1]
+                if n:
+                    # Le saut de ligne renvoie au dernier caractère de fin de ligne d'origine
+                    emit('\n', breaks[n - 1])
+                previous = None
+                for match in words_re.finditer(lowered, start, end):
+                    if previous is not None:
+                        space = _WHITESPACE_RE.search(lowered, previous, match.start())
+                        if space:
+                            emit(' ', space.start())
+                    emit(match.group(), match.start())
+                    previous = match.end()
+
+        normalized = ''.join(pieces)
+        return normalized, OffsetMap(normalized_starts, original_starts, len(normalized), len(text),
+                                     _line_starts(normalized), source_line_starts, page_starts)
+
+# Options de preprocess_text correspondant aux modes proposés à l'utilisateur
+COMPARISON_MODES = {
+    "souple": {
+        "ignore_case": True,
+        "clean_punctuation": True,
+        "normalize_spaces": True,
+        "strict_mode": False
+    },
+    "strict": {
+        "ignore_case": False,
+        "clean_punctuation": False,
+        "normalize_spaces": False,
+        "strict_mode": True
+    }
+}
 
 if __name__ == "__main__":
     exemple = "Bonjour!   Comment\tça va?   Très bien, merci."
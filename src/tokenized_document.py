@@ -0,0 +1,211 @@
+import re
+from array import array
+from collections import Counter
+from functools import cached_property
+from itertools import accumulate, filterfalse, repeat
+
+from sequence_alignment import block_levels
+
+_WORD_RE = re.compile(r'\b\w+\b')
+
+class Vocabulary:
+    """
+    Table partagée associant chaque terme (ligne ou mot) à un identifiant entier.
+    Les identifiants sont attribués dans l'ordre d'apparition, si bien que deux
+    documents encodés avec le même vocabulaire peuvent être comparés sur des
+    entiers plutôt que sur des chaînes.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._terms = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def encode(self, terms) -> array:
+        """
+        Convertit une suite de termes en tableau d'identifiants, en ajoutant au
+        vocabulaire les termes encore inconnus.
+
+        :param terms: Itérable de chaînes.
+        :return: Tableau array('I') des identifiants.
+        """
+        if not isinstance(terms, list):
+            terms = list(terms)
+        ids = self._ids
+        # Ajout des nouveaux termes (dans l'ordre de leur première apparition,
+        # indépendant du hachage) puis conversion de tous les termes, sans boucle
+        # interprétée : dict.fromkeys, filterfalse, zip et map restent en C.
+        missing = list(filterfalse(ids.__contains__, dict.fromkeys(terms)))
+        ids.update(zip(missing, range(len(ids), len(ids) + len(missing))))
+        return array('I', map(ids.__getitem__, terms))
+
+    def lookup(self, term: str) -> int | None:
+        """
+        :param term: Terme recherché.
+        :return: Identifiant du terme, ou None s'il n'a jamais été encodé.
+        """
+        return self._ids.get(term)
+
+    def term(self, term_id: int) -> str:
+        """
+        :param term_id: Identifiant attribué par encode.
+        :return: Terme correspondant.
+        """
+        if term_id >= len(self._terms):
+            # Les clés du dictionnaire sont dans l'ordre des identifiants
+            self._terms = list(self._ids)
+        return self._terms[term_id]
+
+    def copy(self) -> "Vocabulary":
+        """
+        :return: Copie indépendante du vocabulaire ; les identifiants existants
+                 restent identiques, les ajouts ultérieurs ne sont pas partagés.
+        """
+        vocabulary = Vocabulary()
+        vocabulary._ids = dict(self._ids)
+        return vocabulary
+
+    def terms(self, term_ids) -> list[str]:
+        """
+        :param term_ids: Itérable d'identifiants.
+        :return: Liste des termes correspondants, dans le même ordre.
+        """
+        if len(self._terms) != len(self._ids):
+            self._terms = list(self._ids)
+        terms = self._terms
+        return [terms[term_id] for term_id in term_ids]
+
+class TokenizedDocument:
+    """
+    Représentation d'un texte découpée une seule fois et partagée par toutes les
+    fonctions de comparison_engine :
+
+    - lines / line_ids : lignes (text.splitlines()) et leurs identifiants,
+      qui servent d'empreintes exactes des lignes,
+    - line_blocks : hiérarchie d'empreintes 64 bits de blocs de lignes
+      (sequence_alignment.block_levels), pour reconnaître les passages
+      identiques sans parcourir leurs lignes,
+    - word_ids : mots séparés par des espaces (text.split()),
+    - lower_word_ids : mots en minuscules (text.lower().split()),
+    - lower_word_counts : nombre d'occurrences de chaque identifiant de lower_word_ids,
+    - line_word_starts : indice, dans word_ids / lower_word_ids, du premier mot
+      de chaque ligne (plus le nombre total de mots en dernière position),
+    - keyword_ids / keyword_lines : mots sans ponctuation en minuscules
+      (\\b\\w+\\b) et numéro (à partir de 0) de la ligne de chacun,
+    - keyword_index : index inversé de keyword_ids (keyword_index.KeywordIndex).
+
+    Chaque représentation est calculée à la première utilisation puis conservée.
+    """
+
+    def __init__(self, text: str, vocabulary: Vocabulary | None = None):
+        """
+        :param text: Texte du document.
+        :param vocabulary: Vocabulaire partagé avec les autres documents comparés.
+        """
+        self.text = text
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+
+    def fork(self) -> "TokenizedDocument":
+        """
+        Renvoie une copie du document dont le vocabulaire est indépendant mais
+        qui réutilise tous les découpages déjà calculés. Permet de comparer un
+        même document de référence à une série d'autres documents sans que son
+        vocabulaire n'accumule les mots de chacun d'eux.
+
+        :return: Nouveau TokenizedDocument.
+        """
+        document = TokenizedDocument(self.text, self.vocabulary.copy())
+        for name, value in self.__dict__.items():
+            if name not in ("text", "vocabulary"):
+                document.__dict__[name] = value
+        return document
+
+    @cached_property
+    def lines(self) -> list[str]:
+        return self.text.splitlines()
+
+    @cached_property
+    def line_ids(self) -> array:
+        return self.vocabulary.encode(self.lines)
+
+    @cached_property
+    def line_blocks(self) -> list:
+        return block_levels(self.line_ids)
+
+    @cached_property
+    def word_ids(self) -> array:
+        return self.vocabulary.encode(self.text.split())
+
+    @cached_property
+    def lower_word_ids(self) -> array:
+        return self.vocabulary.encode(self.text.lower().split())
+
+    @cached_property
+    def lower_word_counts(self) -> Counter:
+        return Counter(self.lower_word_ids)
+
+    @cached_property
+    def line_word_starts(self) -> array:
+        # Les séparateurs de splitlines() sont tous des espaces pour split() :
+        # les mots du texte sont exactement ceux des lignes mis bout à bout.
+        return array('I', accumulate(map(len, map(str.split, self.lines)), initial=0))
+
+    @cached_property
+    def _keyword_tokens(self) -> tuple[array, array]:
+        tokens = []
+        token_lines = array('I')
+        findall = _WORD_RE.findall
+        for line_number, line in enumerate(self.lines):
+            words = findall(line.lower())
+            if words:
+                tokens.extend(words)
+                token_lines.extend(repeat(line_number, len(words)))
+        return self.vocabulary.encode(tokens), token_lines
+
+    @property
+    def keyword_ids(self) -> array:
+        return self._keyword_tokens[0]
+
+    @property
+    def keyword_lines(self) -> array:
+        return self._keyword_tokens[1]
+
+    @cached_property
+    def keyword_index(self):
+        from keyword_index import KeywordIndex
+        return KeywordIndex(self)
+
+def tokenize_documents(
+        text1: "str | TokenizedDocument",
+        text2: "str | TokenizedDocument"
+    ) -> tuple[TokenizedDocument, TokenizedDocument]:
+    """
+    Renvoie deux TokenizedDocument partageant le même vocabulaire. Les documents
+    déjà découpés sont réutilisés tels quels s'ils partagent déjà un vocabulaire.
+
+    :param text1: Premier texte ou document déjà découpé.
+    :param text2: Deuxième texte ou document déjà découpé.
+    :return: Tuple (document 1, document 2).
+    """
+    if (isinstance(text1, TokenizedDocument) and isinstance(text2, TokenizedDocument)
+            and text1.vocabulary is text2.vocabulary):
+        return text1, text2
+
+    if isinstance(text1, TokenizedDocument):
+        vocabulary = text1.vocabulary
+        doc1 = text1
+    elif isinstance(text2, TokenizedDocument):
+        vocabulary = text2.vocabulary
+        doc1 = TokenizedDocument(text1, vocabulary)
+    else:
+        vocabulary = Vocabulary()
+        doc1 = TokenizedDocument(text1, vocabulary)
+
+    if isinstance(text2, TokenizedDocument) and text2.vocabulary is vocabulary:
+        doc2 = text2
+    else:
+        text2 = text2.text if isinstance(text2, TokenizedDocument) else text2
+        doc2 = TokenizedDocument(text2, vocabulary)
+    return doc1, doc2
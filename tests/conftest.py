@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Les modules de src/ s'importent à plat, comme depuis la ligne de commande
+sys.path.insert(0, SRC_DIR)
+
+
+@pytest.fixture
+def run_with_hash_seeds():
+    """Exécute un script Python dans src/ sous plusieurs PYTHONHASHSEED et renvoie ses sorties."""
+    def run(code, seeds=(0, 1, 58)):
+        outputs = []
+        for seed in seeds:
+            env = dict(os.environ, PYTHONHASHSEED=str(seed))
+            result = subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR, env=env,
+                                    capture_output=True, text=True, check=True)
+            outputs.append(result.stdout)
+        return outputs
+    return run
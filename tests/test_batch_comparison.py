@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import batch_cli
+from batch_comparison import collect_documents, compare_all_pairs, compare_to_baseline
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    base = "Article 1. Objet du contrat.\nArticle 2. Durée : un an.\nArticle 3. Résiliation."
+    (tmp_path / 'docs').mkdir()
+    paths = {
+        'base': tmp_path / 'base.txt',
+        'same': tmp_path / 'docs' / 'a_same.txt',
+        'changed': tmp_path / 'docs' / 'b_changed.txt',
+    }
+    paths['base'].write_text(base, encoding='utf-8')
+    paths['same'].write_text(base.upper(), encoding='utf-8')
+    paths['changed'].write_text(base.replace("un an", "deux ans"), encoding='utf-8')
+    (tmp_path / 'docs' / 'ignored.docx').write_text("ignoré", encoding='utf-8')
+    return {name: str(path) for name, path in paths.items()}
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file]
+
+
+def test_baseline_jsonl_output(corpus, tmp_path):
+    output = tmp_path / 'out.jsonl'
+    docs = str(tmp_path / 'docs')
+    assert collect_documents([docs]) == [corpus['same'], corpus['changed']]
+    assert batch_cli.main(['--baseline', corpus['base'], docs, '--keywords', 'contrat',
+                           '--workers', '1', '--output', str(output)]) == 0
+
+    records = {record['document']: record for record in read_jsonl(output)}
+    assert set(records) == {corpus['same'], corpus['changed']}
+    same, changed = records[corpus['same']], records[corpus['changed']]
+    assert same['baseline'] == corpus['base']
+    assert same['similarity_rate'] == 100.0 and same['changed_lines'] == 0
+    assert changed['common_lines'] == 2 and changed['changed_lines'] == 1
+    assert changed['keyword_search'] == {'contrat': {'text1': {'found': True, 'count': 1},
+                                                     'text2': {'found': True, 'count': 1}}}
+
+
+def test_parallel_baseline_matches_serial(corpus):
+    paths = [corpus['same'], corpus['changed']] * 3
+
+    def results(workers):
+        records = list(compare_to_baseline(corpus['base'], paths, workers=workers))
+        for record in records:
+            del record['elapsed']
+        # Résultats produits dans l'ordre où les comparaisons se terminent
+        return sorted(map(json.dumps, records))
+
+    assert results(2) == results(1)
+
+
+def test_unreadable_documents(corpus, tmp_path, capsys):
+    output = tmp_path / 'out.jsonl'
+    missing = str(tmp_path / 'absent.txt')
+    # Un document illisible : une ligne d'erreur et le code 1
+    assert batch_cli.main(['--baseline', corpus['base'], corpus['same'], missing,
+                           '--workers', '1', '--output', str(output)]) == 1
+    records = read_jsonl(output)
+    assert [record['document'] for record in records] == [corpus['same'], missing]
+    assert 'error' in records[1] and 'error' not in records[0]
+    assert "1 erreur(s)" in capsys.readouterr().err
+
+    # Référence illisible : ValueError, code 2 sans sortie
+    with pytest.raises(ValueError):
+        compare_to_baseline(missing, [corpus['same']], workers=1)
+    assert batch_cli.main(['--baseline', missing, corpus['same'], '--output', str(output)]) == 2
+    assert "Erreur" in capsys.readouterr().err
+
+
+def test_all_pairs(corpus):
+    paths = [corpus['base'], corpus['same'], corpus['changed'], corpus['base'] + '.absent']
+    records = list(compare_all_pairs(paths, workers=1))
+    assert records[0] == {'document': paths[3], 'error': 'document illisible ou format non supporté'}
+    pairs = {(record['document1'], record['document2']): record['similarity_rate'] for record in records[1:]}
+    assert set(pairs) == {(paths[0], paths[1]), (paths[0], paths[2]), (paths[1], paths[2])}
+    assert pairs[paths[0], paths[1]] == 100.0
+    assert pairs[paths[0], paths[2]] < 100.0
@@ -0,0 +1,46 @@
+import json
+
+from benchmark import apply_edits, compare_to_baseline, generate_lines, main, run_benchmarks
+
+
+def test_synthetic_corpus_is_reproducible():
+    lines = generate_lines(200, seed=3)
+    assert lines == generate_lines(200, seed=3) and lines != generate_lines(200, seed=4)
+    assert apply_edits(lines, 0.1, seed=1) == apply_edits(lines, 0.1, seed=1)
+    assert apply_edits(lines, 0.0) == lines
+
+
+def test_run_benchmarks_measures_every_stage():
+    report = run_benchmarks(sizes=(50,), pdf_pages=0, repeat=1, verbose=False)
+    assert report['parameters']['sizes'] == [50]
+    names = set(report['results'])
+    assert {'parse_file.txt[50]', 'compare_lines[50]', 'compare_documents[50]', 'generate_report[50]'} <= names
+    for result in report['results'].values():
+        assert result['seconds'] <= result['mean_seconds'] and result['peak_bytes'] >= 0
+
+
+def test_compare_to_baseline():
+    baseline = {'results': {'a': {'seconds': 1.0, 'peak_bytes': 1000},
+                            'b': {'seconds': 0.0001, 'peak_bytes': 1000}}}
+    current = {'results': {'a': {'seconds': 1.5, 'peak_bytes': 1100},
+                           'b': {'seconds': 0.0005, 'peak_bytes': 1000},
+                           'c': {'seconds': 9.0, 'peak_bytes': 9}}}
+    # 'b' reste sous le seuil de bruit, 'c' n'a pas de référence
+    regressions = compare_to_baseline(current, baseline)
+    assert len(regressions) == 1 and regressions[0].startswith('a : seconds')
+    assert compare_to_baseline(current, baseline, tolerance=0.6) == []
+
+
+def test_main_exit_codes(tmp_path):
+    output = tmp_path / 'bench.json'
+    options = ['--sizes', '30', '--pdf-pages', '0', '--repeat', '1', '--output', str(output)]
+    assert main(options) == 0
+    results = json.loads(output.read_text(encoding='utf-8'))
+    # Référence dix fois plus rapide : régression signalée
+    for result in results['results'].values():
+        result['seconds'] /= 10
+        result['peak_bytes'] //= 10
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(results), encoding='utf-8')
+    assert main(options + ['--baseline', str(baseline)]) == 1
+    assert main(options + ['--baseline', str(tmp_path / 'absent.json')]) == 2
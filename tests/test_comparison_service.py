@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+from comparison_service import ComparisonService, send_request
+
+
+def run_service(scenario, **options):
+    """Démarre le service sur un port libre et exécute scenario(service, port)."""
+    async def main():
+        async with ComparisonService(workers=1, **options) as service:
+            server = await service.serve(port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await scenario(service, port)
+    return asyncio.run(main())
+
+
+async def raw_request(port, payload):
+    # Réponse brute, en-têtes compris
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(b"POST /compare HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b"\r\n\r\n")
+    lines = head.decode('latin-1').split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, json.loads(data)
+
+
+def compare_payload(text1, text2, **options):
+    return {"document1": {"text": text1}, "document2": {"text": text2}, **options}
+
+
+async def wait_for(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+def test_compare_and_identical_field(tmp_path):
+    document = tmp_path / 'a.txt'
+    document.write_text("Première ligne.\nDeuxième ligne", encoding='utf-8')
+
+    async def scenario(service, port):
+        same = await send_request("POST", "/compare", {"document1": {"path": str(document)},
+                                                       "document2": {"text": "première ligne\ndeuxième ligne"}},
+                                  port=port)
+        different = await send_request("POST", "/compare", compare_payload("a\nb", "a\nc", keywords=["b"]),
+                                       port=port)
+        text = await send_request("POST", "/compare", compare_payload("a\nb", "a\nc", format="text"), port=port)
+        health = await send_request("GET", "/health", port=port)
+        return same, different, text, health
+
+    same, different, text, health = run_service(scenario)
+    assert same[0] == 200 and same[1]["identical"] is True
+    assert different[0] == 200 and different[1]["identical"] is False
+    assert different[1]["line_comparison"]["diff"] == [["b", "c"]]
+    assert text[0] == 200 and isinstance(text[1], str) and text[1]
+    assert health == (200, {"status": "ok"})
+
+
+def test_invalid_requests(tmp_path):
+    async def scenario(service, port):
+        return [
+            await send_request("POST", "/compare", compare_payload("a", "b", mode="inconnu"), port=port),
+            await send_request("POST", "/compare", compare_payload("a", "b", metrics=["inconnue"]), port=port),
+            await send_request("POST", "/compare", {"document1": {"text": "a"}}, port=port),
+            await send_request("POST", "/compare", {"document1": {"path": str(tmp_path / "absent.txt")},
+                                                    "document2": {"text": "a"}}, port=port),
+            await send_request("GET", "/compare", port=port),
+            await send_request("GET", "/inconnue", port=port),
+        ]
+
+    statuses = [status for status, _ in run_service(scenario)]
+    assert statuses == [400, 400, 400, 422, 405, 404]
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def scenario(service, port):
+        # Le seul emplacement d'exécution est occupé : la première requête attend dans la file
+        await service._slots.acquire()
+        first = asyncio.create_task(send_request("POST", "/compare", compare_payload("a", "b"), port=port))
+        await wait_for(lambda: service.metrics()["queue_depth"] == 1)
+        rejected = await raw_request(port, compare_payload("c", "d"))
+        service._slots.release()
+        return await first, rejected, service.metrics()
+
+    first, (status, headers, body), metrics = run_service(scenario, max_jobs=1, max_queue=0)
+    assert first[0] == 200
+    assert status == 503 and headers["Retry-After"] == "1" and body["error"]
+    assert metrics["rejected"] == 1 and metrics["completed"] == 1
+
+
+def test_deduplication_and_metrics():
+    async def scenario(service, port):
+        await service._slots.acquire()
+        payload = compare_payload("même texte", "même texte")
+        requests = [asyncio.create_task(send_request("POST", "/compare", payload, port=port)) for _ in range(3)]
+        await wait_for(lambda: service.metrics()["requests"] == 3)
+        service._slots.release()
+        responses = await asyncio.gather(*requests)
+        return responses, await send_request("GET", "/metrics", port=port)
+
+    responses, (status, metrics) = run_service(scenario, max_jobs=1)
+    assert [(code, body["identical"]) for code, body in responses] == [(200, True)] * 3
+    assert status == 200
+    assert metrics["requests"] == metrics["completed"] == 3
+    # Une seule comparaison pour les trois requêtes, un seul chargement pour les deux documents
+    assert metrics["deduplicated_comparisons"] == 2
+    assert metrics["deduplicated_documents"] == 1
+    assert (metrics["queue_depth"], metrics["in_flight"], metrics["failed"], metrics["rejected"]) == (0, 0, 0, 0)
+    assert {"max_jobs", "max_queue", "workers", "latency", "queue_wait"} <= set(metrics)
+    assert metrics["latency"]["count"] == 3 and metrics["queue_wait"]["count"] == 1
+
+
+def test_paths_are_restricted_to_root(tmp_path):
+    root = tmp_path / 'racine'
+    (root / 'docs').mkdir(parents=True)
+    (root / 'docs' / 'a.txt').write_text("texte autorisé", encoding='utf-8')
+    secret = tmp_path / 'secret.txt'
+    secret.write_text("texte secret", encoding='utf-8')
+    (root / 'lien.txt').symlink_to(secret)
+
+    async def scenario(service, port):
+        async def compare_path(path):
+            return await send_request("POST", "/compare", {"document1": {"path": path},
+                                                           "document2": {"text": "texte autorisé"}}, port=port)
+        return [await compare_path(path)
+                for path in ('docs/a.txt', str(root / 'docs' / 'a.txt'), str(secret), '../secret.txt',
+                             'docs/../../secret.txt', 'lien.txt')]
+
+    responses = run_service(scenario, root=str(root))
+    assert [status for status, _ in responses] == [200, 200, 403, 403, 403, 403]
+    assert responses[0][1]["identical"] and responses[1][1]["identical"]
+    assert all("texte secret" not in json.dumps(body, ensure_ascii=False) for _, body in responses[2:])
@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from comparison_engine import calculate_similarity_rate, compare_documents, split_hunk
+from comparison_session import ComparisonSession
+
+
+def check_session(session):
+    """Vérifie les résultats de la session contre une comparaison complète des textes actuels."""
+    lines1, lines2 = session.lines(1), session.lines(2)
+    results = session.results
+    line_comparison = results["line_comparison"]
+    hunks = line_comparison["hunks"]
+
+    i = j = 0
+    for tag, i1, i2, j1, j2 in hunks:
+        assert (i1, j1) == (i, j)
+        assert i1 < i2 or j1 < j2
+        if tag == 'equal':
+            assert lines1[i1:i2] == lines2[j1:j2]
+        elif tag == 'delete':
+            assert j1 == j2
+        elif tag == 'insert':
+            assert i1 == i2
+        i, j = i2, j2
+    assert (i, j) == (len(lines1), len(lines2))
+    assert all(not (a[0] == b[0] == 'equal') for a, b in zip(hunks, hunks[1:]))
+
+    expected = {key: [] for key in ("common", "diff", "unique_to_text1", "unique_to_text2")}
+    for hunk in hunks:
+        for key, part in zip(expected, split_hunk(hunk, lines1, lines2)):
+            expected[key].extend(part)
+    for key in expected:
+        assert line_comparison[key] == expected[key], key
+    assert [(d["line_text1"], d["line_text2"]) for d in results["word_level_differences"]] == line_comparison["diff"]
+    assert results["similarity_rate"] == calculate_similarity_rate(lines1, lines2, line_comparison)
+
+    full = compare_documents(session.text(1), session.text(2), None)
+    for key in ("only_in_text1", "only_in_text2"):
+        assert set(results["unique_words"][key]) == set(full["unique_words"][key])
+    return full
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_random_edits(seed):
+    rng = random.Random(seed)
+    for _ in range(30):
+        n = rng.randint(0, 60)
+        a = [f"l{rng.randint(0, 30)}" for _ in range(n)]
+        b = list(a)
+        rng.shuffle(b[:rng.randint(0, n)])
+        session = ComparisonSession("\n".join(a), "\n".join(b))
+        check_session(session)
+        for _ in range(10):
+            side = rng.choice((1, 2))
+            lines = list(session.lines(side))
+            start = rng.randint(0, len(lines))
+            stop = rng.randint(start, min(len(lines), start + 5))
+            new_lines = [f"l{rng.randint(0, 40)} {rng.choice(['x', 'y', ''])}".strip()
+                         for _ in range(rng.randint(0, 4))]
+            if rng.random() < 0.5:
+                session.replace_lines(side, start, stop, new_lines)
+            else:
+                lines[start:stop] = new_lines
+                session.update(side, "\n".join(lines))
+            check_session(session)
+
+
+def test_local_edit_matches_full_recompute():
+    # Lignes toutes distinctes : l'alignement local est celui de la comparaison complète
+    lines = [f"ligne {k}" for k in range(500)]
+    edited = list(lines)
+    edited[100:103] = ["nouveau paragraphe"]
+    edited[400:400] = ["ajout"]
+    session = ComparisonSession("\n".join(lines), "\n".join(edited))
+
+    session.replace_lines(2, 250, 252, ["autre", "texte"])
+    lines2 = list(session.lines(2))
+    del lines2[10]
+    session.update(2, "\n".join(lines2))
+    session.replace_lines(1, 0, 0, ["en-tête"])
+
+    full = check_session(session)
+    assert session.results["line_comparison"]["hunks"] == list(full["line_comparison"]["hunks"])
+    assert session.results["similarity_rate"] == full["similarity_rate"]
+
+
+def test_unchanged_update_and_bad_range():
+    session = ComparisonSession("a\nb", "a\nc")
+    results = session.results
+    assert session.update(1, "a\nb") is results
+    with pytest.raises(IndexError):
+        session.replace_lines(1, 1, 5, [])
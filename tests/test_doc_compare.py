@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from doc_compare import EXIT_DIFFERENT, EXIT_ERROR, EXIT_IDENTICAL, main
+from result_export import iter_jsonl
+
+TEXT = "Article 1. Objet du contrat.\nArticle 2. Durée : un an.\nArticle 3. Résiliation."
+
+
+@pytest.fixture
+def documents(tmp_path):
+    paths = {}
+    for name, text in (('a', TEXT), ('b', TEXT.lower()), ('c', TEXT.replace("un an", "deux ans"))):
+        paths[name] = tmp_path / f'{name}.txt'
+        paths[name].write_text(text, encoding='utf-8')
+    return {name: str(path) for name, path in paths.items()}
+
+
+def test_exit_codes(documents, tmp_path, capsys):
+    assert main([documents['a'], documents['b']]) == EXIT_IDENTICAL
+    assert main([documents['a'], documents['b'], '--mode', 'strict']) == EXIT_DIFFERENT
+    assert main([documents['a'], documents['c']]) == EXIT_DIFFERENT
+    report = capsys.readouterr().out
+    assert "deux ans" in report
+
+    assert main([documents['a'], str(tmp_path / 'absent.txt')]) == EXIT_ERROR
+    assert "absent.txt" in capsys.readouterr().err
+    # Arguments invalides : argparse sort avec le code 2
+    with pytest.raises(SystemExit) as exit_info:
+        main([documents['a'], documents['c'], '--metrics', 'inconnue'])
+    assert exit_info.value.code == EXIT_ERROR
+
+
+def test_json_format(documents, capsys):
+    assert main([documents['a'], documents['c'], '--format', 'json', '--keywords', 'contrat,an',
+                 '--metrics', 'jaccard']) == EXIT_DIFFERENT
+    results = json.loads(capsys.readouterr().out)
+    assert results['documents'] == {'text1': documents['a'], 'text2': documents['c']}
+    assert results['mode'] == 'souple' and results['identical'] is False
+    assert results['line_comparison']['diff'] == [["article 2 durée un an", "article 2 durée deux ans"]]
+    assert set(results['keyword_searches']) == {'contrat', 'an'}
+    assert set(results['similarity_metrics']) == {'jaccard'}
+
+
+def test_jsonl_format(documents, tmp_path):
+    output = tmp_path / 'out.jsonl'
+    assert main([documents['a'], documents['c'], '--format', 'jsonl', '--output', str(output)]) == EXIT_DIFFERENT
+    with open(output, encoding='utf-8') as stream:
+        records = list(iter_jsonl(stream))
+    assert records[0]['type'] == 'header'
+    hunks = [record for record in records if record['type'] == 'hunk']
+    assert [hunk['tag'] for hunk in hunks] == ['equal', 'replace', 'equal']
+    assert [record['type'] for record in records].count('word_diff') == 1
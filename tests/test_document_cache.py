@@ -0,0 +1,96 @@
+import os
+import random
+import string
+
+import document_cache
+from document_cache import EVICTION_TARGET, DocumentCache, cache_key, file_content_hash
+
+
+def random_text(seed, size=4000):
+    # Texte peu compressible : la taille des entrées reste proche de size
+    rng = random.Random(seed)
+    return ''.join(rng.choices(string.ascii_letters + string.digits, k=size))
+
+
+def entry_sizes(cache):
+    return sum(size for _, size, _ in cache._entry_files())
+
+
+def test_put_get_and_keys(tmp_path):
+    cache = DocumentCache(str(tmp_path))
+    key = cache_key('abc')
+    assert cache.get(key) is None
+    cache.put(key, 'texte prétraité')
+    assert cache.get(key) == 'texte prétraité'
+    assert DocumentCache(str(tmp_path)).get(key) == 'texte prétraité'
+    assert len({cache_key('abc'), cache_key('abc', ignore_case=False), cache_key('abc', keep_lines=True),
+                cache_key('abc', raw=True)}) == 4
+    assert cache_key('abc', raw=True) == cache_key('abc', strict_mode=True)
+
+    cache.clear()
+    assert cache.get(key) is None and entry_sizes(cache) == 0
+
+
+def test_lru_eviction_across_instances(tmp_path):
+    first = DocumentCache(str(tmp_path), max_bytes=20000)
+    second = DocumentCache(str(tmp_path), max_bytes=20000)
+    keys = [cache_key(str(n)) for n in range(4)]
+    for n, key in enumerate(keys):
+        (first if n % 2 else second).put(key, random_text(n))
+        os.utime(first._entry_path(key), (1000 + n, 1000 + n))
+    # Lecture : l'entrée la plus ancienne redevient la plus récente
+    assert first.get(keys[0]) == random_text(0)
+
+    for n in range(4, 8):
+        key = cache_key(str(n))
+        second.put(key, random_text(n))
+        # Chaque instance ignore les ajouts de l'autre depuis son dernier parcours
+        assert entry_sizes(first) <= 20000 * (1 + 2 * (1 - EVICTION_TARGET))
+
+    # Une nouvelle instance parcourt le répertoire dès son premier ajout
+    DocumentCache(str(tmp_path), max_bytes=20000).put(cache_key('8'), random_text(8))
+    assert entry_sizes(first) <= 20000
+    assert first.get(keys[1]) is None
+    assert second.get(cache_key('8')) == random_text(8)
+
+
+def test_directory_is_scanned_only_when_the_estimate_crosses_the_limit(tmp_path, monkeypatch):
+    cache = DocumentCache(str(tmp_path), max_bytes=50000)
+    scans = []
+    entry_files = cache._entry_files
+    monkeypatch.setattr(cache, '_entry_files', lambda: scans.append(1) or entry_files())
+    for n in range(20):
+        cache.put(cache_key(str(n)), random_text(n))
+    # Parcours initial puis un seul à la première estimation au-delà de max_bytes
+    assert len(scans) == 2
+    assert entry_sizes(cache) <= 50000
+    assert cache._estimated_bytes == entry_sizes(cache)
+
+    # Remplacer une entrée ne compte pas deux fois sa taille
+    size = entry_sizes(cache)
+    cache.put(cache_key('19'), random_text(19))
+    assert cache._estimated_bytes == size == entry_sizes(cache)
+
+
+def test_content_hash_records(tmp_path, monkeypatch):
+    cache = DocumentCache(str(tmp_path / 'cache'))
+    document = tmp_path / 'document.txt'
+    document.write_text('version 1', encoding='utf-8')
+    first_hash = cache.content_hash(str(document))
+    assert first_hash == file_content_hash(str(document))
+
+    # Taille et date inchangées : l'empreinte mémorisée est réutilisée sans relire le fichier
+    stat = os.stat(document)
+    document.write_text('version 2', encoding='utf-8')
+    os.utime(document, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.content_hash(str(document)) == first_hash
+    os.utime(document, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.content_hash(str(document)) == file_content_hash(str(document))
+
+    monkeypatch.setattr(document_cache, 'MAX_FILE_RECORDS', 3)
+    for n in range(6):
+        other = tmp_path / f'autre{n}.txt'
+        other.write_text(str(n), encoding='utf-8')
+        cache.content_hash(str(other))
+    cache.put(cache_key('x'), 'x')
+    assert len(os.listdir(tmp_path / 'cache' / 'files')) == int(3 * EVICTION_TARGET)
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from benchmark import apply_edits, generate_lines
+from comparison_engine import compare_documents
+from external_comparison import ExternalDocument, external_unique_words
+from mapped_document import MappedDocument
+
+
+def write_lines(path, lines):
+    path.write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+    return str(path)
+
+
+def check_hunks(hunks, len1, len2):
+    i = j = 0
+    for tag, i1, i2, j1, j2 in hunks:
+        assert (i1, j1) == (i, j)
+        assert i1 < i2 or j1 < j2
+        i, j = i2, j2
+    assert (i, j) == (len1, len2)
+
+
+@pytest.fixture(params=[0.01, 0.3], ids=['faible', 'fort'])
+def documents(request, tmp_path):
+    lines1 = generate_lines(5000)
+    lines2 = apply_edits(lines1, request.param, 2)
+    return lines1, lines2, write_lines(tmp_path / 'a.txt', lines1), write_lines(tmp_path / 'b.txt', lines2)
+
+
+@pytest.mark.parametrize('memory_limit', [1 << 15, 1 << 18, 1 << 26])
+def test_close_to_in_memory_results(documents, memory_limit, tmp_path):
+    lines1, lines2, path1, path2 = documents
+    temp_dir = tmp_path / 'temp'
+    temp_dir.mkdir()
+    expected = compare_documents('\n'.join(lines1), '\n'.join(lines2), None)
+
+    with ExternalDocument(path1, memory_limit=memory_limit, temp_dir=str(temp_dir)) as document1, \
+            ExternalDocument(path2, memory_limit=memory_limit, temp_dir=str(temp_dir)) as document2:
+        results = compare_documents(document1, document2, None, lazy=True)
+        line_comparison = results['line_comparison']
+        hunks = list(line_comparison['hunks'])
+        check_hunks(hunks, len(lines1), len(lines2))
+        common = []
+        for tag, i1, i2, j1, j2 in hunks:
+            if tag == 'equal':
+                assert lines1[i1:i2] == lines2[j1:j2]
+                common.extend(lines1[i1:i2])
+        assert list(line_comparison['common']) == common
+        diff = list(line_comparison['diff'])
+        assert [(d['line_text1'], d['line_text2']) for d in results['word_level_differences']] == diff
+        for key in ('only_in_text1', 'only_in_text2'):
+            assert sorted(results['unique_words'][key]) == sorted(expected['unique_words'][key])
+
+        # Sous le plafond, les zones trop grandes sont alignées par fenêtres :
+        # l'alignement est approché, mais perd peu de lignes communes.
+        assert len(common) >= 0.95 * len(expected['line_comparison']['common'])
+        assert results['similarity_rate'] >= expected['similarity_rate'] - 5
+
+    if memory_limit == 1 << 26:
+        # Plafond assez grand pour ne découper aucune zone : même alignement
+        # que deux MappedDocument
+        with MappedDocument(path1) as document1, MappedDocument(path2) as document2:
+            assert hunks == list(compare_documents(document1, document2, None)['line_comparison']['hunks'])
+
+    # Les fichiers temporaires sont supprimés à la fermeture des documents
+    assert os.listdir(temp_dir) == []
+
+
+def test_partitioned_unique_words(tmp_path):
+    lines1 = generate_lines(3000)
+    lines2 = [line + f' mot{k}' for k, line in enumerate(apply_edits(lines1, 0.2, 3))]
+    path1, path2 = write_lines(tmp_path / 'a.txt', lines1), write_lines(tmp_path / 'b.txt', lines2)
+    expected = compare_documents('\n'.join(lines1), '\n'.join(lines2), None)['unique_words']
+    with ExternalDocument(path1, memory_limit=1 << 14) as document1, \
+            ExternalDocument(path2, memory_limit=1 << 14) as document2:
+        unique_words = external_unique_words(document1, document2)
+    for key in ('only_in_text1', 'only_in_text2'):
+        assert sorted(unique_words[key]) == sorted(expected[key])
+
+
+def test_moves_are_not_supported(tmp_path):
+    path = write_lines(tmp_path / 'a.txt', ['ligne'])
+    with ExternalDocument(path) as document1, ExternalDocument(path) as document2:
+        with pytest.raises(ValueError):
+            compare_documents(document1, document2, None, detect_moves=True)
@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip("pdfplumber")
+
+import file_parser
+from benchmark import write_pdf
+from file_parser import iter_file_lines, iter_pdf_lines, iter_pdf_pages, parse_file, read_pdf_file
+
+PAGES = [[f"Page {page} ligne {line}" for line in range(page % 3 + 1)] if page % 5 else []
+         for page in range(12)]
+LINES_PER_PAGE = 3
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = str(tmp_path / "document.pdf")
+    # Pages complétées par des lignes vides, qui ne produisent pas de texte
+    write_pdf(path, [line for lines in PAGES for line in lines + [""] * (LINES_PER_PAGE - len(lines))],
+              LINES_PER_PAGE)
+    return path
+
+
+def test_pages_are_extracted_in_order(pdf_path):
+    assert list(iter_pdf_pages(pdf_path)) == ["\n".join(lines) for lines in PAGES]
+
+
+def test_parallel_extraction_matches_serial(pdf_path, monkeypatch):
+    serial = list(iter_pdf_pages(pdf_path, workers=1))
+    monkeypatch.setattr(file_parser, "PARALLEL_MIN_PAGES", 2)
+    assert list(iter_pdf_pages(pdf_path, workers=2, chunk_size=3)) == serial
+    assert read_pdf_file(pdf_path, workers=2, chunk_size=5) == read_pdf_file(pdf_path)
+
+    # Consommation interrompue : le générateur se ferme sans attendre les tranches restantes
+    pages = iter_pdf_pages(pdf_path, workers=2, chunk_size=2)
+    head = [next(pages) for _ in range(3)]
+    pages.close()
+    assert head == serial[:3]
+
+
+def test_lines_match_full_text(pdf_path):
+    text = read_pdf_file(pdf_path)
+    assert list(iter_pdf_lines(pdf_path)) == text.splitlines()
+    assert list(iter_file_lines(pdf_path)) == text.splitlines()
+    assert parse_file(pdf_path) == text
+
+
+def test_page_starts(pdf_path):
+    text, page_starts = read_pdf_file(pdf_path, with_pages=True)
+    assert text == read_pdf_file(pdf_path)
+    assert len(page_starts) == len(PAGES)
+    for lines, start in zip(PAGES, page_starts):
+        if lines:
+            assert text[start:].startswith(lines[0] + "\n")
+    # Une page sans texte commence là où commence la suivante
+    assert page_starts[0] == page_starts[1] == 0
+
+
+def test_missing_file(tmp_path):
+    missing = str(tmp_path / "absent.pdf")
+    assert parse_file(missing) is None
+    assert iter_file_lines(missing) is None
+    assert read_pdf_file(missing) is None
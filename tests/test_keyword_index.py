@@ -0,0 +1,80 @@
+import random
+import re
+
+import pytest
+
+from comparison_engine import search_keywords
+from keyword_index import KeywordIndex, scan_keyword
+from tokenized_document import TokenizedDocument
+
+WORDS = ['clause', 'Clause', 'clauses', 'de', 'la', 'résiliation', 'résilier', 'contrat', 'l', 'a']
+
+
+def random_text(seed, lines=200):
+    rng = random.Random(seed)
+    return '\n'.join(
+        ' '.join(rng.choice(WORDS) + rng.choice(['', '', ',', '.', "'"]) for _ in range(rng.randrange(8)))
+        for _ in range(lines)
+    )
+
+
+def naive_positions(text, query):
+    # Découpage ligne par ligne, comme les numéros de lignes de l'index
+    tokens, token_lines = [], []
+    for number, line in enumerate(text.splitlines(), 1):
+        words = re.findall(r'\b\w+\b', line.lower())
+        tokens += words
+        token_lines += [number] * len(words)
+    terms = re.findall(r'\b\w+\b', query.lower())
+    prefix = query.rstrip().endswith('*')
+    positions = []
+    for start in range(len(tokens) - len(terms) + 1):
+        window = tokens[start:start + len(terms)]
+        if terms and window[:-1] == terms[:-1] and (
+                window[-1].startswith(terms[-1]) if prefix else window[-1] == terms[-1]):
+            positions.append(start)
+    return positions, sorted({token_lines[position] for position in positions})
+
+
+QUERIES = ['clause', 'CLAUSE', 'clauses', 'absent', 'clause de', 'de la résiliation', 'l a',
+           'résili*', 'clause*', 'de résil*', 'la la', 'z*', '', '...']
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_naive_search(seed):
+    text = random_text(seed)
+    index = KeywordIndex(text)
+    for query in QUERIES:
+        positions, lines = naive_positions(text, query)
+        assert index.positions(query) == positions, query
+        assert index.count(query) == len(positions)
+        assert index.lines(query) == lines
+        assert index.search(query) == {'found': bool(positions), 'count': len(positions), 'lines': lines}
+
+
+def test_tokenized_document_shares_index():
+    text = random_text(7)
+    document = TokenizedDocument(text)
+    assert document.keyword_index is document.keyword_index
+    for query in QUERIES:
+        assert document.keyword_index.positions(query) == KeywordIndex(text).positions(query)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_scan_matches_naive_search(seed):
+    text = random_text(seed)
+    for query in QUERIES:
+        positions, lines = naive_positions(text, query)
+        assert scan_keyword(text.splitlines(), query) == {'found': bool(positions), 'count': len(positions),
+                                                          'lines': lines}, query
+
+
+def test_single_keyword_does_not_build_index():
+    document1, document2 = TokenizedDocument(random_text(1)), TokenizedDocument(random_text(2))
+    document2.keyword_index
+    result = search_keywords(document1, document2, ['résili*'])
+    assert 'keyword_index' not in document1.__dict__
+    assert result == {'résili*': {'text1': KeywordIndex(random_text(1)).search('résili*'),
+                                  'text2': document2.keyword_index.search('résili*')}}
+    search_keywords(document1, document2, ['clause', 'de la'])
+    assert 'keyword_index' in document1.__dict__
@@ -0,0 +1,69 @@
+import pytest
+
+from benchmark import apply_edits, generate_lines
+from comparison_engine import compare_documents
+from mapped_document import MappedDocument, align_mapped_documents
+from sequence_alignment import align_sequences
+
+
+def write_lines(path, lines, newline='\n'):
+    path.write_bytes(''.join(line + newline for line in lines).encode('utf-8'))
+    return str(path)
+
+
+@pytest.fixture(params=[(3000, 0.05), (3000, 0.3), (200, 0.5)], ids=['faible', 'fort', 'court'])
+def documents(request, tmp_path):
+    size, rate = request.param
+    lines1 = generate_lines(size)
+    lines2 = apply_edits(lines1, rate, 1)
+    lines2[:0] = ['Préambule modifié : été, déjà']
+    return lines1, lines2, write_lines(tmp_path / 'a.txt', lines1), write_lines(tmp_path / 'b.txt', lines2)
+
+
+def test_same_results_as_in_memory(documents):
+    lines1, lines2, path1, path2 = documents
+    expected = compare_documents('\n'.join(lines1), '\n'.join(lines2), None)
+    with MappedDocument(path1) as document1, MappedDocument(path2) as document2:
+        assert list(document1) == lines1 and list(document2) == lines2
+        results = compare_documents(document1, document2, None)
+
+        line_comparison, reference = results['line_comparison'], expected['line_comparison']
+        assert list(line_comparison['hunks']) == list(reference['hunks'])
+        for key in ('common', 'diff', 'unique_to_text1', 'unique_to_text2'):
+            assert list(line_comparison[key]) == list(reference[key]), key
+        assert results['similarity_rate'] == expected['similarity_rate']
+        for key in ('only_in_text1', 'only_in_text2'):
+            assert sorted(results['unique_words'][key]) == sorted(expected['unique_words'][key])
+        assert list(results['word_level_differences']) == list(expected['word_level_differences'])
+
+
+def test_alignment_matches_align_sequences(documents):
+    lines1, lines2, path1, path2 = documents
+    with MappedDocument(path1) as document1, MappedDocument(path2) as document2:
+        hunks = align_mapped_documents(document1, document2)
+        assert hunks == align_sequences(lines1, lines2)
+
+
+def test_line_endings_and_empty_file(tmp_path):
+    lines = ['première ligne', '', 'troisième ligne']
+    with MappedDocument(write_lines(tmp_path / 'crlf.txt', lines, '\r\n')) as crlf, \
+            MappedDocument(write_lines(tmp_path / 'lf.txt', lines)) as lf:
+        assert len(crlf) == 3 and list(crlf) == lines
+        assert crlf[-1] == lines[-1] and crlf[0:2] == lines[0:2]
+        assert align_mapped_documents(crlf, lf) == [('equal', 0, 3, 0, 3)]
+
+    (tmp_path / 'vide.txt').write_bytes(b'')
+    with MappedDocument(str(tmp_path / 'vide.txt')) as empty, MappedDocument(str(tmp_path / 'lf.txt')) as lf:
+        assert len(empty) == 0
+        assert align_mapped_documents(empty, lf) == [('insert', 0, 0, 0, 3)]
+
+
+def test_hashes_and_hunks_do_not_depend_on_hash_seed(documents, run_with_hash_seeds):
+    _, _, path1, path2 = documents
+    outputs = run_with_hash_seeds(f"""
+from mapped_document import MappedDocument, align_mapped_documents
+with MappedDocument({path1!r}) as document1, MappedDocument({path2!r}) as document2:
+    print(list(document1.line_hashes))
+    print(align_mapped_documents(document1, document2))
+""")
+    assert outputs[1:] == outputs[:1] * 2
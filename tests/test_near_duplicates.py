@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from benchmark import apply_edits, generate_lines
+from near_duplicates import (MinHashIndex, estimate_jaccard, find_near_duplicates, index_documents,
+                             shingle_hashes)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    # Trois familles de documents proches, plus des documents isolés
+    rng = random.Random(5)
+    paths = []
+    for family in range(3):
+        base = generate_lines(150, seed=family)
+        for variant in range(3):
+            path = tmp_path / f"famille{family}_{variant}.txt"
+            lines = apply_edits(base, 0.02 * variant, rng.randrange(1000))
+            path.write_text('\n'.join(lines), encoding='utf-8')
+            paths.append(str(path))
+    for single in range(3):
+        path = tmp_path / f"isole{single}.txt"
+        path.write_text('\n'.join(generate_lines(150, seed=10 + single)), encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+
+def test_estimate_is_close_to_jaccard():
+    lines = generate_lines(200)
+    index = MinHashIndex()
+    for rate in (0.0, 0.05, 0.2, 0.5):
+        text1, text2 = '\n'.join(lines), '\n'.join(apply_edits(lines, rate, 1))
+        shingles1, shingles2 = shingle_hashes(text1), shingle_hashes(text2)
+        jaccard = len(shingles1 & shingles2) / len(shingles1 | shingles2)
+        assert abs(estimate_jaccard(index.signature(text1), index.signature(text2)) - jaccard) < 0.15
+
+
+def test_add_remove_query():
+    index = MinHashIndex()
+    texts = {name: '\n'.join(generate_lines(100, seed=k)) for k, name in enumerate('abc')}
+    for name, text in texts.items():
+        index.add(name, index.signature(text))
+    assert len(index) == 3 and 'b' in index
+    assert index.query(index.signature(texts['b']))['b'] == 1.0
+
+    index.add('b', index.signature(texts['a']))
+    assert set(index.query(index.signature(texts['a']))) == {'a', 'b'}
+    index.remove('b')
+    assert 'b' not in index
+    assert set(index.query(index.signature(texts['a']))) == {'a'}
+    index.remove('a')
+    index.remove('c')
+    assert len(index) == 0 and not index.candidate_pairs()
+
+
+def test_save_and_load(corpus, tmp_path):
+    index = MinHashIndex(num_permutations=64, threshold=0.7, shingle_size=4)
+    assert index_documents(index, corpus, workers=1) == []
+    path = str(tmp_path / "signatures.dcmh")
+    index.save(path)
+
+    loaded = MinHashIndex.load(path)
+    assert (loaded.num_permutations, loaded.threshold, loaded.shingle_size) == (64, 0.7, 4)
+    assert (loaded.bands, loaded.rows) == (index.bands, index.rows)
+    assert loaded.signatures == index.signatures
+    assert loaded.candidate_pairs() == index.candidate_pairs()
+    signature = index.signatures[corpus[0]]
+    assert loaded.query(signature) == index.query(signature)
+
+    (tmp_path / "autre.dcmh").write_bytes(b"pas un index")
+    with pytest.raises(ValueError):
+        MinHashIndex.load(str(tmp_path / "autre.dcmh"))
+
+
+def test_incremental_search_matches_full_search(corpus, tmp_path):
+    def pairs(records):
+        return {(record["document1"], record["document2"]): record["estimated_jaccard"] for record in records}
+
+    full = pairs(find_near_duplicates(corpus, threshold=0.5, workers=1))
+    assert len(full) == 9 and not any("isole" in path for pair in full for path in pair)
+
+    old, new = corpus[::2], corpus[1::2]
+    index = MinHashIndex(threshold=0.5)
+    index_documents(index, old, workers=1)
+    index.save(str(tmp_path / "corpus.dcmh"))
+    incremental = pairs(find_near_duplicates(new, threshold=0.5, workers=1,
+                                             index=MinHashIndex.load(str(tmp_path / "corpus.dcmh"))))
+    assert incremental == {pair: jaccard for pair, jaccard in full.items() if set(pair) & set(new)}
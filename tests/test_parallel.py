@@ -0,0 +1,42 @@
+import comparison_engine
+from benchmark import apply_edits, generate_lines
+from comparison_engine import compare_documents, compare_lines, iter_word_level_differences
+from parallel import ordered_chunked_map
+
+
+def test_ordered_chunked_map_keeps_batch_order():
+    batches = [list(range(start, start + 3)) for start in range(0, 60, 3)]
+    for workers in (1, 3):
+        results = list(ordered_chunked_map(sum, iter(batches), workers))
+        assert results == [(batch, sum(batch)) for batch in batches]
+
+
+def changed_pairs():
+    lines1 = generate_lines(3000, seed=4)
+    lines2 = apply_edits(lines1, 0.2, seed=5)
+    return compare_lines('\n'.join(lines1), '\n'.join(lines2))['diff']
+
+
+def test_parallel_word_differences_match_serial(monkeypatch):
+    pairs = changed_pairs()
+    assert len(pairs) > 100
+    serial = list(iter_word_level_differences(pairs, workers=1))
+    monkeypatch.setattr(comparison_engine, 'PARALLEL_MIN_PAIRS', 50)
+    assert list(iter_word_level_differences(pairs, workers=2, chunk_size=16)) == serial
+
+    # Consommation interrompue : le générateur se ferme sans attendre les lots restants
+    differences = iter_word_level_differences(pairs, workers=2, chunk_size=16)
+    head = [next(differences) for _ in range(40)]
+    differences.close()
+    assert head == serial[:40]
+
+
+def test_compare_documents_parallel_by_default(monkeypatch):
+    lines1 = generate_lines(2000, seed=6)
+    text1, text2 = '\n'.join(lines1), '\n'.join(apply_edits(lines1, 0.2, seed=7))
+    serial = compare_documents(text1, text2, None, workers=1)
+    monkeypatch.setattr(comparison_engine, 'PARALLEL_MIN_PAIRS', 50)
+    monkeypatch.setattr(comparison_engine.os, 'cpu_count', lambda: 2)
+    parallel = compare_documents(text1, text2, None)
+    assert parallel['word_level_differences'] == serial['word_level_differences']
+    assert parallel['similarity_rate'] == serial['similarity_rate']
@@ -0,0 +1,124 @@
+import sqlite3
+
+import pytest
+
+from benchmark import generate_lines
+from passage_index import PassageIndex, winnow_fingerprints
+from text_preprocessor import preprocess_lines
+
+
+def make_text(seed, size=120):
+    return preprocess_lines('\n'.join(generate_lines(size, seed=seed)))
+
+
+@pytest.fixture
+def index(tmp_path):
+    with PassageIndex(str(tmp_path / 'passages.db')) as index:
+        for seed in range(4):
+            assert index.add_text(f'doc{seed}', make_text(seed))
+        yield index
+
+
+def test_winnowing_positions_and_density():
+    text = make_text(0)
+    words = text.split()
+    fingerprints = winnow_fingerprints(text, gram_size=5, window=4)
+    assert fingerprints == winnow_fingerprints(text, gram_size=5, window=4)
+    positions = [position for _, position, _, _ in fingerprints]
+    assert positions == sorted(set(positions))
+    for _, position, start, end in fingerprints:
+        assert text[start:end].split() == words[position:position + 5]
+    # Au moins une empreinte par fenêtre de k-grammes consécutifs
+    assert positions[0] < 4 and positions[-1] >= len(words) - 5 - 3
+    assert all(b - a <= 4 for a, b in zip(positions, positions[1:]))
+    # Texte plus court qu'un k-gramme : une seule empreinte pour tout le texte
+    assert [fingerprint[1:] for fingerprint in winnow_fingerprints('trop court', gram_size=5)] == [(0, 0, 10)]
+    assert winnow_fingerprints('') == []
+
+
+def test_query_finds_copied_passages(index):
+    source = make_text(2)
+    copied = source[source.index(' ', 500):source.index(' ', 1500)]
+    text = make_text(99, 40) + '\n' + copied + '\n' + make_text(98, 40)
+
+    candidates = index.query_text(text)
+    assert candidates[0]['document'] == 'doc2'
+    assert all(candidate['shared_fingerprints'] < candidates[0]['shared_fingerprints']
+               for candidate in candidates[1:])
+    passage = max(candidates[0]['passages'], key=lambda passage: passage['words'])
+    assert len(copied.split()) - passage['words'] < 2 * index.window
+    assert text[passage['start']:passage['end']].split() == \
+        source[passage['document_start']:passage['document_end']].split()
+    assert candidates[0]['matched_words'] >= passage['words']
+
+    assert index.query_text(text, limit=1) == candidates[:1]
+    assert all(c['document'] != 'doc2' for c in index.query_text(source, limit=None, exclude='doc2'))
+
+
+def test_add_replace_and_remove(index):
+    assert len(index) == 4 and 'doc1' in index
+    assert index.names() == ['doc0', 'doc1', 'doc2', 'doc3']
+    # Texte inchangé : rien à réindexer
+    assert not index.add_text('doc1', make_text(1))
+
+    text = make_text(1)
+    assert index.add_text('doc1', make_text(7))
+    assert all(candidate['document'] != 'doc1' for candidate in index.query_text(text, limit=None))
+    assert index.query_text(make_text(7))[0]['document'] == 'doc1'
+
+    assert index.remove('doc1') and not index.remove('doc1')
+    assert 'doc1' not in index and len(index) == 3
+    assert all(candidate['document'] != 'doc1' for candidate in index.query_text(make_text(7), limit=None))
+    count = index.connection.execute("SELECT COUNT(*) FROM fingerprints f LEFT JOIN documents d "
+                                     "ON d.id = f.document WHERE d.id IS NULL").fetchone()[0]
+    assert count == 0
+
+
+def test_documents_and_settings(tmp_path):
+    path = str(tmp_path / 'passages.db')
+    files = []
+    for seed in range(2):
+        file = tmp_path / f'doc{seed}.txt'
+        file.write_text('\n'.join(generate_lines(80, seed=seed)), encoding='utf-8')
+        files.append(str(file))
+    with PassageIndex(path, gram_size=6, window=5) as index:
+        assert [index.add_document(file) for file in files] == [True, True]
+        assert index.add_document(files[0]) is False
+        assert index.add_document(str(tmp_path / 'absent.txt')) is None
+        assert index.query_document(files[0]) == []
+
+    with PassageIndex(path) as index:
+        assert (index.mode, index.gram_size, index.window) == ('souple', 6, 5)
+        assert index.names() == sorted(files)
+    with pytest.raises(ValueError):
+        PassageIndex(path, gram_size=8)
+    with pytest.raises(ValueError):
+        PassageIndex(str(tmp_path / 'autre.db'), mode='inconnu')
+    (tmp_path / 'corrompu.db').write_bytes(b'pas une base SQLite' * 100)
+    with pytest.raises(ValueError):
+        PassageIndex(str(tmp_path / 'corrompu.db'))
+
+
+def test_query_releases_the_database_lock(index):
+    index.query_text(make_text(2))
+    assert not index.connection.in_transaction
+    # Un autre accès à la base peut écrire sans attendre la fin de la connexion
+    with PassageIndex(index.filepath) as other:
+        other.connection.execute("PRAGMA busy_timeout = 100")
+        assert other.add_text('doc9', make_text(9))
+    assert 'doc9' in index
+
+
+def test_locked_database_error_is_not_masked(tmp_path, monkeypatch):
+    path = str(tmp_path / 'passages.db')
+    PassageIndex(path).close()
+    locker = sqlite3.connect(path, isolation_level=None)
+    locker.execute("BEGIN EXCLUSIVE")
+    connect = sqlite3.connect
+    monkeypatch.setattr(sqlite3, 'connect', lambda filepath: connect(filepath, timeout=0.05))
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            PassageIndex(path)
+    finally:
+        locker.rollback()
+        locker.close()
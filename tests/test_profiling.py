@@ -0,0 +1,67 @@
+import json
+
+import profiling
+from comparison_engine import compare_documents
+from doc_compare import main
+from profiling import Profiler, is_enabled, profile_iterator, stage
+
+
+def test_disabled_by_default():
+    assert not is_enabled()
+    assert stage("a") is stage("b")
+    items = [1, 2]
+    assert profile_iterator("items", items) is items
+
+
+def test_nested_stages():
+    seen = []
+    with Profiler(track_allocations=True, callback=seen.append) as profiler:
+        assert is_enabled()
+        with stage("outer", lines=3):
+            with stage("inner"):
+                with stage("leaf"):
+                    bytearray(100_000)
+            with stage("inner"):
+                pass
+        assert list(profile_iterator("items", iter("abc"), lines=3)) == ['a', 'b', 'c']
+    assert not is_enabled()
+
+    # Les enregistrements sont émis à la fin de chaque étape : la plus profonde d'abord
+    assert [(record["name"], record["depth"]) for record in profiler.records] == [
+        ("leaf", 2), ("inner", 1), ("inner", 1), ("outer", 0), ("items", 0)]
+    assert seen == profiler.records
+    leaf, inner, _, outer, items = profiler.records
+    assert outer["sizes"] == {"lines": 3} and items["sizes"] == {"lines": 3, "items": 3}
+    assert outer["start"] <= inner["start"] <= leaf["start"]
+    assert leaf["start"] + leaf["wall_time"] <= inner["start"] + inner["wall_time"] <= \
+        outer["start"] + outer["wall_time"]
+    # Le pic de l'étape la plus profonde remonte à ses parentes
+    assert leaf["peak_bytes"] >= 100_000 and outer["peak_bytes"] >= leaf["peak_bytes"]
+    assert profiler.summary()["inner"]["count"] == 2
+
+
+def test_chrome_trace_shape():
+    with Profiler() as profiler:
+        compare_documents("a\nb\nc", "a\nx\nc", "b")
+    trace = profiler.to_chrome_trace()
+    assert trace["displayTimeUnit"] == "ms"
+    events = trace["traceEvents"]
+    assert events and len(events) == len(profiler.records)
+    for event, record in zip(events, profiler.records):
+        assert set(event) == {"name", "ph", "ts", "dur", "pid", "tid", "args"}
+        assert event["ph"] == "X" and event["name"] == record["name"]
+        assert event["ts"] >= 0 and event["dur"] >= 0
+        assert "cpu_time_ms" in event["args"]
+    assert {"compare_lines", "search_keyword"} <= {event["name"] for event in events}
+
+
+def test_command_line_exports(tmp_path):
+    for name, text in (("a.txt", "un\ndeux"), ("b.txt", "un\ntrois")):
+        (tmp_path / name).write_text(text, encoding="utf-8")
+    profile, trace = tmp_path / "profile.json", tmp_path / "trace.json"
+    assert main([str(tmp_path / "a.txt"), str(tmp_path / "b.txt"), "--output", str(tmp_path / "rapport.txt"),
+                 "--profile", str(profile), "--trace", str(trace)]) == 1
+    assert profiling._active_profiler is None
+    data = json.loads(profile.read_text(encoding="utf-8"))
+    assert set(data) == {"records", "summary"} and "parse_file.txt" in data["summary"]
+    assert len(json.loads(trace.read_text(encoding="utf-8"))["traceEvents"]) == len(data["records"])
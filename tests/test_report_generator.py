@@ -0,0 +1,42 @@
+import io
+
+import pytest
+
+from benchmark import apply_edits, generate_lines
+from comparison_engine import compare_documents
+from report_generator import generate_report, write_report, write_report_to_file
+
+LINES = generate_lines(300, seed=2)
+TEXT1, TEXT2 = '\n'.join(LINES), '\n'.join(apply_edits(LINES, 0.1, seed=3))
+OPTIONS = [
+    {},
+    {'keyword': 'contrat'},
+    {'keywords': ['contrat', 'prix*', 'clause de']},
+    {'metrics': ['jaccard', 'cosine', 'edit']},
+    {'detect_moves': True},
+]
+
+
+@pytest.mark.parametrize('options', OPTIONS)
+def test_write_report_matches_generate_report(options):
+    options = {'keyword': None, **options}
+    expected = generate_report(compare_documents(TEXT1, TEXT2, **options))
+    assert "==== Fin du rapport ====" in expected
+
+    stream = io.StringIO()
+    write_report(compare_documents(TEXT1, TEXT2, **options), stream)
+    assert stream.getvalue() == expected
+
+    # Différences mot à mot calculées pendant l'écriture
+    stream = io.StringIO()
+    write_report(compare_documents(TEXT1, TEXT2, lazy=True, **options), stream)
+    assert stream.getvalue() == expected
+
+
+def test_identical_documents_and_file_output(tmp_path, capsys):
+    results = compare_documents(TEXT1, TEXT1, None)
+    path = tmp_path / 'rapport.txt'
+    write_report_to_file(results, str(path))
+    assert path.read_text(encoding='utf-8') == generate_report(results)
+    write_report_to_file(results, str(tmp_path / 'absent' / 'rapport.txt'))
+    assert "Erreur" in capsys.readouterr().out
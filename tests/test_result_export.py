@@ -0,0 +1,90 @@
+import io
+import json
+import random
+
+import pytest
+
+from comparison_engine import compare_documents
+from result_export import ResultFile, iter_jsonl, iter_word_diff_records, write_binary, write_jsonl
+
+
+def make_texts(seed, size=300):
+    rng = random.Random(seed)
+    words = ['contrat', 'clause', 'prix', 'délai', 'été', 'résiliation', 'article', '42']
+    lines1 = [' '.join(rng.choices(words, k=rng.randint(1, 8))) for _ in range(size)]
+    lines2 = []
+    for line in lines1:
+        draw = rng.random()
+        if draw < 0.1:
+            continue
+        if draw < 0.3:
+            line = ' '.join(rng.choices(words, k=rng.randint(1, 8)))
+        lines2.append(line)
+        if draw > 0.95:
+            lines2.append('ligne ajoutée')
+    return '\n'.join(lines1), '\n'.join(lines2)
+
+
+@pytest.fixture(params=[{}, {'keywords': ['clause', 'prix']}, {'detect_moves': True}])
+def results(request):
+    text1, text2 = make_texts(len(request.param))
+    return compare_documents(text1, text2, 'contrat', **request.param)
+
+
+def test_jsonl_round_trip(results):
+    stream = io.StringIO()
+    write_jsonl(results, stream)
+    stream.seek(0)
+    records = list(iter_jsonl(stream))
+
+    header = records[0]
+    assert header['type'] == 'header'
+    assert header['statistics']['similarity_rate'] == results['similarity_rate']
+    assert header['unique_words'] == json.loads(json.dumps(results['unique_words']))
+    assert header['keyword_search'] == json.loads(json.dumps(results['keyword_search']))
+
+    hunks = [(r['tag'], r['i1'], r['i2'], r['j1'], r['j2']) for r in records if r['type'] == 'hunk']
+    assert hunks == [tuple(hunk) for hunk in results['line_comparison']['hunks']]
+    word_diffs = [{k: v for k, v in r.items() if k != 'type'} for r in records if r['type'] == 'word_diff']
+    assert word_diffs == json.loads(json.dumps(list(iter_word_diff_records(results))))
+
+
+def test_binary_round_trip(results, tmp_path):
+    path = tmp_path / 'resultat.dcr'
+    write_binary(results, str(path))
+    hunks = [tuple(hunk) for hunk in results['line_comparison']['hunks']]
+    records = json.loads(json.dumps(list(iter_word_diff_records(results))))
+
+    with ResultFile(str(path)) as result:
+        assert result.hunk_count == len(hunks)
+        assert result.record_count == len(records)
+        assert result.metadata['statistics']['similarity_rate'] == results['similarity_rate']
+        assert result.metadata['unique_words'] == json.loads(json.dumps(results['unique_words']))
+        assert list(result.iter_hunks()) == hunks
+        assert list(result.iter_hunks(3, 10)) == hunks[3:10]
+        assert [result.hunk(n) for n in range(len(hunks))] == hunks
+        assert list(result.iter_word_diffs()) == records
+        assert list(result.iter_word_diffs(2, 5)) == records[2:5]
+        with pytest.raises(IndexError):
+            result.hunk(len(hunks))
+        with pytest.raises(IndexError):
+            result.word_diff(-1)
+
+
+def test_lazy_results_are_exported_identically(tmp_path):
+    text1, text2 = make_texts(7)
+    eager, lazy = tmp_path / 'eager.dcr', tmp_path / 'lazy.dcr'
+    write_binary(compare_documents(text1, text2, None), str(eager))
+    write_binary(compare_documents(text1, text2, None, lazy=True), str(lazy))
+    assert eager.read_bytes() == lazy.read_bytes()
+
+
+def test_rejects_foreign_files(tmp_path):
+    with pytest.raises(ValueError):
+        list(iter_jsonl(io.StringIO('{"type": "hunk"}\n')))
+    empty, other = tmp_path / 'vide.dcr', tmp_path / 'autre.dcr'
+    empty.write_bytes(b'')
+    other.write_bytes(b'pas un resultat')
+    for path in (empty, other):
+        with pytest.raises(ValueError):
+            ResultFile(str(path))
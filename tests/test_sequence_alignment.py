@@ -0,0 +1,219 @@
+import random
+from array import array
+
+import pytest
+
+from benchmark import generate_lines
+from comparison_engine import compare_lines
+from sequence_alignment import (MOVE_MIN_LINES, align_block_levels, align_sequences, align_words, apply_moves,
+                                block_levels, detect_moves, hash_lines, merge_hunks)
+
+
+def lcs_length(a, b):
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def check_hunks(a, b, hunks):
+    i = j = 0
+    for tag, i1, i2, j1, j2 in hunks:
+        assert (i1, j1) == (i, j)
+        if tag == 'equal':
+            assert list(a[i1:i2]) == list(b[j1:j2])
+        elif tag == 'delete':
+            assert i2 > i1 and j1 == j2
+        elif tag == 'insert':
+            assert j2 > j1 and i1 == i2
+        else:
+            assert tag == 'replace' and i2 > i1 and j2 > j1
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    return sum(i2 - i1 for tag, i1, i2, _, _ in hunks if tag == 'equal')
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_align_sequences_is_a_valid_alignment_close_to_lcs(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        a = [rng.randint(0, 6) for _ in range(rng.randint(0, 40))]
+        b = [rng.randint(0, 6) for _ in range(rng.randint(0, 40))]
+        common = check_hunks(a, b, align_sequences(a, b))
+        # Patience puis Myers : optimal sans ancre unique, jamais au-delà de la LCS
+        assert common <= lcs_length(a, b)
+
+
+def test_align_sequences_matches_lcs_without_unique_lines():
+    rng = random.Random(7)
+    for _ in range(300):
+        a = [rng.randint(0, 2) for _ in range(rng.randint(0, 30))] * 2
+        b = [rng.randint(0, 2) for _ in range(rng.randint(0, 30))] * 2
+        assert check_hunks(a, b, align_sequences(a, b)) == lcs_length(a, b)
+
+
+def test_align_sequences_stays_valid_when_myers_gives_up():
+    rng = random.Random(3)
+    for _ in range(300):
+        a = [rng.randint(0, 3) for _ in range(rng.randint(0, 60))]
+        b = [rng.randint(0, 3) for _ in range(rng.randint(0, 60))]
+        check_hunks(a, b, align_sequences(a, b, max_cost=rng.randint(0, 5)))
+
+
+def test_low_uniqueness_insertion_does_not_become_one_replace():
+    rng = random.Random(3)
+    pool = [f"ligne {i}" for i in range(50)]
+    a = [rng.choice(pool) for _ in range(3000)]
+    b = ["nouvelle"] + a
+    for i in rng.sample(range(1, len(b)), 150):
+        b[i] = rng.choice(pool)
+    ids1, ids2 = hash_lines(a, b)
+    hunks = align_sequences(ids1, ids2, max_cost=100)
+    common = check_hunks(ids1, ids2, hunks)
+    assert hunks[0] == ('insert', 0, 0, 0, 1)
+    assert common >= len(a) - 2 * 150
+
+
+def test_align_block_levels_matches_plain_alignment_on_long_documents():
+    rng = random.Random(11)
+    lines1 = [f"ligne {rng.randint(0, 10 ** 6)}" for _ in range(6000)]
+    lines2 = list(lines1)
+    for _ in range(40):
+        position = rng.randrange(len(lines2))
+        lines2[position:position + rng.randint(0, 3)] = [f"modifiée {rng.random()}"] * rng.randint(0, 3)
+    ids1, ids2 = hash_lines(lines1, lines2)
+    blocks = align_block_levels(block_levels(array('I', ids1)), block_levels(array('I', ids2)))
+    plain = align_sequences(ids1, ids2)
+    assert check_hunks(ids1, ids2, blocks) == check_hunks(ids1, ids2, plain)
+    assert merge_hunks(blocks) == blocks
+
+
+def test_moved_block_is_not_kept_as_an_anchor():
+    # Niveau de blocs construit à la main : dix blocs de quatre lignes réécrits
+    # d'une ligne chacun, et un bloc identique déplacé du début à la fin.
+    moved = [900, 901, 902, 903]
+    blocks1 = [moved] + [[10 * k + n for n in range(4)] for k in range(10)]
+    blocks2 = [block[:3] + [500 + k] for k, block in enumerate(blocks1[1:])] + [moved]
+
+    def levels(blocks):
+        lines = array('I', [line for block in blocks for line in block])
+        fingerprints = array('q', [hash(tuple(block)) for block in blocks])
+        return [(lines, None), (fingerprints, array('Q', range(0, len(lines) + 1, 4)))]
+
+    levels1, levels2 = levels(blocks1), levels(blocks2)
+    a, b = levels1[0][0], levels2[0][0]
+    hunks = align_block_levels(levels1, levels2)
+    assert check_hunks(a, b, hunks) == lcs_length(a, b) == 30
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_align_words_matches_lcs(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        a = [rng.choice('abcde') for _ in range(rng.randint(0, 80))]
+        b = [rng.choice('abcde') for _ in range(rng.randint(0, 80))]
+        hunks = align_words(a, b)
+        assert check_hunks(a, b, hunks) == lcs_length(a, b)
+        assert merge_hunks(hunks) == hunks
+
+
+def test_align_words_falls_back_on_large_zones():
+    rng = random.Random(4)
+    a = [rng.choice('abcdef') for _ in range(200)]
+    b = [rng.choice('abcdef') for _ in range(200)]
+    # Au-delà de max_cells : alignement valide, sans garantie d'optimalité
+    assert check_hunks(a, b, align_words(a, b, max_cells=100)) <= lcs_length(a, b)
+
+
+BLOCK_SCRIPT = """
+from array import array
+from benchmark import apply_edits, generate_lines
+from sequence_alignment import block_levels, hash_lines, iter_block_alignment
+
+lines1 = generate_lines(5000)
+lines2 = apply_edits(lines1, 0.3, 2)
+ids1, ids2 = hash_lines(lines1, lines2)
+levels1, levels2 = block_levels(array('q', ids1)), block_levels(array('q', ids2))
+print([list(fingerprints) for fingerprints, _ in levels1[1:]])
+print(list(iter_block_alignment(levels1, levels2)))
+print(list(iter_block_alignment(levels1, levels2, max_zone=64)))
+"""
+
+
+def test_block_alignment_does_not_depend_on_hash_seed(run_with_hash_seeds):
+    outputs = run_with_hash_seeds(BLOCK_SCRIPT)
+    assert outputs[0].count('\n') == 3 and outputs[0].startswith('[[')
+    assert outputs[1:] == outputs[:1] * 2
+
+
+def check_moved_hunks(a, b, hunks, moves):
+    # Les hunks 'moved' n'avancent que d'un côté : la liste couvre toujours les deux textes
+    i = j = 0
+    for tag, i1, i2, j1, j2 in hunks:
+        assert (i1, j1) == (i, j)
+        if tag == 'moved':
+            assert (i1 < i2 and j1 == j2) or (i1 == i2 and j1 < j2)
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    sources = sorted((i1, i2) for tag, i1, i2, _, _ in hunks if tag == 'moved' and i1 < i2)
+    targets = sorted((j1, j2) for tag, _, _, j1, j2 in hunks if tag == 'moved' and j1 < j2)
+    assert sources == sorted((i1, i2) for i1, i2, _, _ in moves)
+    assert targets == sorted((j1, j2) for _, _, j1, j2 in moves)
+    for i1, i2, j1, j2 in moves:
+        assert i2 - i1 >= MOVE_MIN_LINES and list(a[i1:i2]) == list(b[j1:j2])
+
+
+def test_moved_block_becomes_moved_hunks():
+    a = list(range(30))
+    b = a[:5] + a[10:] + a[5:10]
+    hunks = align_sequences(a, b)
+    moves = detect_moves(a, b, hunks)
+    assert moves == [(5, 10, 25, 30)]
+    assert apply_moves(hunks, moves) == [('equal', 0, 5, 0, 5), ('moved', 5, 10, 5, 5),
+                                         ('equal', 10, 30, 5, 25), ('moved', 30, 30, 25, 30)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_moved_hunks_cover_both_texts(seed):
+    rng = random.Random(seed)
+    lines1 = generate_lines(400, seed=seed)
+    lines2 = list(lines1)
+    # Quelques blocs déplacés, et des lignes réécrites autour
+    for _ in range(3):
+        start = rng.randrange(len(lines2) - 10)
+        block = lines2[start:start + rng.randint(MOVE_MIN_LINES, 8)]
+        del lines2[start:start + len(block)]
+        target = rng.randrange(len(lines2))
+        lines2[target:target] = block
+    for _ in range(10):
+        lines2[rng.randrange(len(lines2))] = f"ligne réécrite {rng.random()}"
+    a, b = hash_lines(lines1, lines2)
+    hunks = align_sequences(a, b)
+    moves = detect_moves(a, b, hunks)
+    assert moves
+    check_moved_hunks(a, b, apply_moves(hunks, moves), moves)
+
+
+def test_short_blocks_are_not_moves():
+    a = list(range(30))
+    b = a[:5] + a[5 + MOVE_MIN_LINES - 1:] + a[5:5 + MOVE_MIN_LINES - 1]
+    hunks = align_sequences(a, b)
+    assert detect_moves(a, b, hunks) == []
+    assert apply_moves(hunks, []) == hunks
+    assert detect_moves(a, b, hunks, min_lines=MOVE_MIN_LINES - 1) == [(5, 5 + MOVE_MIN_LINES - 1, 28, 30)]
+
+
+def test_compare_lines_detect_moves():
+    lines1 = [f"article {n}" for n in range(20)]
+    lines2 = lines1[:2] + lines1[6:] + lines1[2:6]
+    text1, text2 = '\n'.join(lines1), '\n'.join(lines2)
+    plain = compare_lines(text1, text2)
+    assert plain['unique_to_text1'] == lines1[2:6] and 'moved' not in plain
+    result = compare_lines(text1, text2, detect_moves=True)
+    assert result['moved'] == lines1[2:6]
+    assert result['moves'] == [(2, 6, 16, 20)]
+    assert result['unique_to_text1'] == result['unique_to_text2'] == result['diff'] == []
+    check_moved_hunks(lines1, lines2, result['hunks'], result['moves'])
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from comparison_engine import compare_documents
+from similarity_metrics import (
+    SIMILARITY_METRICS, compute_similarity_metrics, edit_distance, register_metric, tfidf_cosine, token_jaccard
+)
+from tokenized_document import tokenize_documents
+
+
+def reference_distance(a, b):
+    # Programmation dynamique classique, ligne par ligne
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_edit_distance_matches_dynamic_programming(seed):
+    rng = random.Random(seed)
+    # Au-delà de 64 éléments, le motif occupe plusieurs mots machine
+    a = [rng.choice('abcd') for _ in range(rng.randrange(150))]
+    b = [rng.choice('abcde') for _ in range(rng.randrange(150))]
+    assert edit_distance(a, b) == reference_distance(a, b)
+    assert edit_distance(b, a) == reference_distance(a, b)
+
+
+def test_edit_distance_edge_cases():
+    assert edit_distance([], []) == 0
+    assert edit_distance('abc', '') == 3
+    assert edit_distance('kitten', 'sitting') == 3
+    assert edit_distance('x' * 100 + 'y', 'x' * 100 + 'z') == 1
+    a, b = 'ab' * 100, 'ba' * 90
+    # Zone trop grande : borne inférieure
+    assert edit_distance(a, b, max_cells=10) <= reference_distance(a, b)
+
+
+def test_fixed_values():
+    doc1, doc2 = tokenize_documents("a b c", "B c d")
+    assert token_jaccard(doc1, doc2) == 50.0
+    assert tfidf_cosine(*tokenize_documents("a a b", "A c")) == 47.43
+    assert tfidf_cosine(*tokenize_documents("a b", "b a")) == 100.0
+    assert tfidf_cosine(*tokenize_documents("a b", "c d")) == 0.0
+    assert tfidf_cosine(*tokenize_documents("", "")) == 100.0
+    results = compare_documents("a b c\nd", "a x c\nd", None, metrics=['jaccard', 'edit', 'cosine'])
+    assert results['similarity_metrics'] == {'jaccard': 60.0, 'edit': 75.0, 'cosine': 60.3}
+
+
+def test_register_metric():
+    register_metric('words', lambda doc1, doc2, line_comparison: float(len(line_comparison['hunks'])))
+    try:
+        assert compare_documents("a\nb", "a\nc", None, metrics=['words'])['similarity_metrics'] == {'words': 2.0}
+    finally:
+        del SIMILARITY_METRICS['words']
+    with pytest.raises(ValueError):
+        compute_similarity_metrics(*tokenize_documents("a", "b"), ['words'], {'hunks': []})
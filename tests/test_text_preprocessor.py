@@ -0,0 +1,72 @@
+import itertools
+import random
+from array import array
+
+import pytest
+
+from text_preprocessor import preprocess_lines, preprocess_text, preprocess_with_offsets
+
+# Les caractères qui changent de longueur en minuscules ('İ') sont couverts à part
+ALPHABET = 'aBcÉé ,.;!?\'-\t\n\r\x0c  '
+OPTIONS = list(itertools.product([True, False], repeat=4))
+
+
+def random_texts(count, seed=0):
+    rng = random.Random(seed)
+    texts = ['', ' ', '\n', '.\n,', 'a\r\nb', ',\r.\nX']
+    texts += [''.join(rng.choices(ALPHABET, k=rng.randrange(60))) for _ in range(count)]
+    return texts
+
+
+def check_offsets(text, normalized, offsets, ignore_case):
+    for offset, char in enumerate(normalized):
+        if char.isspace():
+            continue
+        original = text[offsets.to_original(offset)]
+        assert (original.lower() if ignore_case else original) == char
+    assert offsets.to_original(len(normalized)) == len(text)
+
+
+@pytest.mark.parametrize('ignore_case,clean_punctuation,normalize_spaces,strict_mode', OPTIONS)
+def test_same_text_as_preprocess_lines(ignore_case, clean_punctuation, normalize_spaces, strict_mode):
+    options = (ignore_case, clean_punctuation, normalize_spaces, strict_mode)
+    for text in random_texts(300):
+        normalized, offsets = preprocess_with_offsets(text, *options)
+        assert normalized == preprocess_lines(text, *options)
+        check_offsets(text, normalized, offsets, ignore_case and not strict_mode)
+
+
+@pytest.mark.parametrize('ignore_case,clean_punctuation,normalize_spaces,strict_mode', OPTIONS)
+def test_same_text_as_preprocess_text(ignore_case, clean_punctuation, normalize_spaces, strict_mode):
+    options = (ignore_case, clean_punctuation, normalize_spaces, strict_mode)
+    for text in random_texts(300, seed=1):
+        normalized, offsets = preprocess_with_offsets(text, *options, keep_lines=False)
+        assert normalized == preprocess_text(text, *options)
+        check_offsets(text, normalized, offsets, ignore_case and not strict_mode)
+
+
+def test_length_changing_lowercase():
+    text = 'İstanbul, İzmir.\nİİ a'
+    normalized, offsets = preprocess_with_offsets(text)
+    assert normalized == preprocess_lines(text)
+    for offset, char in enumerate(normalized):
+        if char.isalpha():
+            assert char in text[offsets.to_original(offset)].lower()
+
+
+def test_line_range_and_positions():
+    # Pages jointes comme file_parser.read_pdf_file(..., with_pages=True)
+    text = 'Titre :\n\n  Première   ligne.\nSeconde, ligne\nPage deux\n'
+    page_starts = array('Q', [0, text.index('Page')])
+    normalized, offsets = preprocess_with_offsets(text, page_starts=page_starts)
+    lines = normalized.split('\n')
+    assert lines == preprocess_lines(text).split('\n')
+
+    second = lines.index('seconde ligne')
+    start, end = offsets.line_range(second, second + 1)
+    assert text[start:end] == 'Seconde, ligne'
+
+    position = offsets.line_position(lines.index('page deux'), 5)
+    assert position['offset'] == text.index('deux')
+    assert (position['page'], position['page_line']) == (2, 1)
+    assert text.splitlines()[position['line'] - 1][position['column'] - 1:] == 'deux'
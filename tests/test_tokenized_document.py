@@ -0,0 +1,50 @@
+from comparison_engine import compare_lines, identify_unique_words
+from tokenized_document import TokenizedDocument, Vocabulary, tokenize_documents
+
+
+def test_vocabulary_ids_follow_first_appearance():
+    vocabulary = Vocabulary()
+    assert list(vocabulary.encode(['b', 'a', 'b', 'c'])) == [0, 1, 0, 2]
+    assert list(vocabulary.encode(iter(['c', 'd']))) == [2, 3]
+    assert len(vocabulary) == 4 and vocabulary.lookup('d') == 3 and vocabulary.lookup('z') is None
+    assert vocabulary.terms([3, 0]) == ['d', 'b'] and vocabulary.term(1) == 'a'
+
+    copy = vocabulary.copy()
+    copy.encode(['e'])
+    assert len(vocabulary) == 4 and copy.terms(range(5)) == ['b', 'a', 'c', 'd', 'e']
+
+
+def test_documents_share_a_vocabulary():
+    doc1, doc2 = tokenize_documents("un\ndeux\ntrois", "deux\nquatre")
+    assert doc1.vocabulary is doc2.vocabulary
+    # Même ligne, même identifiant dans les deux documents
+    assert doc1.line_ids[1] == doc2.line_ids[0]
+    assert tokenize_documents(doc1, doc2) == (doc1, doc2)
+
+    # Document déjà découpé : réutilisé avec son vocabulaire, l'autre est ré-encodé
+    doc3, doc4 = tokenize_documents(doc1, TokenizedDocument("trois"))
+    assert doc3 is doc1 and doc4.vocabulary is doc1.vocabulary
+    assert doc4.line_ids[0] == doc1.line_ids[2]
+    assert compare_lines(doc3, doc4)['unique_to_text1'] == ['un', 'deux']
+
+
+def test_fork_reuses_tokenization_with_its_own_vocabulary():
+    baseline = TokenizedDocument("a b\nc")
+    line_ids = baseline.line_ids
+    fork = baseline.fork()
+    assert fork.line_ids is line_ids
+    assert fork.vocabulary is not baseline.vocabulary
+    other = TokenizedDocument("c\nd e", fork.vocabulary)
+    assert other.line_ids[0] == line_ids[1]
+    # Les mots de l'autre document n'entrent que dans le vocabulaire de la copie
+    assert baseline.vocabulary.lookup("d e") is None and fork.vocabulary.lookup("d e") is not None
+
+
+def test_unique_words_in_order_of_appearance():
+    doc1, doc2 = tokenize_documents("Alpha beta\nzeta\nBeta gamma", "gamma\nautre mot")
+    # Lignes encodées d'abord : l'identifiant de « zeta » précède ceux des mots de la première ligne
+    doc1.line_ids
+    doc2.line_ids
+    assert identify_unique_words(doc1, doc2) == {'only_in_text1': ['alpha', 'beta', 'zeta'],
+                                                 'only_in_text2': ['autre', 'mot']}
+    assert identify_unique_words("b a\nc", "a") == {'only_in_text1': ['b', 'c'], 'only_in_text2': []}